@@ -17,11 +17,18 @@ const char* password = "bdAaFRXxJMgqmEG9";
 const char* baseUrl = "http://192.168.100.6:8000/api";
 String checkSessionUrl = String(baseUrl) + "/device-session/check-session/";
 String extendWindowUrl = String(baseUrl) + "/device-session/extend-window/";
-String lecturasUrl = String(baseUrl) + "/lecturas/";
+// Async ingestion endpoint (same contract as POST /lecturas/)
+String lecturasUrl = String(baseUrl) + "/ingest/lecturas/";
+String lecturasBatchUrl = String(baseUrl) + "/lecturas/batch/";
 
 // Device ID - Unique identifier for this ESP32
 String DEVICE_ID = "ESP32_DEFAULT";
 
+// Sender ID for uploaded readings (X-Device-Id). sampleSeq restarts at 0
+// on every boot, so a per-boot suffix keeps the server's duplicate check
+// from confusing new samples with ones sent before a reset.
+String INGEST_ID = "";
+
 // Pin definitions
 const int HEART_RATE_PIN = 18;
 const int SDA_PIN = 21;
@@ -33,10 +40,22 @@ const unsigned long SEND_INTERVAL = 10000;       // Send sensor data every 10 se
 const unsigned long POLL_INTERVAL = 10000;       // Check for session every 10 seconds
 const unsigned long EXTEND_INTERVAL = 1800000;   // Extend window every 30 minutes
 
+// Binary batch mode: buffer BATCH_SIZE samples and send them in one
+// compact request to /lecturas/batch/ (see api/parsers.py for the layout)
+const bool USE_BINARY_BATCH = false;
+const int BATCH_SIZE = 6;
+
 unsigned long lastSendTime = 0;
 unsigned long lastPollTime = 0;
 unsigned long lastExtendTime = 0;
 
+// Server pacing: X-Send-Interval overrides the periods above and a 429
+// pauses requests until its Retry-After has passed
+const char* PACING_HEADERS[] = {"X-Send-Interval", "Retry-After"};
+unsigned long sendInterval = SEND_INTERVAL;
+unsigned long pollInterval = POLL_INTERVAL;
+unsigned long backoffUntil = 0;
+
 // Session state
 bool hasActiveSession = false;
 String sessionId = "";
@@ -48,6 +67,27 @@ String usuarioEmail = "";
 // Sensor objects
 MPU6050 mpu;
 
+// Binary wire format (little-endian, must match api/parsers.py)
+struct __attribute__((packed)) LecturaBatchHeader {
+  char magic[2];        // 'W', 'B'
+  uint8_t version;      // 1
+  uint8_t flags;        // reserved
+  uint32_t ventanaId;
+  uint16_t count;
+  uint16_t reserved;
+};
+
+struct __attribute__((packed)) LecturaRecord {
+  uint32_t seq;
+  float heartRate;
+  float accelX, accelY, accelZ;
+  float gyroX, gyroY, gyroZ;
+};
+
+LecturaRecord batchBuffer[BATCH_SIZE];
+int batchCount = 0;
+uint32_t sampleSeq = 0;
+
 // Heart rate variables
 const int SAMPLE_SIZE = 10;
 int hrSamples[SAMPLE_SIZE];
@@ -69,6 +109,8 @@ void setup() {
 // Use "default" device ID to match Django backend
   DEVICE_ID = "default";
   
+  INGEST_ID = DEVICE_ID + "-" + String(esp_random(), HEX);
+  
   Serial.println("Device ID: " + DEVICE_ID);
   Serial.println();
   
@@ -162,7 +204,7 @@ void loop() {
   }
   
   // Poll for active session
-  if (currentTime - lastPollTime >= POLL_INTERVAL) {
+  if (currentTime - lastPollTime >= pollInterval && !isBackingOff()) {
     lastPollTime = currentTime;
     checkForActiveSession();
   }
@@ -188,7 +230,7 @@ void loop() {
   }
   
   // Read and send sensor data
-  if (currentTime - lastSendTime >= SEND_INTERVAL) {
+  if (currentTime - lastSendTime >= sendInterval) {
     lastSendTime = currentTime;
     
     // Read sensors
@@ -208,7 +250,11 @@ void loop() {
     printSensorReadings(bpm, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z);
     
     // Send data to Django
-    sendDataToDjango(bpm, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z);
+    if (USE_BINARY_BATCH) {
+      bufferSample(bpm, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z);
+    } else {
+      sendDataToDjango(bpm, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z);
+    }
   }
   
   delay(100);
@@ -226,6 +272,7 @@ void checkForActiveSession() {
   HTTPClient http;
   http.begin(checkSessionUrl);
   http.addHeader("Content-Type", "application/json");
+  http.collectHeaders(PACING_HEADERS, 2);
   http.setTimeout(5000);
   
   StaticJsonDocument<256> doc;
@@ -235,6 +282,7 @@ void checkForActiveSession() {
   serializeJson(doc, jsonString);
   
   int httpResponseCode = http.POST(jsonString);
+  applyServerPacing(http, httpResponseCode, &pollInterval);
   
   if (httpResponseCode == 200) {
     String response = http.getString();
@@ -286,6 +334,7 @@ void checkForActiveSession() {
 }
 
 void endSession() {
+  batchCount = 0;
   hasActiveSession = false;
   sessionId = "";
   consumidorId = 0;
@@ -310,6 +359,7 @@ void extendWindow() {
   HTTPClient http;
   http.begin(extendWindowUrl);
   http.addHeader("Content-Type", "application/json");
+  http.collectHeaders(PACING_HEADERS, 2);
   
   StaticJsonDocument<256> doc;
   doc["ventana_id"] = ventanaId;
@@ -318,6 +368,7 @@ void extendWindow() {
   serializeJson(doc, jsonString);
   
   int httpResponseCode = http.POST(jsonString);
+  applyServerPacing(http, httpResponseCode, NULL);
   
   if (httpResponseCode == 200) {
     Serial.println("✓ Window extended");
@@ -383,17 +434,23 @@ void printSensorReadings(float hr, float ax, float ay, float az,
 void sendDataToDjango(float heart_rate, float accel_x, float accel_y, 
                       float accel_z, float gyro_x, float gyro_y, float gyro_z) {
   
-  if (WiFi.status() != WL_CONNECTED || !hasActiveSession) {
+  if (WiFi.status() != WL_CONNECTED || !hasActiveSession || isBackingOff()) {
     return;
   }
   
+  // Same seq on every attempt, so a retried sample is only stored once
+  uint32_t seq = sampleSeq++;
+  
   HTTPClient http;
   http.begin(lecturasUrl);
   http.addHeader("Content-Type", "application/json");
+  http.addHeader("X-Device-Id", INGEST_ID);
+  http.collectHeaders(PACING_HEADERS, 2);
   http.setTimeout(10000);
   
   StaticJsonDocument<512> doc;
   doc["ventana"] = ventanaId;
+  doc["seq"] = seq;
   doc["heart_rate"] = round(heart_rate * 100) / 100.0;
   doc["accel_x"] = round(accel_x * 1000) / 1000.0;
   doc["accel_y"] = round(accel_y * 1000) / 1000.0;
@@ -406,8 +463,15 @@ void sendDataToDjango(float heart_rate, float accel_x, float accel_y,
   serializeJson(doc, jsonString);
   
   int httpResponseCode = http.POST(jsonString);
+  if (httpResponseCode == -1) {
+    // Timeout: the server may have stored it already, the seq makes this safe
+    httpResponseCode = http.POST(jsonString);
+  }
+  applyServerPacing(http, httpResponseCode, &sendInterval);
   
-  if (httpResponseCode == 201) {
+  if (httpResponseCode == 200) {
+    Serial.println("✓ Data already received (retry)");
+  } else if (httpResponseCode == 201 || httpResponseCode == 202) {
     Serial.println("✓ Data sent successfully");
   } else {
     Serial.println("✗ Failed to send: " + String(httpResponseCode));
@@ -422,10 +486,98 @@ void sendDataToDjango(float heart_rate, float accel_x, float accel_y,
   http.end();
 }
 
+void bufferSample(float heart_rate, float accel_x, float accel_y,
+                  float accel_z, float gyro_x, float gyro_y, float gyro_z) {
+  if (batchCount >= BATCH_SIZE) {
+    // Previous send failed (timeout): retry once, then drop the stale batch
+    sendBatchToDjango();
+    if (batchCount >= BATCH_SIZE) {
+      Serial.println("⚠ Batch buffer full, dropping unsent readings");
+      batchCount = 0;
+    }
+  }
+
+  LecturaRecord& record = batchBuffer[batchCount++];
+  record.seq = sampleSeq++;
+  record.heartRate = heart_rate;
+  record.accelX = accel_x;
+  record.accelY = accel_y;
+  record.accelZ = accel_z;
+  record.gyroX = gyro_x;
+  record.gyroY = gyro_y;
+  record.gyroZ = gyro_z;
+  
+  if (batchCount >= BATCH_SIZE) {
+    sendBatchToDjango();
+  }
+}
+
+void sendBatchToDjango() {
+  if (WiFi.status() != WL_CONNECTED || !hasActiveSession || batchCount == 0 || isBackingOff()) {
+    return;
+  }
+  
+  static uint8_t payload[sizeof(LecturaBatchHeader) + sizeof(LecturaRecord) * BATCH_SIZE];
+  
+  LecturaBatchHeader header;
+  header.magic[0] = 'W';
+  header.magic[1] = 'B';
+  header.version = 1;
+  header.flags = 0;
+  header.ventanaId = ventanaId;
+  header.count = batchCount;
+  header.reserved = 0;
+  
+  size_t size = sizeof(header) + sizeof(LecturaRecord) * batchCount;
+  memcpy(payload, &header, sizeof(header));
+  memcpy(payload + sizeof(header), batchBuffer, sizeof(LecturaRecord) * batchCount);
+  
+  HTTPClient http;
+  http.begin(lecturasBatchUrl);
+  http.addHeader("Content-Type", "application/vnd.wearable.lecturas");
+  http.addHeader("X-Device-Id", INGEST_ID);
+  http.collectHeaders(PACING_HEADERS, 2);
+  http.setTimeout(10000);
+  
+  int httpResponseCode = http.POST(payload, size);
+  applyServerPacing(http, httpResponseCode, NULL);
+  
+  if (httpResponseCode == 200 || httpResponseCode == 201 || httpResponseCode == 202) {
+    Serial.printf("✓ Batch of %d readings sent (%d bytes)\n", batchCount, (int)size);
+    batchCount = 0;
+  } else {
+    Serial.println("✗ Failed to send batch: " + String(httpResponseCode));
+    if (httpResponseCode > 0 && httpResponseCode != 429) {
+      Serial.println("  Server response: " + http.getString());
+      // Payload was rejected: drop it instead of retrying forever
+      batchCount = 0;
+    }
+  }
+  
+  http.end();
+}
+
 // ============================================
 // UTILITY FUNCTIONS
 // ============================================
 
+bool isBackingOff() {
+  return (long)(backoffUntil - millis()) > 0;
+}
+
+void applyServerPacing(HTTPClient& http, int httpResponseCode, unsigned long* interval) {
+  String hint = http.header("X-Send-Interval");
+  if (interval != NULL && hint.length() > 0 && hint.toInt() > 0) {
+    *interval = hint.toInt() * 1000UL;
+  }
+  
+  if (httpResponseCode == 429) {
+    unsigned long retryAfter = http.header("Retry-After").toInt() * 1000UL;
+    backoffUntil = millis() + max(retryAfter, 1000UL);
+    Serial.printf("⚠ Throttled by server, pausing for %lu s\n", retryAfter / 1000);
+  }
+}
+
 void connectToWiFi() {
   Serial.print("→ Connecting to WiFi: ");
   Serial.println(ssid);
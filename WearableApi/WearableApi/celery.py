@@ -1,9 +1,11 @@
 # Updated WearableApi/WearableApi/celery.py
 # Adds periodic tasks for ventana calculations
 
+import logging
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_ready, worker_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WearableApi.settings')
 app = Celery('WearableApi')
@@ -30,6 +32,40 @@ app.conf.beat_schedule = {
         }
     },
     
+    # Copy readings buffered in Redis Streams into PostgreSQL
+    # (no-op unless LECTURA_INGESTION_MODE = 'stream'; skipped while the
+    # previous run is still draining)
+    'drain-lectura-streams': {
+        'task': 'api.tasks.drain_lectura_streams',
+        'schedule': 2.0,
+        'options': {
+            'expires': 10.0,
+        }
+    },
+    
+    # Aggregate new readings into the 1m / 5m / 1h rollup tables
+    'roll-up-sensor-data': {
+        'task': 'api.tasks.roll_up_sensor_data',
+        'schedule': 60.0,
+        'options': {
+            'expires': 50.0,
+        }
+    },
+    
+    # Pack readings of closed ventanas into compressed blobs
+    # (no-op unless LECTURA_BLOB_STORAGE = True)
+    'pack-closed-ventanas': {
+        'task': 'api.tasks.pack_closed_ventanas',
+        'schedule': crontab(minute='*/15'),
+    },
+    
+    # Pre-create lecturas partitions, drop the ones past retention
+    # and prune old rollup buckets
+    'maintain-lectura-partitions': {
+        'task': 'api.tasks.maintain_lectura_partitions',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    
     # Optional: Daily cleanup of old ventanas without data
     'cleanup-empty-ventanas': {
         'task': 'api.tasks.cleanup_empty_ventanas',
@@ -61,3 +97,45 @@ def debug_task(self):
     """Debug task to test Celery is working"""
     print(f'Request: {self.request!r}')
     return 'Celery is working!'
+
+# ============================================================
+# MODEL WARM-UP AND READINESS
+# ============================================================
+logger = logging.getLogger(__name__)
+
+def _warm_up_model(where):
+    from django.conf import settings
+    if not settings.ML_MODEL_WARMUP:
+        return
+    from api.services.prediction_service import warm_up
+    try:
+        result = warm_up()
+        logger.info(f"[WARMUP] {where} (pid {os.getpid()}): {result['model']} ready in {result['seconds']}s")
+    except Exception as e:
+        # No model trained yet: serve the other tasks, predictions will load it on demand
+        logger.warning(f"[WARMUP] {where} (pid {os.getpid()}): model not warmed up: {e}")
+
+@worker_init.connect
+def warm_up_worker(**kwargs):
+    """Before the pool forks: children share the loaded model copy-on-write."""
+    unmark_worker_ready()
+    _warm_up_model('worker')
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    """In each pool child, before its first task (also after worker_max_tasks_per_child)."""
+    _warm_up_model('child')
+
+@worker_ready.connect
+def mark_worker_ready(**kwargs):
+    from django.conf import settings
+    with open(settings.CELERY_WORKER_READY_FILE, 'w') as ready_file:
+        ready_file.write(str(os.getpid()))
+
+@worker_shutdown.connect
+def unmark_worker_ready(**kwargs):
+    from django.conf import settings
+    try:
+        os.remove(settings.CELERY_WORKER_READY_FILE)
+    except FileNotFoundError:
+        pass
@@ -65,7 +65,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.middleware.AsyncWhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -481,6 +481,11 @@ CELERY_TIMEZONE = 'America/Tijuana'
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_RESULT_EXPIRES = 60 * 60 * 24
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Shadow scoring of challenger models runs on its own queue, consumed by a
+# separate worker (celery -A WearableApi worker -Q shadow)
+CELERY_TASK_ROUTES = {
+    'api.tasks.shadow_score_batch': {'queue': 'shadow'},
+}
 
 SENTRY_DSN = os.environ.get('SENTRY_DSN')
 
@@ -524,6 +529,111 @@ if IS_RAILWAY or not DEBUG:
 ML_MODELS_DIR = os.path.join(BASE_DIR, 'models')
 os.makedirs(ML_MODELS_DIR, exist_ok=True)
 
+# Served model (api/ml/registry.py): loaded once per worker process and
+# reloaded when the file changes or train_model.py publishes a new version
+# under ML_MODEL_VERSION_KEY. ML_MODEL_MMAP memory-maps the model's arrays
+# so prefork children share them.
+ML_MODEL_PATH = os.environ.get('ML_MODEL_PATH', os.path.join(ML_MODELS_DIR, 'smoking_craving_model.pkl'))
+ML_MODEL_MMAP = os.environ.get('ML_MODEL_MMAP', 'True') == 'True'
+ML_MODEL_CHECK_SECONDS = 30
+ML_MODEL_VERSION_KEY = 'ml_model:version'
+# Serve the NumPy-only compile of the model (api/ml/compiled.py), the .npz
+# train_model.py writes next to ML_MODEL_PATH, when it exists.
+ML_MODEL_COMPILED = os.environ.get('ML_MODEL_COMPILED', 'True') == 'True'
+# Celery workers load the model and score a dummy row at startup, in the
+# prefork parent (children inherit it copy-on-write) and again in each child
+# before it takes tasks. CELERY_WORKER_READY_FILE exists only once the
+# worker has warmed up and is consuming (container healthcheck).
+ML_MODEL_WARMUP = os.environ.get('ML_MODEL_WARMUP', 'True') == 'True'
+CELERY_WORKER_READY_FILE = os.environ.get('CELERY_WORKER_READY_FILE', '/tmp/celery_worker_ready')
+
+# Micro-batched predictions (api/services/prediction_service.py): a batch is
+# scored once this many requests wait, or this long after the first one.
+PREDICTION_BATCH_MAX_SIZE = int(os.environ.get('PREDICTION_BATCH_MAX_SIZE', '256'))
+PREDICTION_BATCH_WAIT_SECONDS = float(os.environ.get('PREDICTION_BATCH_WAIT_SECONDS', '2'))
+
+# POST /api/predict/: 'sync' scores in the request with the model the web
+# process holds and stored features (falling back to Celery otherwise, or
+# past the budget); 'async' always queues the Celery task. Clients can pick
+# per request with mode=.
+PREDICTION_DEFAULT_MODE = os.environ.get('PREDICTION_DEFAULT_MODE', 'async')
+PREDICTION_SYNC_BUDGET_MS = float(os.environ.get('PREDICTION_SYNC_BUDGET_MS', '50'))
+
+# Shadow evaluation (api/services/shadow_service.py): challenger models in
+# ML_CHALLENGERS_DIR score the champion's windows on the 'shadow' queue,
+# SHADOW_BATCH_SIZE at a time or SHADOW_BATCH_WAIT_SECONDS after the first.
+# At most SHADOW_QUEUE_MAX windows wait. A window counts as a craving for
+# calibration when the consumer reports one within the window or
+# SHADOW_OUTCOME_HORIZON_MINUTES after it.
+ML_CHALLENGERS_DIR = os.environ.get('ML_CHALLENGERS_DIR', os.path.join(ML_MODELS_DIR, 'challengers'))
+SHADOW_BATCH_SIZE = int(os.environ.get('SHADOW_BATCH_SIZE', '1000'))
+SHADOW_BATCH_WAIT_SECONDS = float(os.environ.get('SHADOW_BATCH_WAIT_SECONDS', '30'))
+SHADOW_QUEUE_MAX = int(os.environ.get('SHADOW_QUEUE_MAX', '100000'))
+SHADOW_OUTCOME_HORIZON_MINUTES = int(os.environ.get('SHADOW_OUTCOME_HORIZON_MINUTES', '30'))
+
+# ============================================================
+# SENSOR INGESTION
+# ============================================================
+# Maximum number of readings accepted by POST /api/lecturas/batch/
+LECTURA_BATCH_MAX_SIZE = int(os.environ.get('LECTURA_BATCH_MAX_SIZE', '500'))
+
+# Redis used directly (streams, bitmaps, Lua) besides the cache and broker
+REDIS_URL = os.environ.get('REDIS_URL', CELERY_BROKER_URL)
+
+# 'sync' stores readings inside the request; 'stream' appends them to Redis
+# Streams and the drain_lectura_streams task copies them into PostgreSQL
+LECTURA_INGESTION_MODE = os.environ.get('LECTURA_INGESTION_MODE', 'sync')
+LECTURA_STREAM_SHARDS = int(os.environ.get('LECTURA_STREAM_SHARDS', '4'))
+LECTURA_STREAM_BATCH_SIZE = int(os.environ.get('LECTURA_STREAM_BATCH_SIZE', '5000'))
+# A drain run spends up to LECTURA_STREAM_DRAIN_SECONDS on each shard in
+# turn; beat runs that start before it finishes return at once
+LECTURA_STREAM_DRAIN_SECONDS = 30
+LECTURA_STREAM_LOCK_TIMEOUT = 120
+
+# lecturas is range-partitioned on created_at ('day' or 'week', UTC).
+# maintain_lectura_partitions keeps partitions LECTURA_PARTITIONS_AHEAD_DAYS
+# ahead and drops those older than LECTURA_RETENTION_DAYS (0 keeps all).
+LECTURA_PARTITION_INTERVAL = os.environ.get('LECTURA_PARTITION_INTERVAL', 'day')
+LECTURA_PARTITIONS_AHEAD_DAYS = 7
+LECTURA_RETENTION_DAYS = int(os.environ.get('LECTURA_RETENTION_DAYS', '0'))
+
+# Per-consumer rollups of lecturas (1m / 5m / 1h). Readings younger than
+# SENSOR_ROLLUP_LAG_SECONDS are left for the next run; in stream mode the
+# watermark also waits for every reading still buffered in Redis. Rollups
+# outlive the raw partitions; 0 keeps a tier forever.
+SENSOR_ROLLUP_LAG_SECONDS = 180
+SENSOR_ROLLUP_RETENTION_DAYS = {'1m': 30, '5m': 365, '1h': 0}
+
+# Compact storage: readings of windows closed for LECTURA_BLOB_PACK_AFTER_MINUTES
+# are moved into one compressed columnar blob per ventana (api/services/
+# sample_store.py). zstd is used when the optional zstandard package is
+# installed, zlib otherwise. Packed readings leave the lecturas table: the
+# raw-row endpoints (/api/lecturas/, dashboard/sensor-data/) only list
+# unpacked ones. Counts use Ventana.lectura_count, the export, snapshot and
+# feature paths read the blobs too, and rollups are built before packing.
+LECTURA_BLOB_STORAGE = os.environ.get('LECTURA_BLOB_STORAGE', 'False') == 'True'
+LECTURA_BLOB_PACK_AFTER_MINUTES = 120
+
+# Local Parquet snapshot of lecturas (api/services/dataset_service.py),
+# refreshed with `manage.py snapshot_lecturas` and read by
+# `train_model.py --snapshot` and notebooks instead of the database.
+DATASET_SNAPSHOT_DIR = os.environ.get('DATASET_SNAPSHOT_DIR', str(BASE_DIR / 'datasets' / 'lecturas'))
+
+# Process pool size of `manage.py recompute_ventanas` (api/services/
+# recompute_service.py). Celery workers always compute inline.
+VENTANA_RECOMPUTE_WORKERS = int(os.environ.get('VENTANA_RECOMPUTE_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+
+# Token buckets for the unauthenticated device endpoints (api/throttling.py),
+# keyed by device. capacity = burst, refill_rate = tokens/second,
+# send_interval = upload period (seconds) the firmware is told to use.
+DEVICE_THROTTLE_ENABLED = os.environ.get('DEVICE_THROTTLE_ENABLED', 'True') == 'True'
+DEVICE_THROTTLE_BUCKETS = {
+    'lecturas': {'capacity': 20, 'refill_rate': 1.0, 'send_interval': 10},
+    'lecturas_batch': {'capacity': 5, 'refill_rate': 0.2, 'send_interval': 60},
+    'check_session': {'capacity': 6, 'refill_rate': 0.2, 'send_interval': 10},
+    'extend_window': {'capacity': 3, 'refill_rate': 0.01, 'send_interval': 1800},
+}
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
@@ -169,17 +169,17 @@ class LecturaInline(admin.TabularInline):
 @admin.register(Ventana)
 class VentanaAdmin(admin.ModelAdmin):
     
-    list_display = ['id', 'get_consumidor', 'window_start', 'window_end', 'hr_mean', 'duration_minutes']
+    list_display = ['id', 'get_consumidor', 'window_start', 'window_end', 'hr_mean', 'lectura_count', 'duration_minutes']
     list_filter = ['window_start', 'created_at']
     search_fields = ['consumidor__usuario__nombre']
-    readonly_fields = ['duration_minutes', 'has_sensor_data', 'has_embeddings', 'created_at', 'updated_at']
+    readonly_fields = ['duration_minutes', 'has_sensor_data', 'has_embeddings', 'lectura_count', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Basic Info', {
             'fields': ('consumidor', 'window_start', 'window_end', 'duration_minutes')
         }),
         ('Sensor Data', {
-            'fields': ('hr_mean', 'hr_std', 'gyro_energy', 'accel_energy', 'has_sensor_data')
+            'fields': ('hr_mean', 'hr_std', 'gyro_energy', 'accel_energy', 'lectura_count', 'has_sensor_data')
         }),
         ('Embeddings', {
             'fields': ('emotion_embedding', 'motive_embedding', 'solution_embedding', 'has_embeddings'),
@@ -282,3 +282,28 @@ admin.site.site_header = "Health Tracker Administration"
 admin.site.site_title = "Health Tracker Admin"
 admin.site.index_title = "Welcome to Health Tracker Admin Portal"
 
+
+@admin.register(ProcessingCheckpoint)
+class ProcessingCheckpointAdmin(admin.ModelAdmin):
+    
+    list_display = ['key', 'position', 'updated_at']
+    search_fields = ['key']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(SensorRollupMinute, SensorRollupFiveMinute, SensorRollupHour)
+class SensorRollupAdmin(admin.ModelAdmin):
+    
+    list_display = ['consumidor', 'bucket_start', 'sample_count', 'hr_mean', 'hr_min', 'hr_max']
+    list_filter = ['bucket_start']
+    search_fields = ['consumidor__usuario__nombre']
+    date_hierarchy = 'bucket_start'
+
+
+@admin.register(VentanaSampleBlob)
+class VentanaSampleBlobAdmin(admin.ModelAdmin):
+    
+    list_display = ['ventana', 'sample_count', 'codec', 'raw_size', 'created_at']
+    list_filter = ['codec']
+    exclude = ['data']
+    readonly_fields = ['ventana', 'sample_count', 'codec', 'raw_size', 'created_at', 'updated_at']
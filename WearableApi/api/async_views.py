@@ -0,0 +1,139 @@
+"""
+Async-native ingestion endpoint for ESP32 devices.
+
+Runs on Daphne's event loop: admission control, the duplicate check, the
+ventana accumulator and the WebSocket fan-out await Redis and the channel
+layer directly. Only the insert (one transaction together with the
+ventana reading counter) and the occasional statistics refresh go through
+the ORM's thread.
+"""
+import json
+import logging
+import math
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from api.serializers import LecturaIngestSerializer
+from api.services import (
+    LecturaIngestionService, LecturaStreamBuffer, VentanaCache, VentanaStatsAccumulator
+)
+from api.throttling import DeviceTokenBucketThrottle
+
+logger = logging.getLogger(__name__)
+
+
+def _response(data, status, send_interval=None, retry_after=None):
+    response = JsonResponse(data, status=status)
+    if send_interval is not None:
+        response['X-Send-Interval'] = str(send_interval)
+    if retry_after is not None:
+        response['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def ingest_lectura(request):
+    """
+    Async counterpart of POST /api/lecturas/ for ESP32 devices
+    
+    POST /api/ingest/lecturas/
+    Same body, headers and responses as LecturaViewSet.create:
+    201 stored, 202 queued (stream mode), 200 duplicate, 429 throttled.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        return _response({'error': 'Invalid JSON body'}, 400)
+    if not isinstance(data, dict):
+        return _response({'error': 'Expected a JSON object'}, 400)
+    
+    ventana_id = data.get('ventana') or data.get('ventana_id')
+    device_id = request.headers.get('X-Device-Id') or data.get('device_id')
+    
+    if device_id:
+        ident = f'device:{device_id}'
+    elif ventana_id:
+        ident = f'ventana:{ventana_id}'
+    else:
+        ident = f"ip:{request.META.get('REMOTE_ADDR')}"
+    
+    allowed, wait, send_interval = await DeviceTokenBucketThrottle.aconsume('lecturas', ident)
+    if not allowed:
+        return _response({
+            'detail': 'Request was throttled.',
+            'retry_after': math.ceil(wait),
+            'send_interval': send_interval,
+        }, 429, send_interval, wait)
+    
+    if not ventana_id:
+        return _response({'error': 'ventana_id is required'}, 400, send_interval)
+    
+    serializer = LecturaIngestSerializer(data={**data, 'ventana': ventana_id, 'device_id': device_id})
+    if not serializer.is_valid():
+        return _response({'error': 'Invalid lectura', 'detail': serializer.errors}, 400, send_interval)
+    sample = serializer.validated_data
+    
+    ventana = await VentanaCache.aget(sample['ventana'])
+    if ventana is None:
+        return _response({
+            'error': f'Ventana with id {ventana_id} does not exist'
+        }, 404, send_interval)
+    
+    samples, duplicates = await LecturaIngestionService.aclaim_sequences(device_id, ventana.id, [sample])
+    if duplicates:
+        return _response({
+            'status': 'duplicate',
+            'ventana_id': ventana.id,
+            'accepted': 0,
+            'duplicates': duplicates,
+            'message': 'Sensor data already received'
+        }, 200, send_interval)
+    
+    try:
+        if LecturaStreamBuffer.is_enabled():
+            await sync_to_async(LecturaStreamBuffer.append)(ventana, samples, device_id)
+            return _response({
+                'status': 'accepted',
+                'ventana_id': ventana.id,
+                'queued': 1,
+                'accepted': 1,
+                'duplicates': 0,
+                'message': 'Sensor data queued for storage'
+            }, 202, send_interval)
+        
+        lecturas, lectura_count = await sync_to_async(LecturaIngestionService.store_batch)(
+            ventana, samples, device_id
+        )
+    except Exception as e:
+        await sync_to_async(LecturaIngestionService.release_sequences)(device_id, ventana.id, samples)
+        logger.error(f"Error creating lectura: {str(e)}")
+        return _response({
+            'error': 'Failed to create lectura',
+            'detail': str(e)
+        }, 400, send_interval)
+    
+    lectura = lecturas[0]
+    logger.info(f"✓ Lectura created (async): ID={lectura.id}, Ventana={ventana.id}, count={lectura_count}")
+    
+    await VentanaStatsAccumulator.aadd(ventana.id, lecturas)
+    
+    if LecturaIngestionService.crossed_calculation_threshold(lectura_count - 1, lectura_count):
+        await sync_to_async(LecturaIngestionService.maybe_calculate_statistics)(
+            ventana.id, lectura_count - 1, lectura_count
+        )
+    
+    await LecturaIngestionService.abroadcast(ventana.consumidor_id, lecturas)
+    
+    return _response({
+        'status': 'success',
+        'id': lectura.id,
+        'ventana_id': ventana.id,
+        'accepted': 1,
+        'duplicates': 0,
+        'message': 'Sensor data saved successfully',
+        'data': LecturaIngestionService.lectura_payload(lectura)
+    }, 201, send_interval)
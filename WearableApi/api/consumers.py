@@ -202,7 +202,7 @@ class SensorDataConsumer(AsyncWebsocketConsumer):
     async def sensor_update(self, event):
         """Recibir actualización de sensor desde channel layer"""
         try:
-            lectura = event.get('lectura', event.get('data'))
+            lectura = event.get('lecturas') or event.get('lectura', event.get('data'))
             # Asegurar que sea array
             if not isinstance(lectura, list):
                 lectura = [lectura]
@@ -224,7 +224,7 @@ class SensorDataConsumer(AsyncWebsocketConsumer):
             
             lecturas = Lectura.objects.filter(
                 ventana__consumidor=consumidor
-            ).select_related('ventana').order_by('-created_at')[:10]
+            ).select_related('ventana').newest(10)
             
             return [{
                 'id': l.id,
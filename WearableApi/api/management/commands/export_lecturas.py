@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.services import LecturaExportService
+from api.services.export_service import FORMATS
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream lecturas to a file (or stdout) as CSV or NDJSON, straight from "
+        "PostgreSQL's COPY, in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=list(FORMATS), default='csv',
+                            help='Export format')
+        parser.add_argument('--consumidor', type=int,
+                            help='Only readings of this consumer')
+        parser.add_argument('--start', help='Readings created at or after this ISO 8601 datetime')
+        parser.add_argument('--end', help='Readings created before this ISO 8601 datetime')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Compress the output with gzip')
+        parser.add_argument('-o', '--file', default='-',
+                            help="Destination path ('-' for stdout)")
+
+    def _moment(self, value):
+        if not value:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f"'{value}' is not an ISO 8601 datetime")
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+    def handle(self, *args, **options):
+        chunks = LecturaExportService.stream(
+            options['output'],
+            consumidor_id=options['consumidor'],
+            start=self._moment(options['start']),
+            end=self._moment(options['end']),
+            compress=options['gzip']
+        )
+
+        destination = sys.stdout.buffer if options['file'] == '-' else open(options['file'], 'wb')
+        written = 0
+        try:
+            for chunk in chunks:
+                destination.write(chunk)
+                written += len(chunk)
+        finally:
+            if destination is not sys.stdout.buffer:
+                destination.close()
+
+        if options['file'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['file']}"))
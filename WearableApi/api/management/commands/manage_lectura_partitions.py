@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import LecturaPartitionManager
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-create the upcoming partitions of lecturas and detach/drop the "
+        "ones older than the retention period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=settings.LECTURA_PARTITIONS_AHEAD_DAYS,
+                            help='Days of partitions to keep created ahead of now')
+        parser.add_argument('--retention-days', type=int, default=settings.LECTURA_RETENTION_DAYS,
+                            help='Remove partitions entirely older than this (0 keeps everything)')
+        parser.add_argument('--detach-only', action='store_true',
+                            help='Detach expired partitions but keep them as standalone tables')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report which partitions would be removed')
+        parser.add_argument('--list', action='store_true',
+                            help='List the current partitions and exit')
+
+    def handle(self, *args, **options):
+        if not LecturaPartitionManager.is_partitioned():
+            raise CommandError("lecturas is not a partitioned table (PostgreSQL, migration 0010)")
+
+        if options['list']:
+            for partition in LecturaPartitionManager.partitions():
+                self.stdout.write(
+                    f"{partition['name']}: {partition['start'].isoformat()} -> {partition['end'].isoformat()}"
+                )
+            return
+
+        if options['dry_run']:
+            expired = LecturaPartitionManager.drop_expired(options['retention_days'], dry_run=True)
+            self.stdout.write(f"Would remove {len(expired)} partitions: {', '.join(expired) or '-'}")
+            return
+
+        created = LecturaPartitionManager.ensure_partitions(options['ahead'])
+        expired = LecturaPartitionManager.drop_expired(
+            options['retention_days'], detach_only=options['detach_only']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} partitions ({', '.join(created) or '-'}), "
+            f"{'detached' if options['detach_only'] else 'dropped'} {len(expired)} "
+            f"({', '.join(expired) or '-'})"
+        ))
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.services import ShadowEvaluationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare challenger models with the champion on the windows they "
+        "shadow-scored: agreement, calibration and scoring latency."
+    )
+
+    COLUMNS = ('windows', 'agreement', 'risk_agreement', 'mean_abs_diff', 'mean_probability',
+               'reported_rate', 'brier', 'ece', 'latency_us_mean', 'latency_us_p95')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Windows scored in the last N days')
+        parser.add_argument('--by-day', action='store_true', help='Also print one line per model and day')
+
+    def _line(self, name, summary):
+        values = '  '.join(f"{column}={summary[column]}" for column in self.COLUMNS)
+        return f"{name:<50} {values}"
+
+    def handle(self, *args, **options):
+        report = ShadowEvaluationService.report(timezone.now() - timedelta(days=options['days']))
+        if not report['models']:
+            self.stdout.write(self.style.WARNING(f"No shadow predictions in the last {options['days']} days"))
+            return
+
+        for summary in report['models']:
+            name = f"{'[champion] ' if summary['is_champion'] else ''}{summary['modelo']}"
+            self.stdout.write(self._line(name, summary))
+
+        if options['by_day']:
+            self.stdout.write('')
+            for summary in report['days']:
+                self.stdout.write(self._line(f"{summary['day']} {summary['modelo']}", summary))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.services import LecturaDatasetSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Append the lecturas created since the last snapshot to the local "
+        "Parquet dataset (partitioned by consumer and day)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Snapshot directory (default: DATASET_SNAPSHOT_DIR)')
+        parser.add_argument('--since', help='Start of an empty snapshot (ISO 8601; default: oldest reading)')
+        parser.add_argument('--until', help='Stop at this ISO 8601 datetime (default: now minus the rollup lag)')
+        parser.add_argument('--full', action='store_true',
+                            help='Delete the snapshot and rebuild it from scratch')
+        parser.add_argument('--compact', action='store_true',
+                            help='Merge the parts of finished days into one file each')
+
+    def _moment(self, value):
+        if not value:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f"'{value}' is not an ISO 8601 datetime")
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+    def handle(self, *args, **options):
+        snapshot = LecturaDatasetSnapshot(options['dir'])
+
+        if options['full']:
+            snapshot.reset()
+
+        try:
+            result = snapshot.update(until=self._moment(options['until']), since=self._moment(options['since']))
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Appended {result['rows']} readings to {snapshot.root} (watermark {result['watermark']})"
+        ))
+
+        if options['compact']:
+            compacted = snapshot.compact()
+            self.stdout.write(f"Compacted {compacted} day partitions")
@@ -0,0 +1,84 @@
+import math
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.ml import statistics_from_aggregates
+from api.models import Ventana
+from api.services import VentanaAggregationService, VentanaStatsAccumulator
+from api.tasks import _calculate_ventana_statistics_sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the running ventana accumulators against a full rescan of "
+        "their lecturas, and optionally rewrite the statistics from the rescan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ventana_ids', nargs='*', type=int,
+                            help='Ventanas to check (default: windows of the last --hours)')
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Look-back when no ventana IDs are given')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Recompute statistics from a full rescan and rebuild the accumulators')
+        parser.add_argument('--tolerance', type=float, default=1e-6,
+                            help='Relative tolerance when comparing statistics')
+
+    def handle(self, *args, **options):
+        if options['ventana_ids']:
+            ventanas = Ventana.objects.filter(id__in=options['ventana_ids'])
+        else:
+            since = timezone.now() - timedelta(hours=options['hours'])
+            ventanas = Ventana.objects.filter(window_start__gte=since)
+
+        checked = mismatched = missing = 0
+
+        ventanas = list(ventanas.order_by('id').only('id', 'created_at'))
+        # One GROUP BY per batch of windows instead of a rescan per window
+        aggregates = VentanaAggregationService.aggregate(ventanas)
+
+        for ventana in ventanas:
+            ventana_id = ventana.id
+            window = aggregates.get(ventana_id, {'n': 0})
+            if options['backfill']:
+                result = _calculate_ventana_statistics_sync(ventana_id, rescan=True, aggregates=window)
+                if result.get('success'):
+                    self.stdout.write(f"Ventana {ventana_id}: {result['statistics']}")
+                checked += 1
+                continue
+
+            stored = int(window['n'])
+            if not stored:
+                continue
+            checked += 1
+
+            accumulator = VentanaStatsAccumulator.snapshot(ventana_id)
+            if accumulator is None or accumulator['n'] != stored:
+                missing += 1
+                self.stdout.write(self.style.WARNING(
+                    f"Ventana {ventana_id}: accumulator covers "
+                    f"{accumulator['n'] if accumulator else 0}/{stored} readings"
+                ))
+                continue
+
+            expected = statistics_from_aggregates(window)
+            actual = VentanaStatsAccumulator.statistics(accumulator)
+
+            for field, value in expected.items():
+                if value is None and actual[field] is None:
+                    continue
+                if (value is None or actual[field] is None or
+                        not math.isclose(value, actual[field],
+                                         rel_tol=options['tolerance'], abs_tol=1e-9)):
+                    mismatched += 1
+                    self.stdout.write(self.style.ERROR(
+                        f"Ventana {ventana_id}: {field} accumulator={actual[field]} rescan={value}"
+                    ))
+                    break
+
+        summary = f"Checked {checked} ventanas"
+        if not options['backfill']:
+            summary += f", {missing} without a complete accumulator, {mismatched} mismatched"
+        self.stdout.write(self.style.SUCCESS(summary))
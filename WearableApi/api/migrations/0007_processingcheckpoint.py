@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_consumidor_is_simulating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp when the record was last updated')),
+                ('key', models.CharField(help_text='Name of the pipeline or stream this checkpoint belongs to', max_length=100, unique=True)),
+                ('position', models.CharField(help_text='Last committed position (stream ID, timestamp or row ID)', max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Processing Checkpoint',
+                'verbose_name_plural': 'Processing Checkpoints',
+                'db_table': 'processing_checkpoints',
+                'ordering': ['key'],
+            },
+        ),
+    ]
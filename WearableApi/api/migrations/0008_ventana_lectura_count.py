@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_lectura_count(apps, schema_editor):
+    Ventana = apps.get_model('api', 'Ventana')
+    Lectura = apps.get_model('api', 'Lectura')
+    
+    counts = (
+        Lectura.objects.filter(ventana=OuterRef('pk'))
+        .order_by()
+        .values('ventana')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Ventana.objects.update(lectura_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_processingcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventana',
+            name='lectura_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of readings stored in the window (maintained on insert)'),
+        ),
+        migrations.RunPython(backfill_lectura_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_ventana_lectura_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lectura',
+            name='device_id',
+            field=models.CharField(blank=True, help_text='Sender of the reading (scope of the sequence number)', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='lectura',
+            name='seq',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Per-device sample sequence number, used to drop retried uploads', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lectura',
+            index=models.Index(fields=['device_id', 'seq'], name='lecturas_device__9f4548_idx'),
+        ),
+    ]
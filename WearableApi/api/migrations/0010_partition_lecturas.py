@@ -0,0 +1,136 @@
+"""
+Turn lecturas into a table range-partitioned on created_at.
+
+PostgreSQL only (no-op elsewhere). The primary key becomes (id, created_at),
+since a partitioned table's unique constraints must include the partition
+key; id keeps being unique through its sequence, so the ORM still treats it
+as the primary key. Existing rows are copied into one partition per
+interval, with a default partition catching anything outside the
+pre-created ranges. The column defaults and triggers DB.sql puts on
+lecturas (created_at/updated_at DEFAULT NOW(), trg_lecturas_update_timestamp)
+are carried over to the new parent table. Later partitions are managed by LecturaPartitionManager
+(manage_lectura_partitions / maintain_lectura_partitions).
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations
+
+ON_TABLE = re.compile(r' ON (ONLY )?\S+ USING ')
+TRIGGER_ON_TABLE = re.compile(r' ON \S+ ')
+
+
+def _interval_days():
+    return 7 if getattr(settings, 'LECTURA_PARTITION_INTERVAL', 'day') == 'week' else 1
+
+
+def _floor(moment):
+    day = moment.astimezone(dt_timezone.utc).date()
+    if _interval_days() == 7:
+        day -= timedelta(days=day.weekday())
+    return datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+
+
+def _literal(moment):
+    return moment.strftime("'%Y-%m-%d %H:%M:%S+00'")
+
+
+def _swap_table(cursor, partitioned):
+    """Rebuild lecturas as a partitioned (or plain) copy of itself."""
+    cursor.execute("LOCK TABLE lecturas IN ACCESS EXCLUSIVE MODE")
+    cursor.execute("ALTER TABLE lecturas RENAME TO lecturas_old")
+
+    # Indexes, the ventana FK, column defaults and triggers are recreated
+    # under their current names
+    cursor.execute("""
+        SELECT indexdef FROM pg_indexes
+        WHERE tablename = 'lecturas_old'
+          AND indexname NOT IN (
+              SELECT conname FROM pg_constraint
+              WHERE conrelid = 'lecturas_old'::regclass AND contype = 'p'
+          )
+    """)
+    indexes = [ON_TABLE.sub(' ON lecturas USING ', row[0]) for row in cursor.fetchall()]
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = 'lecturas_old'::regclass AND contype = 'f'
+    """)
+    foreign_keys = cursor.fetchall()
+    # id gets a new sequence below
+    cursor.execute("""
+        SELECT a.attname, pg_get_expr(d.adbin, d.adrelid) FROM pg_attrdef d
+        JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+        WHERE d.adrelid = 'lecturas_old'::regclass AND a.attname <> 'id'
+    """)
+    defaults = cursor.fetchall()
+    cursor.execute("""
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = 'lecturas_old'::regclass AND NOT tgisinternal
+    """)
+    triggers = [TRIGGER_ON_TABLE.sub(' ON lecturas ', row[0], count=1) for row in cursor.fetchall()]
+
+    cursor.execute(
+        "CREATE TABLE lecturas (LIKE lecturas_old INCLUDING CONSTRAINTS)"
+        + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+    )
+
+    if partitioned:
+        cursor.execute("SELECT min(created_at) FROM lecturas_old")
+        oldest = cursor.fetchone()[0]
+        now = datetime.now(dt_timezone.utc)
+        start = _floor(oldest or now)
+        step = timedelta(days=_interval_days())
+        while start <= now + timedelta(days=7):
+            cursor.execute(
+                f"CREATE TABLE lecturas_p{start.strftime('%Y%m%d')} PARTITION OF lecturas "
+                f"FOR VALUES FROM ({_literal(start)}) TO ({_literal(start + step)})"
+            )
+            start += step
+        cursor.execute("CREATE TABLE lecturas_default PARTITION OF lecturas DEFAULT")
+
+    cursor.execute("INSERT INTO lecturas SELECT * FROM lecturas_old")
+    cursor.execute("DROP TABLE lecturas_old")
+
+    cursor.execute("CREATE SEQUENCE lecturas_id_seq OWNED BY lecturas.id")
+    cursor.execute("ALTER TABLE lecturas ALTER COLUMN id SET DEFAULT nextval('lecturas_id_seq')")
+    cursor.execute("SELECT setval('lecturas_id_seq', COALESCE(max(id), 0) + 1, false) FROM lecturas")
+    cursor.execute(
+        "ALTER TABLE lecturas ADD CONSTRAINT lecturas_pkey PRIMARY KEY "
+        + ("(id, created_at)" if partitioned else "(id)")
+    )
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE lecturas ADD CONSTRAINT {name} {definition}")
+    for definition in indexes:
+        cursor.execute(definition)
+    # Both recurse to the partitions (row triggers on partitioned tables
+    # need PostgreSQL 13+)
+    for column, expression in defaults:
+        cursor.execute(f"ALTER TABLE lecturas ALTER COLUMN {column} SET DEFAULT {expression}")
+    for definition in triggers:
+        cursor.execute(definition)
+
+
+def partition_lecturas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _swap_table(cursor, partitioned=True)
+
+
+def unpartition_lecturas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _swap_table(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_lectura_device_seq'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_lecturas, unpartition_lecturas),
+    ]
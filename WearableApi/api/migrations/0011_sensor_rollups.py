@@ -0,0 +1,113 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_partition_lecturas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorRollupFiveMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(help_text='Start of the aggregation bucket (UTC aligned)')),
+                ('sample_count', models.PositiveIntegerField(default=0, help_text='Readings in the bucket')),
+                ('hr_count', models.PositiveIntegerField(default=0, help_text='Readings with heart rate')),
+                ('hr_min', models.FloatField(blank=True, help_text='Minimum heart rate (BPM)', null=True)),
+                ('hr_max', models.FloatField(blank=True, help_text='Maximum heart rate (BPM)', null=True)),
+                ('hr_mean', models.FloatField(blank=True, help_text='Mean heart rate (BPM)', null=True)),
+                ('hr_m2', models.FloatField(default=0, help_text='Sum of squared deviations of heart rate')),
+                ('accel_count', models.PositiveIntegerField(default=0, help_text='Readings with accelerometer data')),
+                ('accel_min', models.FloatField(blank=True, help_text='Minimum accelerometer magnitude', null=True)),
+                ('accel_max', models.FloatField(blank=True, help_text='Maximum accelerometer magnitude', null=True)),
+                ('accel_mean', models.FloatField(blank=True, help_text='Mean accelerometer magnitude', null=True)),
+                ('accel_m2', models.FloatField(default=0, help_text='Sum of squared deviations of accelerometer magnitude')),
+                ('gyro_count', models.PositiveIntegerField(default=0, help_text='Readings with gyroscope data')),
+                ('gyro_min', models.FloatField(blank=True, help_text='Minimum gyroscope magnitude', null=True)),
+                ('gyro_max', models.FloatField(blank=True, help_text='Maximum gyroscope magnitude', null=True)),
+                ('gyro_mean', models.FloatField(blank=True, help_text='Mean gyroscope magnitude', null=True)),
+                ('gyro_m2', models.FloatField(default=0, help_text='Sum of squared deviations of gyroscope magnitude')),
+                ('consumidor', models.ForeignKey(help_text='Consumer the readings belong to', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.consumidor')),
+            ],
+            options={
+                'verbose_name': 'Sensor Rollup (5 min)',
+                'verbose_name_plural': 'Sensor Rollups (5 min)',
+                'db_table': 'sensor_rollups_5m',
+                'ordering': ['-bucket_start'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['bucket_start'], name='sensor_roll_bucket__0854ba_idx')],
+                'constraints': [models.UniqueConstraint(fields=('consumidor', 'bucket_start'), name='uniq_rollup_5m_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorRollupHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(help_text='Start of the aggregation bucket (UTC aligned)')),
+                ('sample_count', models.PositiveIntegerField(default=0, help_text='Readings in the bucket')),
+                ('hr_count', models.PositiveIntegerField(default=0, help_text='Readings with heart rate')),
+                ('hr_min', models.FloatField(blank=True, help_text='Minimum heart rate (BPM)', null=True)),
+                ('hr_max', models.FloatField(blank=True, help_text='Maximum heart rate (BPM)', null=True)),
+                ('hr_mean', models.FloatField(blank=True, help_text='Mean heart rate (BPM)', null=True)),
+                ('hr_m2', models.FloatField(default=0, help_text='Sum of squared deviations of heart rate')),
+                ('accel_count', models.PositiveIntegerField(default=0, help_text='Readings with accelerometer data')),
+                ('accel_min', models.FloatField(blank=True, help_text='Minimum accelerometer magnitude', null=True)),
+                ('accel_max', models.FloatField(blank=True, help_text='Maximum accelerometer magnitude', null=True)),
+                ('accel_mean', models.FloatField(blank=True, help_text='Mean accelerometer magnitude', null=True)),
+                ('accel_m2', models.FloatField(default=0, help_text='Sum of squared deviations of accelerometer magnitude')),
+                ('gyro_count', models.PositiveIntegerField(default=0, help_text='Readings with gyroscope data')),
+                ('gyro_min', models.FloatField(blank=True, help_text='Minimum gyroscope magnitude', null=True)),
+                ('gyro_max', models.FloatField(blank=True, help_text='Maximum gyroscope magnitude', null=True)),
+                ('gyro_mean', models.FloatField(blank=True, help_text='Mean gyroscope magnitude', null=True)),
+                ('gyro_m2', models.FloatField(default=0, help_text='Sum of squared deviations of gyroscope magnitude')),
+                ('consumidor', models.ForeignKey(help_text='Consumer the readings belong to', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.consumidor')),
+            ],
+            options={
+                'verbose_name': 'Sensor Rollup (1 h)',
+                'verbose_name_plural': 'Sensor Rollups (1 h)',
+                'db_table': 'sensor_rollups_1h',
+                'ordering': ['-bucket_start'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['bucket_start'], name='sensor_roll_bucket__a4d317_idx')],
+                'constraints': [models.UniqueConstraint(fields=('consumidor', 'bucket_start'), name='uniq_rollup_1h_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorRollupMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(help_text='Start of the aggregation bucket (UTC aligned)')),
+                ('sample_count', models.PositiveIntegerField(default=0, help_text='Readings in the bucket')),
+                ('hr_count', models.PositiveIntegerField(default=0, help_text='Readings with heart rate')),
+                ('hr_min', models.FloatField(blank=True, help_text='Minimum heart rate (BPM)', null=True)),
+                ('hr_max', models.FloatField(blank=True, help_text='Maximum heart rate (BPM)', null=True)),
+                ('hr_mean', models.FloatField(blank=True, help_text='Mean heart rate (BPM)', null=True)),
+                ('hr_m2', models.FloatField(default=0, help_text='Sum of squared deviations of heart rate')),
+                ('accel_count', models.PositiveIntegerField(default=0, help_text='Readings with accelerometer data')),
+                ('accel_min', models.FloatField(blank=True, help_text='Minimum accelerometer magnitude', null=True)),
+                ('accel_max', models.FloatField(blank=True, help_text='Maximum accelerometer magnitude', null=True)),
+                ('accel_mean', models.FloatField(blank=True, help_text='Mean accelerometer magnitude', null=True)),
+                ('accel_m2', models.FloatField(default=0, help_text='Sum of squared deviations of accelerometer magnitude')),
+                ('gyro_count', models.PositiveIntegerField(default=0, help_text='Readings with gyroscope data')),
+                ('gyro_min', models.FloatField(blank=True, help_text='Minimum gyroscope magnitude', null=True)),
+                ('gyro_max', models.FloatField(blank=True, help_text='Maximum gyroscope magnitude', null=True)),
+                ('gyro_mean', models.FloatField(blank=True, help_text='Mean gyroscope magnitude', null=True)),
+                ('gyro_m2', models.FloatField(default=0, help_text='Sum of squared deviations of gyroscope magnitude')),
+                ('consumidor', models.ForeignKey(help_text='Consumer the readings belong to', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.consumidor')),
+            ],
+            options={
+                'verbose_name': 'Sensor Rollup (1 min)',
+                'verbose_name_plural': 'Sensor Rollups (1 min)',
+                'db_table': 'sensor_rollups_1m',
+                'ordering': ['-bucket_start'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['bucket_start'], name='sensor_roll_bucket__5bd24e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('consumidor', 'bucket_start'), name='uniq_rollup_1m_bucket')],
+            },
+        ),
+    ]
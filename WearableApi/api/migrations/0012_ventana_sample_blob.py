@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_sensor_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentanaSampleBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp when the record was last updated')),
+                ('sample_count', models.PositiveIntegerField(help_text='Number of readings in the blob')),
+                ('codec', models.CharField(help_text='Compression applied to the packed columns (zstd or zlib)', max_length=16)),
+                ('raw_size', models.PositiveIntegerField(help_text='Size of the packed columns before compression (bytes)')),
+                ('data', models.BinaryField(help_text='Header + delta timestamps + XOR-encoded float32 columns, compressed')),
+                ('ventana', models.OneToOneField(help_text='Closed window whose readings were packed', on_delete=django.db.models.deletion.CASCADE, related_name='sample_blob', to='api.ventana')),
+            ],
+            options={
+                'verbose_name': 'Ventana Sample Blob',
+                'verbose_name_plural': 'Ventana Sample Blobs',
+                'db_table': 'ventana_sample_blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
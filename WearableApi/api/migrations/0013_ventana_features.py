@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_ventana_sample_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentanaFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp when the record was last updated')),
+                ('feature_set', models.PositiveSmallIntegerField(help_text='Feature set version (api.ml.FEATURE_SETS)')),
+                ('lectura_count', models.PositiveIntegerField(help_text="Readings the features were computed from; stale when the window's count differs")),
+                ('vector', models.BinaryField(help_text="Little-endian float32 values in the feature set's column order, NaN for missing")),
+                ('computed_at', models.DateTimeField(help_text='When the features were computed')),
+                ('ventana', models.ForeignKey(help_text='Window the features were computed for', on_delete=django.db.models.deletion.CASCADE, related_name='stored_features', to='api.ventana')),
+            ],
+            options={
+                'verbose_name': 'Ventana Features',
+                'verbose_name_plural': 'Ventana Features',
+                'db_table': 'ventana_features',
+                'ordering': ['-computed_at'],
+                'constraints': [models.UniqueConstraint(fields=('ventana', 'feature_set'), name='unique_ventana_feature_set')],
+            },
+        ),
+    ]
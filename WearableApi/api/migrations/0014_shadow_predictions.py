@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_ventana_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(help_text='Name/version of the model (LoadedModel.label)', max_length=100)),
+                ('is_champion', models.BooleanField(default=False, help_text="Whether this is the served model's prediction")),
+                ('probabilidad', models.FloatField(help_text='Predicted craving probability (0-1)')),
+                ('latency_us', models.PositiveIntegerField(help_text='Scoring time per window within its batch (microseconds)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ventana', models.ForeignKey(help_text='Window that was scored', on_delete=django.db.models.deletion.CASCADE, related_name='shadow_predictions', to='api.ventana')),
+            ],
+            options={
+                'verbose_name': 'Shadow Prediction',
+                'verbose_name_plural': 'Shadow Predictions',
+                'db_table': 'shadow_predictions',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='shadow_pred_created_b5065c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ventana', 'modelo'), name='unique_shadow_ventana_modelo')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from .features import (
+    AGGREGATE_NAMES, FEATURE_NAMES, FEATURE_SET_VERSION, FEATURE_SETS, SIGNAL_FEATURE_NAMES,
+    STATISTIC_NAMES, compute_aggregates, compute_feature_set, compute_features,
+    compute_signal_features, compute_statistics, features_from_aggregates, group_offsets,
+    merge_aggregates, statistics_from_aggregates, window_features, window_statistics
+)
+from .compiled import CompiledModel, compile_model, save_compiled
+from .registry import ChallengerRegistry, LoadedModel, ModelRegistry
+
+__all__ = ['AGGREGATE_NAMES', 'FEATURE_NAMES', 'FEATURE_SET_VERSION', 'FEATURE_SETS',
+           'SIGNAL_FEATURE_NAMES', 'STATISTIC_NAMES', 'compute_aggregates', 'compute_feature_set',
+           'compute_features', 'compute_signal_features', 'compute_statistics',
+           'features_from_aggregates', 'group_offsets', 'merge_aggregates',
+           'statistics_from_aggregates', 'window_features', 'window_statistics',
+           'CompiledModel', 'compile_model', 'save_compiled',
+           'ChallengerRegistry', 'LoadedModel', 'ModelRegistry']
@@ -0,0 +1,137 @@
+"""
+NumPy-only inference format for the craving model.
+
+train_model.py compiles the fitted scaler + estimator into one .npz next to
+the joblib package, and CompiledModel scores it without importing sklearn
+or pandas:
+
+- LogisticRegression: the scaler is folded into the coefficients,
+  logit = x . (coef / scale) + (intercept - coef . mean / scale).
+- RandomForestClassifier: every tree's node arrays are concatenated, and
+  all rows walk all trees at once, one level per step. Leaves point to
+  themselves, so max_depth steps land every row on its leaf. Scaled
+  inputs are compared as float32 against the thresholds, like sklearn
+  does, so predictions match bit for bit.
+
+Only binary models with labels {0, 1} are supported.
+"""
+import json
+from typing import Dict, List
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+def compile_model(model, scaler, feature_names: List[str], **meta) -> Dict[str, np.ndarray]:
+    """
+    Arrays of the .npz artifact for a fitted sklearn estimator and
+    StandardScaler. `meta` (model_name, version, feature_set, metrics...)
+    is stored as JSON. Raises TypeError for unsupported estimators.
+    """
+    classes = [int(label) for label in model.classes_]
+    if not set(classes) <= {0, 1}:
+        raise TypeError(f"Only binary 0/1 models can be compiled, got classes {classes}")
+
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    arrays = {
+        'meta': np.array(json.dumps({
+            **meta, 'format_version': FORMAT_VERSION, 'feature_names': list(feature_names)
+        })),
+    }
+
+    kind = type(model).__name__
+    if kind == 'LogisticRegression':
+        coef = np.asarray(model.coef_, dtype=np.float64)[0]
+        arrays.update({
+            'kind': np.array('logistic'),
+            'weights': coef / scale,
+            'bias': np.array(float(model.intercept_[0]) - float(np.sum(coef * mean / scale))),
+        })
+        return arrays
+
+    if kind == 'RandomForestClassifier':
+        positive = classes.index(1) if 1 in classes else None
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            # Leaves loop onto themselves so every row can take max_depth steps
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            counts = tree.value[:, 0, :]
+            fraction = counts / counts.sum(axis=1, keepdims=True)
+            values.append(fraction[:, positive] if positive is not None else np.zeros(tree.node_count))
+            roots.append(offset)
+            offset += tree.node_count
+
+        arrays.update({
+            'kind': np.array('forest'),
+            'mean': mean,
+            'scale': scale,
+            'left': np.concatenate(lefts).astype(np.int32),
+            'right': np.concatenate(rights).astype(np.int32),
+            'feature': np.concatenate(features).astype(np.int32),
+            'threshold': np.concatenate(thresholds).astype(np.float64),
+            'value': np.concatenate(values).astype(np.float64),
+            'roots': np.array(roots, dtype=np.int32),
+            'depth': np.array(max(estimator.tree_.max_depth for estimator in model.estimators_)),
+        })
+        return arrays
+
+    raise TypeError(f"{kind} cannot be compiled; only LogisticRegression and RandomForestClassifier")
+
+def save_compiled(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    # Uncompressed: loading is a straight read of a few small arrays
+    with open(path, 'wb') as artifact:
+        np.savez(artifact, **arrays)
+
+class CompiledModel:
+    """
+    Scores a compiled artifact. Exposes predict_proba and classes_ like the
+    estimator it replaces; the scaler is part of the artifact.
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.meta = json.loads(str(arrays['meta']))
+        self.kind = str(arrays['kind'])
+        self.feature_names = self.meta['feature_names']
+        self._arrays = {name: np.asarray(values) for name, values in arrays.items()}
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledModel':
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls({name: artifact[name] for name in artifact.files})
+
+    def positive_proba(self, X: np.ndarray) -> np.ndarray:
+        """P(label 1) for every row of X (columns in feature_names order)."""
+        X = np.asarray(X, dtype=np.float64)
+        arrays = self._arrays
+
+        if self.kind == 'logistic':
+            return _sigmoid(X @ arrays['weights'] + float(arrays['bias']))
+
+        scaled = ((X - arrays['mean']) / arrays['scale']).astype(np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(arrays['roots'], (X.shape[0], arrays['roots'].size))
+        left, right, feature, threshold = arrays['left'], arrays['right'], arrays['feature'], arrays['threshold']
+        for _ in range(int(arrays['depth'])):
+            go_left = scaled[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(go_left, left[nodes], right[nodes])
+        return arrays['value'][nodes].mean(axis=1)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positive = self.positive_proba(X)
+        return np.column_stack((1.0 - positive, positive))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
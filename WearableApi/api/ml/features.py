@@ -0,0 +1,416 @@
+"""
+Window feature engine shared by training (train_model.py) and inference
+(api/tasks.py).
+
+Readings of many windows are passed as one set of flat arrays plus
+`offsets`: window i owns rows offsets[i]:offsets[i + 1], so offsets has
+one more entry than there are windows (usually starting at 0 and ending
+at the number of rows; rows outside the range are ignored). Every feature
+is computed for all windows at once with segment reductions
+(ufunc.reduceat), no per-window Python loop.
+
+Two NULL policies, each in one place:
+
+- compute_features: the model's inputs. Missing sensor values count as 0
+  (what training always did with fillna(0) and inference with nan_to_num).
+- compute_statistics: the statistics stored on the ventana. Missing values
+  are skipped, and a statistic with no data at all is NaN (None from
+  window_statistics).
+
+Standard deviations are population std (ddof=0), matching the running
+accumulator in VentanaStatsAccumulator.
+
+Feature sets are versioned (FEATURE_SETS). A trained model records the
+version it was fitted on, and inference computes that same set. Set 1 is
+FEATURE_NAMES. Set 2 adds SIGNAL_FEATURE_NAMES, which depend on the order
+and timing of the readings. They need a 'created_at' array, with rows
+sorted by time within each window, so they cannot be derived from
+aggregates.
+
+This module only depends on NumPy, so scripts and notebooks can import it
+without Django.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+HR_FIELD = 'heart_rate'
+ACCEL_FIELDS = ('accel_x', 'accel_y', 'accel_z')
+GYRO_FIELDS = ('gyro_x', 'gyro_y', 'gyro_z')
+SENSOR_FIELDS = (HR_FIELD,) + ACCEL_FIELDS + GYRO_FIELDS
+
+# Column order of the model's feature matrix
+FEATURE_NAMES = (
+    'hr_mean', 'hr_std', 'hr_min', 'hr_max', 'hr_range',
+    'accel_magnitude_mean', 'accel_magnitude_std',
+    'gyro_magnitude_mean', 'gyro_magnitude_std',
+    'accel_energy', 'gyro_energy',
+)
+STATISTIC_NAMES = ('hr_mean', 'hr_std', 'accel_energy', 'gyro_energy')
+
+# compute_signal_features, appended after FEATURE_NAMES in set 2
+SIGNAL_FEATURE_NAMES = (
+    'hr_rmssd', 'hr_pnn50',
+    'accel_power_gesture', 'accel_power_gait', 'accel_dominant_freq',
+    'step_cadence', 'gyro_jerk',
+)
+FEATURE_SETS = {
+    1: FEATURE_NAMES,
+    2: FEATURE_NAMES + SIGNAL_FEATURE_NAMES,
+}
+FEATURE_SET_VERSION = max(FEATURE_SETS)
+
+# Accelerometer bands (Hz): hand-to-mouth gestures and walking. A band above
+# the sampling rate's Nyquist frequency is 0.
+GESTURE_BAND = (0.1, 0.5)
+GAIT_BAND = (0.5, 3.0)
+# Windows are resampled to a power-of-two grid of at least as many points
+# as readings (within these bounds) before the FFT
+SPECTRUM_POINTS = (8, 1024)
+
+# Sufficient statistics of a window: both the features and the statistics
+# follow from these, and two sets of them merge exactly (merge_aggregates).
+# The first eight are also the running accumulator's fields
+# (VentanaStatsAccumulator). hr0_* is heart rate with missing values as 0.
+AGGREGATE_NAMES = (
+    'n', 'hr_n', 'hr_mean', 'hr_m2', 'accel_n', 'accel_sumsq', 'gyro_n', 'gyro_sumsq',
+    'hr0_mean', 'hr0_m2', 'hr0_min', 'hr0_max',
+    'accel_mag_mean', 'accel_mag_m2', 'gyro_mag_mean', 'gyro_mag_m2',
+)
+# (count, mean, M2) triples merged with the parallel variance update
+_MOMENTS = (
+    ('hr_n', 'hr_mean', 'hr_m2'),
+    ('n', 'hr0_mean', 'hr0_m2'),
+    ('n', 'accel_mag_mean', 'accel_mag_m2'),
+    ('n', 'gyro_mag_mean', 'gyro_mag_m2'),
+)
+
+def group_offsets(window_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (unique window ids, offsets) for rows already grouped by window, e.g.
+    sorted by ventana_id.
+    """
+    window_ids = np.asarray(window_ids)
+    if not window_ids.size:
+        return window_ids[:0], np.zeros(1, dtype=np.intp)
+    starts = np.flatnonzero(np.r_[True, window_ids[1:] != window_ids[:-1]])
+    return window_ids[starts], np.r_[starts, window_ids.size].astype(np.intp)
+
+def _window_rows(samples: Dict[str, np.ndarray], fields, offsets) -> Tuple[list, np.ndarray]:
+    """The rows covered by offsets as float64 arrays, with offsets rebased to 0."""
+    offsets = np.asarray(offsets, dtype=np.intp)
+    rows = slice(offsets[0], offsets[-1])
+    return [np.asarray(samples[field], dtype=np.float64)[rows] for field in fields], offsets - offsets[0]
+
+def _segments(offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    offsets = np.asarray(offsets, dtype=np.intp)
+    counts = np.diff(offsets)
+    nonempty = counts > 0
+    return offsets[:-1][nonempty], counts, nonempty
+
+def _reduce(ufunc, values: np.ndarray, offsets: np.ndarray, empty: float = np.nan) -> np.ndarray:
+    """ufunc over every window; windows without rows get `empty`."""
+    starts, counts, nonempty = _segments(offsets)
+    out = np.full(counts.size, empty, dtype=np.float64)
+    if starts.size:
+        # Empty windows share their start with the next window, so leaving
+        # them out keeps every other segment's bounds intact
+        out[nonempty] = ufunc.reduceat(values, starts)
+    return out
+
+def _mean_std(values: np.ndarray, offsets: np.ndarray,
+              present: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-window (count, mean, population std) over the `present` rows (default: all)."""
+    counts = np.diff(np.asarray(offsets, dtype=np.intp)).astype(np.float64)
+    if present is not None:
+        counts = _reduce(np.add, present.astype(np.float64), offsets, empty=0.0)
+        values = np.where(present, values, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = _reduce(np.add, values, offsets, empty=0.0) / counts
+        # Two-pass variance: deviations from each window's own mean
+        deviations = values - np.repeat(np.nan_to_num(mean), np.diff(offsets))
+        if present is not None:
+            deviations = np.where(present, deviations, 0.0)
+        std = np.sqrt(_reduce(np.add, deviations ** 2, offsets, empty=0.0) / counts)
+
+    return counts, mean, std
+
+def compute_features(samples: Dict[str, np.ndarray], offsets: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Model features (FEATURE_NAMES) of every window, one float64 array per
+    feature. Missing values count as 0; windows without readings are NaN.
+    """
+    columns, offsets = _window_rows(samples, SENSOR_FIELDS, offsets)
+    hr, ax, ay, az, gx, gy, gz = (np.nan_to_num(column, nan=0.0) for column in columns)
+    accel_sq = ax * ax + ay * ay + az * az
+    gyro_sq = gx * gx + gy * gy + gz * gz
+
+    _, hr_mean, hr_std = _mean_std(hr, offsets)
+    _, accel_mean, accel_std = _mean_std(np.sqrt(accel_sq), offsets)
+    _, gyro_mean, gyro_std = _mean_std(np.sqrt(gyro_sq), offsets)
+    hr_min = _reduce(np.minimum, hr, offsets)
+    hr_max = _reduce(np.maximum, hr, offsets)
+
+    return {
+        'hr_mean': hr_mean,
+        'hr_std': hr_std,
+        'hr_min': hr_min,
+        'hr_max': hr_max,
+        'hr_range': hr_max - hr_min,
+        'accel_magnitude_mean': accel_mean,
+        'accel_magnitude_std': accel_std,
+        'gyro_magnitude_mean': gyro_mean,
+        'gyro_magnitude_std': gyro_std,
+        'accel_energy': _reduce(np.add, accel_sq, offsets),
+        'gyro_energy': _reduce(np.add, gyro_sq, offsets),
+    }
+
+def _seconds(created_at: np.ndarray) -> np.ndarray:
+    created_at = np.asarray(created_at)
+    if np.issubdtype(created_at.dtype, np.datetime64):
+        return created_at.astype('datetime64[us]').astype(np.int64) / 1e6
+    return created_at.astype(np.float64)
+
+def _successive(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """values[r] - values[r - 1] per row, 0 on the first row of each window."""
+    deltas = np.diff(values, prepend=values[:1])
+    deltas[offsets[:-1][np.diff(offsets) > 0]] = 0.0
+    return deltas
+
+def _hrv(hr: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    RMSSD (ms) and pNN50 of the successive beat intervals implied by the
+    heart rate readings (60000 / bpm), skipping missing readings. With
+    one reading per second or slower this tracks the HRV trend, not
+    beat-to-beat variability.
+    """
+    present = ~np.isnan(hr) & (hr > 0)
+    intervals = 60000.0 / hr[present]
+    kept = np.r_[0, np.cumsum(present)][offsets]
+    deltas = _successive(intervals, kept)
+    pairs = np.maximum(np.diff(kept) - 1, 0).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rmssd = np.sqrt(_reduce(np.add, deltas * deltas, kept, empty=0.0) / pairs)
+        pnn50 = _reduce(np.add, (np.abs(deltas) > 50.0).astype(np.float64), kept, empty=0.0) / pairs
+    return np.where(pairs > 0, rmssd, 0.0), np.where(pairs > 0, pnn50, 0.0)
+
+def _spectrum(values: np.ndarray, seconds: np.ndarray, offsets: np.ndarray,
+              start: np.ndarray, duration: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Band power fractions and dominant frequency of every window. Each window
+    is linearly resampled onto an even time grid (readings arrive with
+    jitter and gaps), then windows with the same grid size share one rfft.
+    """
+    counts = np.diff(offsets)
+    spectral = {name: np.zeros(counts.size) for name in (
+        'accel_power_gesture', 'accel_power_gait', 'accel_dominant_freq'
+    )}
+    eligible = (counts >= 4) & (duration > 0)
+    if not eligible.any():
+        return spectral
+
+    # Window w's readings sit on [2w, 2w + 1], so one np.interp call serves
+    # every window without interpolating across window boundaries
+    window = np.repeat(np.arange(counts.size), counts)
+    span = np.where(duration > 0, duration, 1.0)
+    position = 2.0 * window + (seconds - start[window]) / span[window]
+
+    low, high = SPECTRUM_POINTS
+    points = 2 ** np.ceil(np.log2(np.clip(counts, low, high))).astype(np.intp)
+
+    for size in np.unique(points[eligible]):
+        windows = np.flatnonzero(eligible & (points == size))
+        grid = 2.0 * windows[:, None] + np.linspace(0.0, 1.0, size)[None, :]
+        resampled = np.interp(grid.ravel(), position, values).reshape(windows.size, size)
+        resampled -= resampled.mean(axis=1, keepdims=True)
+
+        power = np.abs(np.fft.rfft(resampled, axis=1)[:, 1:]) ** 2
+        # Grid spacing is duration / (size - 1)
+        freqs = np.arange(1, size // 2 + 1)[None, :] * (size - 1) / (size * duration[windows, None])
+        total = power.sum(axis=1)
+        nonzero = total > 0
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, (lo, hi) in (('accel_power_gesture', GESTURE_BAND), ('accel_power_gait', GAIT_BAND)):
+                band = (power * ((freqs >= lo) & (freqs < hi))).sum(axis=1)
+                spectral[name][windows] = np.where(nonzero, band / total, 0.0)
+        dominant = freqs[np.arange(windows.size), power.argmax(axis=1)]
+        spectral['accel_dominant_freq'][windows] = np.where(nonzero, dominant, 0.0)
+
+    return spectral
+
+def compute_signal_features(samples: Dict[str, np.ndarray], offsets: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    SIGNAL_FEATURE_NAMES of every window. samples needs 'created_at'
+    (datetime64 or epoch seconds) and rows in time order within each window.
+    Missing motion values count as 0, missing heart rates are skipped;
+    windows without readings are NaN.
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    seconds = _seconds(samples['created_at'])[offsets[0]:offsets[-1]]
+    columns, offsets = _window_rows(samples, SENSOR_FIELDS, offsets)
+    ax, ay, az, gx, gy, gz = (np.nan_to_num(column, nan=0.0) for column in columns[1:])
+    accel = np.sqrt(ax * ax + ay * ay + az * az)
+    gyro = np.sqrt(gx * gx + gy * gy + gz * gz)
+
+    start = _reduce(np.minimum, seconds, offsets, empty=0.0)
+    duration = _reduce(np.maximum, seconds, offsets, empty=0.0) - start
+
+    rmssd, pnn50 = _hrv(columns[0], offsets)
+
+    # Zero crossings of the accelerometer magnitude around its window mean;
+    # two crossings per step
+    _, accel_mean, _ = _mean_std(accel, offsets)
+    above = (accel > np.repeat(np.nan_to_num(accel_mean), np.diff(offsets))).astype(np.float64)
+    crossings = _reduce(np.add, np.abs(_successive(above, offsets)), offsets, empty=0.0)
+    # Total variation of the gyroscope magnitude per second
+    variation = _reduce(np.add, np.abs(_successive(gyro, offsets)), offsets, empty=0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features = {
+            'hr_rmssd': rmssd,
+            'hr_pnn50': pnn50,
+            **_spectrum(accel, seconds, offsets, start, duration),
+            'step_cadence': np.where(duration > 0, crossings / 2.0 / duration * 60.0, 0.0),
+            'gyro_jerk': np.where(duration > 0, variation / duration, 0.0),
+        }
+
+    empty = np.diff(offsets) == 0
+    for values in features.values():
+        values[empty] = np.nan
+    return features
+
+def compute_feature_set(samples: Dict[str, np.ndarray], offsets: np.ndarray,
+                        feature_set: int = FEATURE_SET_VERSION) -> Dict[str, np.ndarray]:
+    """The features of FEATURE_SETS[feature_set], in model column order."""
+    if feature_set not in FEATURE_SETS:
+        raise ValueError(f"Unknown feature set {feature_set}; known: {sorted(FEATURE_SETS)}")
+    features = compute_features(samples, offsets)
+    if feature_set >= 2:
+        features.update(compute_signal_features(samples, offsets))
+    return {name: features[name] for name in FEATURE_SETS[feature_set]}
+
+def compute_statistics(samples: Dict[str, np.ndarray], offsets: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Ventana statistics (STATISTIC_NAMES) of every window. Missing values are
+    skipped; a statistic is NaN when the window has no value for it.
+    """
+    columns, offsets = _window_rows(samples, SENSOR_FIELDS, offsets)
+    hr = columns[0]
+    hr_count, hr_mean, hr_std = _mean_std(hr, offsets, present=~np.isnan(hr))
+
+    statistics = {
+        'hr_mean': np.where(hr_count > 0, hr_mean, np.nan),
+        'hr_std': np.where(hr_count > 0, hr_std, np.nan),
+    }
+
+    for name, axes in (('accel_energy', columns[1:4]), ('gyro_energy', columns[4:7])):
+        axes = np.column_stack(axes)
+        present = (~np.isnan(axes)).any(axis=1)
+        energy = _reduce(np.add, np.nansum(axes * axes, axis=1), offsets, empty=0.0)
+        has_data = _reduce(np.logical_or, present, offsets, empty=0.0) > 0
+        statistics[name] = np.where(has_data, energy, np.nan)
+
+    return statistics
+
+def _single(values: Dict[str, np.ndarray]) -> Dict[str, Optional[float]]:
+    return {name: None if np.isnan(array[0]) else float(array[0]) for name, array in values.items()}
+
+def window_features(samples: Dict[str, np.ndarray], feature_set: int = 1) -> Dict[str, Optional[float]]:
+    """compute_feature_set for the readings of a single window, as floats."""
+    offsets = np.array([0, len(samples[HR_FIELD])], dtype=np.intp)
+    return _single(compute_feature_set(samples, offsets, feature_set))
+
+def window_statistics(samples: Dict[str, np.ndarray]) -> Dict[str, Optional[float]]:
+    """compute_statistics for a single window, None where there is no data."""
+    offsets = np.array([0, len(samples[HR_FIELD])], dtype=np.intp)
+    return _single(compute_statistics(samples, offsets))
+
+def compute_aggregates(samples: Dict[str, np.ndarray], offsets: np.ndarray) -> Dict[str, np.ndarray]:
+    """AGGREGATE_NAMES of every window, one array each."""
+    columns, offsets = _window_rows(samples, SENSOR_FIELDS, offsets)
+    hr = columns[0]
+    hr0, ax, ay, az, gx, gy, gz = (np.nan_to_num(column, nan=0.0) for column in columns)
+    accel_sq = ax * ax + ay * ay + az * az
+    gyro_sq = gx * gx + gy * gy + gz * gz
+
+    n, hr0_mean, hr0_std = _mean_std(hr0, offsets)
+    hr_n, hr_mean, hr_std = _mean_std(hr, offsets, present=~np.isnan(hr))
+    _, accel_mean, accel_std = _mean_std(np.sqrt(accel_sq), offsets)
+    _, gyro_mean, gyro_std = _mean_std(np.sqrt(gyro_sq), offsets)
+
+    aggregates = {
+        'n': n,
+        'hr_n': hr_n,
+        'hr_mean': np.nan_to_num(hr_mean),
+        'hr_m2': np.nan_to_num(hr_std ** 2 * hr_n),
+        'hr0_mean': hr0_mean,
+        'hr0_m2': hr0_std ** 2 * n,
+        'hr0_min': _reduce(np.minimum, hr0, offsets),
+        'hr0_max': _reduce(np.maximum, hr0, offsets),
+        'accel_mag_mean': accel_mean,
+        'accel_mag_m2': accel_std ** 2 * n,
+        'gyro_mag_mean': gyro_mean,
+        'gyro_mag_m2': gyro_std ** 2 * n,
+        'accel_sumsq': _reduce(np.add, accel_sq, offsets, empty=0.0),
+        'gyro_sumsq': _reduce(np.add, gyro_sq, offsets, empty=0.0),
+    }
+    for name, axes in (('accel_n', columns[1:4]), ('gyro_n', columns[4:7])):
+        present = (~np.isnan(np.column_stack(axes))).any(axis=1)
+        aggregates[name] = _reduce(np.add, present.astype(np.float64), offsets, empty=0.0)
+    return aggregates
+
+def merge_aggregates(first: Dict[str, float], second: Dict[str, float]) -> Dict[str, float]:
+    """Aggregates of the union of two disjoint sets of readings of a window."""
+    if not first.get('n'):
+        return dict(second)
+    if not second.get('n'):
+        return dict(first)
+
+    merged = {
+        'hr0_min': min(first['hr0_min'], second['hr0_min']),
+        'hr0_max': max(first['hr0_max'], second['hr0_max']),
+    }
+    for count, mean, m2 in _MOMENTS:
+        a, b = first[count], second[count]
+        if not a or not b:
+            merged[mean], merged[m2] = (first[mean], first[m2]) if a else (second[mean], second[m2])
+            continue
+        delta = second[mean] - first[mean]
+        merged[mean] = first[mean] + delta * b / (a + b)
+        merged[m2] = first[m2] + second[m2] + delta * delta * a * b / (a + b)
+    for name in ('n', 'hr_n', 'accel_n', 'gyro_n', 'accel_sumsq', 'gyro_sumsq'):
+        merged[name] = first[name] + second[name]
+    return merged
+
+def features_from_aggregates(aggregates: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """FEATURE_NAMES of one window, same values as window_features."""
+    n = aggregates['n']
+    if not n:
+        return {name: None for name in FEATURE_NAMES}
+    std = lambda m2: float(np.sqrt(max(m2, 0.0) / n))
+    return {
+        'hr_mean': float(aggregates['hr0_mean']),
+        'hr_std': std(aggregates['hr0_m2']),
+        'hr_min': float(aggregates['hr0_min']),
+        'hr_max': float(aggregates['hr0_max']),
+        'hr_range': float(aggregates['hr0_max'] - aggregates['hr0_min']),
+        'accel_magnitude_mean': float(aggregates['accel_mag_mean']),
+        'accel_magnitude_std': std(aggregates['accel_mag_m2']),
+        'gyro_magnitude_mean': float(aggregates['gyro_mag_mean']),
+        'gyro_magnitude_std': std(aggregates['gyro_mag_m2']),
+        'accel_energy': float(aggregates['accel_sumsq']),
+        'gyro_energy': float(aggregates['gyro_sumsq']),
+    }
+
+def statistics_from_aggregates(aggregates: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """STATISTIC_NAMES of one window, same values as window_statistics."""
+    hr_n = aggregates['hr_n']
+    return {
+        'hr_mean': float(aggregates['hr_mean']) if hr_n else None,
+        'hr_std': float(np.sqrt(max(aggregates['hr_m2'], 0.0) / hr_n)) if hr_n else None,
+        'accel_energy': float(aggregates['accel_sumsq']) if aggregates['accel_n'] else None,
+        'gyro_energy': float(aggregates['gyro_sumsq']) if aggregates['gyro_n'] else None,
+    }
@@ -0,0 +1,225 @@
+"""
+Process-local registry of the served model.
+
+Each worker process loads the model package once and keeps it in memory.
+At most every ML_MODEL_CHECK_SECONDS it compares the artifact's inode,
+mtime and size, plus the version train_model.py publishes in Redis
+(ML_MODEL_VERSION_KEY), and reloads when any of them changed. With
+ML_MODEL_MMAP the model's NumPy arrays are memory-mapped from the file
+rather than copied, so prefork children share the same pages. This
+relies on new artifacts replacing the file (os.replace), never
+overwriting it in place.
+
+With ML_MODEL_COMPILED, the NumPy-only .npz train_model.py writes next to
+ML_MODEL_PATH (api/ml/compiled.py) is served instead when it exists; its
+scaler is part of the model, so LoadedModel.scaler is None.
+
+ChallengerRegistry does the same for every artifact in ML_CHALLENGERS_DIR:
+candidate models that are only shadow-scored (api/services/shadow_service.py).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+class LoadedModel(NamedTuple):
+    name: str
+    version: str
+    model: Any
+    scaler: Any
+    feature_names: List[str]
+    feature_set: int
+    metrics: Dict
+    path: str
+
+    @property
+    def label(self) -> str:
+        """Recorded in Analisis.modelo_usado."""
+        return f'{self.name}:{self.version}'[:100]
+
+class ModelRegistry:
+
+    _loaded: Optional[LoadedModel] = None
+    _signature: Optional[Tuple] = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _published_version() -> Optional[str]:
+        from utils.redis_client import get_redis
+        try:
+            return get_redis().get(settings.ML_MODEL_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"[MODEL] Could not read the published model version: {e}")
+            return None
+
+    @staticmethod
+    def _current_signature(path: str) -> Tuple:
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size, ModelRegistry._published_version()
+
+    @staticmethod
+    def _path() -> str:
+        if settings.ML_MODEL_COMPILED:
+            compiled_path = os.path.splitext(settings.ML_MODEL_PATH)[0] + '.npz'
+            if os.path.exists(compiled_path):
+                return compiled_path
+        return settings.ML_MODEL_PATH
+
+    @staticmethod
+    def _load_compiled(path: str) -> LoadedModel:
+        from api.ml.compiled import CompiledModel
+
+        model = CompiledModel.load(path)
+        meta = model.meta
+        return LoadedModel(
+            name=meta.get('model_name') or model.kind,
+            version=str(meta.get('version') or datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y%m%d_%H%M%S')),
+            model=model,
+            scaler=None,
+            feature_names=list(model.feature_names),
+            feature_set=meta.get('feature_set', 1),
+            metrics=meta.get('metrics', {}),
+            path=path,
+        )
+
+    @staticmethod
+    def _load(path: str) -> LoadedModel:
+        import joblib
+
+        if path.endswith('.npz'):
+            return ModelRegistry._load_compiled(path)
+
+        package = joblib.load(path, mmap_mode='r' if settings.ML_MODEL_MMAP else None)
+        model = package['model']
+        # Packages saved before versioning: the training date, else the file's mtime
+        version = package.get('version') or package.get('training_date') or (
+            datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y%m%d_%H%M%S')
+        )
+        return LoadedModel(
+            name=package.get('model_name') or type(model).__name__,
+            version=str(version),
+            model=model,
+            scaler=package['scaler'],
+            feature_names=list(package['feature_names']),
+            feature_set=package.get('feature_set', 1),
+            metrics=package.get('metrics', {}),
+            path=path,
+        )
+
+    @staticmethod
+    def get(force_check: bool = False) -> LoadedModel:
+        """
+        The served model, reloaded if the artifact changed since the last
+        check. A failed reload keeps serving the previous model; with no
+        model loaded yet, FileNotFoundError / KeyError propagate.
+        """
+        loaded = ModelRegistry._loaded
+        if (loaded is not None and not force_check
+                and time.monotonic() - ModelRegistry._checked_at < settings.ML_MODEL_CHECK_SECONDS):
+            return loaded
+
+        with ModelRegistry._lock:
+            path = ModelRegistry._path()
+            try:
+                signature = ModelRegistry._current_signature(path)
+            except FileNotFoundError:
+                if ModelRegistry._loaded is None:
+                    raise
+                logger.warning(f"[MODEL] {path} is missing, still serving {ModelRegistry._loaded.label}")
+                signature = ModelRegistry._signature
+
+            if ModelRegistry._loaded is None or signature != ModelRegistry._signature:
+                try:
+                    ModelRegistry._loaded = ModelRegistry._load(path)
+                    ModelRegistry._signature = signature
+                    logger.info(f"[MODEL] Loaded {ModelRegistry._loaded.label} from {path} (pid {os.getpid()})")
+                except Exception:
+                    if ModelRegistry._loaded is None:
+                        raise
+                    logger.error(
+                        f"[MODEL] Reloading {path} failed, still serving {ModelRegistry._loaded.label}",
+                        exc_info=True
+                    )
+
+            ModelRegistry._checked_at = time.monotonic()
+            return ModelRegistry._loaded
+
+    @staticmethod
+    def is_loaded() -> bool:
+        """Whether this process has a model in memory (get() will not load from disk)."""
+        return ModelRegistry._loaded is not None
+
+    @staticmethod
+    def publish(version: str) -> None:
+        """Ask every worker to reload at its next check (train_model.py)."""
+        from utils.redis_client import get_redis
+        get_redis().set(settings.ML_MODEL_VERSION_KEY, version)
+
+    @staticmethod
+    def clear() -> None:
+        with ModelRegistry._lock:
+            ModelRegistry._loaded = None
+            ModelRegistry._signature = None
+            ModelRegistry._checked_at = 0.0
+
+class ChallengerRegistry:
+
+    _loaded: Dict[str, Tuple[Tuple, LoadedModel]] = {}
+    _paths: List[str] = []
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _scan() -> List[str]:
+        """One artifact per challenger: its .npz (ML_MODEL_COMPILED) or .pkl."""
+        directory = settings.ML_CHALLENGERS_DIR
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        stems = {}
+        for name in sorted(names):
+            stem, extension = os.path.splitext(name)
+            if extension == '.pkl' or (extension == '.npz' and settings.ML_MODEL_COMPILED):
+                if extension == '.npz' or stem not in stems:
+                    stems[stem] = os.path.join(directory, name)
+        return [stems[stem] for stem in sorted(stems)]
+
+    @staticmethod
+    def paths(force_check: bool = False) -> List[str]:
+        """Registered challenger artifacts, listed at most every ML_MODEL_CHECK_SECONDS."""
+        if force_check or time.monotonic() - ChallengerRegistry._checked_at >= settings.ML_MODEL_CHECK_SECONDS:
+            ChallengerRegistry._paths = ChallengerRegistry._scan()
+            ChallengerRegistry._checked_at = time.monotonic()
+        return ChallengerRegistry._paths
+
+    @staticmethod
+    def get_all(force_check: bool = False) -> List[LoadedModel]:
+        """
+        The challengers, each reloaded when its file changed. One that fails
+        to load is skipped (and retried at the next check).
+        """
+        with ChallengerRegistry._lock:
+            paths = ChallengerRegistry.paths(force_check)
+            loaded = {}
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                    previous = ChallengerRegistry._loaded.get(path)
+                    if previous is not None and previous[0] == signature:
+                        loaded[path] = previous
+                        continue
+                    loaded[path] = (signature, ModelRegistry._load(path))
+                    logger.info(f"[MODEL] Loaded challenger {loaded[path][1].label} from {path}")
+                except Exception:
+                    logger.error(f"[MODEL] Loading challenger {path} failed", exc_info=True)
+            ChallengerRegistry._loaded = loaded
+            return [challenger for _, challenger in loaded.values()]
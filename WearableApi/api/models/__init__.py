@@ -24,17 +24,29 @@ from .form import (
 
 from .sensor import (
     Ventana,
-    Lectura
+    Lectura,
+    VentanaSampleBlob,
+    VentanaFeatures
 )
 
 from .analysis import (
     Analisis,
+    ShadowPrediction,
     Deseo,
     Notificacion,
     DeseoTipoChoices,
     NotificacionTipoChoices
 )
 
+from .pipeline import ProcessingCheckpoint
+
+from .rollup import (
+    SensorRollup,
+    SensorRollupMinute,
+    SensorRollupFiveMinute,
+    SensorRollupHour
+)
+
 from .dashboard import (
     VwHabitTracking,
     VwHabitStats,
@@ -71,13 +83,23 @@ __all__ = [
     
     'Ventana',
     'Lectura',
+    'VentanaSampleBlob',
+    'VentanaFeatures',
     
     'Analisis',
+    'ShadowPrediction',
     'Deseo',
     'Notificacion',
     'DeseoTipoChoices',
     'NotificacionTipoChoices',
     
+    'ProcessingCheckpoint',
+    
+    'SensorRollup',
+    'SensorRollupMinute',
+    'SensorRollupFiveMinute',
+    'SensorRollupHour',
+    
     'VwHabitTracking',
     'VwHabitStats',
     'VwHeartRateTimeline',
@@ -103,6 +103,52 @@ class Analisis(TimeStampedModel):
     def consumidor(self):
         return self.ventana.consumidor if self.ventana else None
 
+class ShadowPrediction(models.Model):
+    """
+    Probability one model gave a window during shadow evaluation: the
+    champion's served prediction and each challenger's, side by side.
+    """
+
+    ventana = models.ForeignKey(
+        Ventana,
+        on_delete=models.CASCADE,
+        related_name='shadow_predictions',
+        help_text="Window that was scored"
+    )
+    modelo = models.CharField(
+        max_length=100,
+        help_text="Name/version of the model (LoadedModel.label)"
+    )
+    is_champion = models.BooleanField(
+        default=False,
+        help_text="Whether this is the served model's prediction"
+    )
+    probabilidad = models.FloatField(
+        help_text="Predicted craving probability (0-1)"
+    )
+    latency_us = models.PositiveIntegerField(
+        help_text="Scoring time per window within its batch (microseconds)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'shadow_predictions'
+        verbose_name = 'Shadow Prediction'
+        verbose_name_plural = 'Shadow Predictions'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ventana', 'modelo'],
+                name='unique_shadow_ventana_modelo'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} on window {self.ventana_id} (p={self.probabilidad:.3f})"
+
 class DeseoTipoChoices(models.TextChoices):
     COMIDA = 'comida', 'Comida'
     BEBIDA = 'bebida', 'Bebida'
@@ -0,0 +1,33 @@
+
+from django.db import models
+from .base import TimeStampedModel
+
+class ProcessingCheckpoint(TimeStampedModel):
+
+    key = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Name of the pipeline or stream this checkpoint belongs to"
+    )
+    position = models.CharField(
+        max_length=100,
+        help_text="Last committed position (stream ID, timestamp or row ID)"
+    )
+
+    class Meta:
+        db_table = 'processing_checkpoints'
+        verbose_name = 'Processing Checkpoint'
+        verbose_name_plural = 'Processing Checkpoints'
+        ordering = ['key']
+
+    def __str__(self):
+        return f"{self.key} @ {self.position}"
+
+    @classmethod
+    def get_position(cls, key, default=None):
+        checkpoint = cls.objects.filter(key=key).only('position').first()
+        return checkpoint.position if checkpoint else default
+
+    @classmethod
+    def set_position(cls, key, position):
+        cls.objects.update_or_create(key=key, defaults={'position': str(position)})
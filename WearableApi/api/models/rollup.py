@@ -0,0 +1,109 @@
+import math
+from django.db import models
+from .user import Consumidor
+
+class SensorRollup(models.Model):
+    """
+    Per-consumer aggregates of lecturas over fixed buckets. Mean and M2
+    (sum of squared deviations) are stored instead of std so partial
+    buckets can be merged exactly when new readings arrive.
+    """
+
+    BUCKET_SECONDS = None
+
+    consumidor = models.ForeignKey(
+        Consumidor,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text="Consumer the readings belong to"
+    )
+    bucket_start = models.DateTimeField(
+        help_text="Start of the aggregation bucket (UTC aligned)"
+    )
+    sample_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Readings in the bucket"
+    )
+    hr_count = models.PositiveIntegerField(default=0, help_text="Readings with heart rate")
+    hr_min = models.FloatField(null=True, blank=True, help_text="Minimum heart rate (BPM)")
+    hr_max = models.FloatField(null=True, blank=True, help_text="Maximum heart rate (BPM)")
+    hr_mean = models.FloatField(null=True, blank=True, help_text="Mean heart rate (BPM)")
+    hr_m2 = models.FloatField(default=0, help_text="Sum of squared deviations of heart rate")
+    accel_count = models.PositiveIntegerField(default=0, help_text="Readings with accelerometer data")
+    accel_min = models.FloatField(null=True, blank=True, help_text="Minimum accelerometer magnitude")
+    accel_max = models.FloatField(null=True, blank=True, help_text="Maximum accelerometer magnitude")
+    accel_mean = models.FloatField(null=True, blank=True, help_text="Mean accelerometer magnitude")
+    accel_m2 = models.FloatField(default=0, help_text="Sum of squared deviations of accelerometer magnitude")
+    gyro_count = models.PositiveIntegerField(default=0, help_text="Readings with gyroscope data")
+    gyro_min = models.FloatField(null=True, blank=True, help_text="Minimum gyroscope magnitude")
+    gyro_max = models.FloatField(null=True, blank=True, help_text="Maximum gyroscope magnitude")
+    gyro_mean = models.FloatField(null=True, blank=True, help_text="Mean gyroscope magnitude")
+    gyro_m2 = models.FloatField(default=0, help_text="Sum of squared deviations of gyroscope magnitude")
+
+    class Meta:
+        abstract = True
+        ordering = ['-bucket_start']
+
+    def __str__(self):
+        return f"{self.__class__.__name__} {self.consumidor_id} @ {self.bucket_start}"
+
+    @staticmethod
+    def _std(m2, count):
+        return math.sqrt(max(m2, 0.0) / count) if count else None
+
+    @property
+    def hr_std(self):
+        return self._std(self.hr_m2, self.hr_count)
+
+    @property
+    def accel_std(self):
+        return self._std(self.accel_m2, self.accel_count)
+
+    @property
+    def gyro_std(self):
+        return self._std(self.gyro_m2, self.gyro_count)
+
+class SensorRollupMinute(SensorRollup):
+
+    BUCKET_SECONDS = 60
+
+    class Meta(SensorRollup.Meta):
+        db_table = 'sensor_rollups_1m'
+        verbose_name = 'Sensor Rollup (1 min)'
+        verbose_name_plural = 'Sensor Rollups (1 min)'
+        constraints = [
+            models.UniqueConstraint(fields=['consumidor', 'bucket_start'], name='uniq_rollup_1m_bucket')
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+
+class SensorRollupFiveMinute(SensorRollup):
+
+    BUCKET_SECONDS = 300
+
+    class Meta(SensorRollup.Meta):
+        db_table = 'sensor_rollups_5m'
+        verbose_name = 'Sensor Rollup (5 min)'
+        verbose_name_plural = 'Sensor Rollups (5 min)'
+        constraints = [
+            models.UniqueConstraint(fields=['consumidor', 'bucket_start'], name='uniq_rollup_5m_bucket')
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+
+class SensorRollupHour(SensorRollup):
+
+    BUCKET_SECONDS = 3600
+
+    class Meta(SensorRollup.Meta):
+        db_table = 'sensor_rollups_1h'
+        verbose_name = 'Sensor Rollup (1 h)'
+        verbose_name_plural = 'Sensor Rollups (1 h)'
+        constraints = [
+            models.UniqueConstraint(fields=['consumidor', 'bucket_start'], name='uniq_rollup_1h_bucket')
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
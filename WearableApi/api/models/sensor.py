@@ -1,5 +1,7 @@
 
+from datetime import timedelta
 from django.db import models
+from django.utils import timezone
 from .base import TimeStampedModel
 from .user import Consumidor
 
@@ -37,6 +39,10 @@ class Ventana(TimeStampedModel):
         blank=True,
         help_text="Accelerometer energy (movement intensity)"
     )
+    lectura_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of readings stored in the window (maintained on insert)"
+    )
     emotion_embedding = models.JSONField(
         null=True,
         blank=True,
@@ -107,6 +113,39 @@ class Ventana(TimeStampedModel):
             )
         return None
 
+class LecturaQuerySet(models.QuerySet):
+    """
+    lecturas is range-partitioned on created_at, so every helper here
+    bounds created_at to let PostgreSQL skip the partitions it cannot hit.
+    """
+    
+    # Tolerated clock difference between the ventana and lectura writers
+    CLOCK_SKEW = timedelta(hours=1)
+    # Look-backs tried in turn by newest() before scanning everything
+    NEWEST_LOOKBACKS = (timedelta(days=1), timedelta(days=7), timedelta(days=30), None)
+    
+    def since(self, moment):
+        return self.filter(created_at__gte=moment)
+    
+    def for_ventana(self, ventana):
+        """Readings of a ventana; none can predate the ventana row itself."""
+        return self.filter(
+            ventana_id=ventana.id,
+            created_at__gte=ventana.created_at - self.CLOCK_SKEW
+        )
+    
+    def newest(self, limit):
+        """
+        The limit most recent readings, as a list. Widens the look-back
+        only when the recent partitions do not hold enough rows.
+        """
+        now = timezone.now()
+        for lookback in self.NEWEST_LOOKBACKS:
+            queryset = self if lookback is None else self.since(now - lookback)
+            lecturas = list(queryset.order_by('-created_at')[:limit])
+            if len(lecturas) >= limit or lookback is None:
+                return lecturas
+
 class Lectura(TimeStampedModel):
     
     ventana = models.ForeignKey(
@@ -150,6 +189,19 @@ class Lectura(TimeStampedModel):
         blank=True,
         help_text="Gyroscope Z-axis value"
     )
+    device_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="Sender of the reading (scope of the sequence number)"
+    )
+    seq = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Per-device sample sequence number, used to drop retried uploads"
+    )
+    
+    objects = LecturaQuerySet.as_manager()
     
     class Meta:
         db_table = 'lecturas'
@@ -158,6 +210,7 @@ class Lectura(TimeStampedModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['ventana', 'created_at']),
+            models.Index(fields=['device_id', 'seq']),
         ]
     
     def __str__(self):
@@ -201,3 +254,70 @@ class Lectura(TimeStampedModel):
             return math.sqrt(x**2 + y**2 + z**2)
         return None
 
+class VentanaSampleBlob(TimeStampedModel):
+    
+    ventana = models.OneToOneField(
+        Ventana,
+        on_delete=models.CASCADE,
+        related_name='sample_blob',
+        help_text="Closed window whose readings were packed"
+    )
+    sample_count = models.PositiveIntegerField(
+        help_text="Number of readings in the blob"
+    )
+    codec = models.CharField(
+        max_length=16,
+        help_text="Compression applied to the packed columns (zstd or zlib)"
+    )
+    raw_size = models.PositiveIntegerField(
+        help_text="Size of the packed columns before compression (bytes)"
+    )
+    data = models.BinaryField(
+        help_text="Header + delta timestamps + XOR-encoded float32 columns, compressed"
+    )
+    
+    class Meta:
+        db_table = 'ventana_sample_blobs'
+        verbose_name = 'Ventana Sample Blob'
+        verbose_name_plural = 'Ventana Sample Blobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Samples of window {self.ventana_id} ({self.sample_count}, {self.codec})"
+
+
+class VentanaFeatures(TimeStampedModel):
+    
+    ventana = models.ForeignKey(
+        Ventana,
+        on_delete=models.CASCADE,
+        related_name='stored_features',
+        help_text="Window the features were computed for"
+    )
+    feature_set = models.PositiveSmallIntegerField(
+        help_text="Feature set version (api.ml.FEATURE_SETS)"
+    )
+    lectura_count = models.PositiveIntegerField(
+        help_text="Readings the features were computed from; stale when the window's count differs"
+    )
+    vector = models.BinaryField(
+        help_text="Little-endian float32 values in the feature set's column order, NaN for missing"
+    )
+    computed_at = models.DateTimeField(
+        help_text="When the features were computed"
+    )
+    
+    class Meta:
+        db_table = 'ventana_features'
+        verbose_name = 'Ventana Features'
+        verbose_name_plural = 'Ventana Features'
+        ordering = ['-computed_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ventana', 'feature_set'],
+                name='unique_ventana_feature_set'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Features v{self.feature_set} of window {self.ventana_id}"
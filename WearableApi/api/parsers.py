@@ -0,0 +1,96 @@
+"""
+Compact binary wire format for wearable sensor readings.
+
+Layout (little-endian, sent with Content-Type: application/vnd.wearable.lecturas):
+
+    Header (12 bytes)
+        2s   magic        b'WB'
+        u8   version      1
+        u8   flags        reserved, must be 0
+        u32  ventana_id
+        u16  count        number of records that follow
+        2x   padding
+
+    Record (32 bytes, repeated `count` times)
+        u32  seq          device sequence number
+        f32  heart_rate
+        f32  accel_x, accel_y, accel_z
+        f32  gyro_x, gyro_y, gyro_z
+
+A NaN in any sensor channel means "not measured" and is stored as NULL.
+"""
+
+import struct
+
+import numpy as np
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+LECTURA_BINARY_MEDIA_TYPE = 'application/vnd.wearable.lecturas'
+LECTURA_BINARY_MAGIC = b'WB'
+LECTURA_BINARY_VERSION = 1
+
+LECTURA_HEADER = struct.Struct('<2sBBIH2x')
+
+LECTURA_RECORD_DTYPE = np.dtype([
+    ('seq', '<u4'),
+    ('heart_rate', '<f4'),
+    ('accel_x', '<f4'),
+    ('accel_y', '<f4'),
+    ('accel_z', '<f4'),
+    ('gyro_x', '<f4'),
+    ('gyro_y', '<f4'),
+    ('gyro_z', '<f4'),
+])
+
+
+class LecturaBinaryParser(BaseParser):
+    """
+    Decodes a binary lectura batch straight into a NumPy structured array.
+
+    request.data becomes {'ventana': <int>, 'lecturas': <ndarray of LECTURA_RECORD_DTYPE>}
+    """
+    media_type = LECTURA_BINARY_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        payload = stream.read() if stream is not None else b''
+
+        if len(payload) < LECTURA_HEADER.size:
+            raise ParseError('Binary payload is shorter than the header')
+
+        magic, version, flags, ventana_id, count = LECTURA_HEADER.unpack_from(payload)
+
+        if magic != LECTURA_BINARY_MAGIC:
+            raise ParseError('Invalid binary payload (bad magic)')
+        if version != LECTURA_BINARY_VERSION:
+            raise ParseError(f'Unsupported binary payload version: {version}')
+        if count == 0:
+            raise ParseError('Binary payload contains no readings')
+        if count > settings.LECTURA_BATCH_MAX_SIZE:
+            raise ParseError(
+                f'Binary payload has {count} readings, '
+                f'maximum is {settings.LECTURA_BATCH_MAX_SIZE}'
+            )
+
+        expected_size = LECTURA_HEADER.size + count * LECTURA_RECORD_DTYPE.itemsize
+        if len(payload) != expected_size:
+            raise ParseError(
+                f'Binary payload size mismatch: expected {expected_size} bytes, got {len(payload)}'
+            )
+
+        records = np.frombuffer(
+            payload,
+            dtype=LECTURA_RECORD_DTYPE,
+            count=count,
+            offset=LECTURA_HEADER.size
+        )
+
+        for field in LECTURA_RECORD_DTYPE.names[1:]:
+            if np.isinf(records[field]).any():
+                raise ParseError(f'Infinite value in field {field}')
+
+        return {
+            'ventana': ventana_id,
+            'lecturas': records,
+        }
@@ -1,4 +1,5 @@
 
+from django.conf import settings
 from rest_framework import serializers
 from api.models import *
 
@@ -153,12 +154,12 @@ class VentanaSerializer(serializers.ModelSerializer):
         model = Ventana
         fields = [
             'id', 'consumidor', 'consumidor_nombre', 'window_start', 'window_end',
-            'hr_mean', 'hr_std', 'gyro_energy', 'accel_energy',
+            'hr_mean', 'hr_std', 'gyro_energy', 'accel_energy', 'lectura_count',
             'emotion_embedding', 'motive_embedding', 'solution_embedding',
             'duration_minutes', 'has_sensor_data', 'has_embeddings',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'lectura_count', 'created_at', 'updated_at']
 
 class LecturaSerializer(serializers.ModelSerializer):
     
@@ -171,12 +172,55 @@ class LecturaSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'ventana', 'heart_rate', 
             'accel_x', 'accel_y', 'accel_z',
-            'gyro_x', 'gyro_y', 'gyro_z',
+            'gyro_x', 'gyro_y', 'gyro_z', 'device_id', 'seq',
             'has_heart_rate', 'has_accelerometer', 'has_gyroscope',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class LecturaIngestSerializer(LecturaSerializer):
+    
+    # Plain ID so validation never queries the database; the ingest views
+    # resolve the ventana through VentanaCache
+    ventana = serializers.IntegerField(min_value=1)
+    
+    class Meta(LecturaSerializer.Meta):
+        fields = [
+            'ventana', 'heart_rate',
+            'accel_x', 'accel_y', 'accel_z',
+            'gyro_x', 'gyro_y', 'gyro_z', 'device_id', 'seq',
+        ]
+
+class LecturaSampleSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Lectura
+        fields = [
+            'heart_rate',
+            'accel_x', 'accel_y', 'accel_z',
+            'gyro_x', 'gyro_y', 'gyro_z',
+            'seq',
+        ]
+
+class LecturaBatchSerializer(serializers.Serializer):
+
+    # Resolved by the view through VentanaCache, not a PK lookup
+    ventana = serializers.IntegerField(
+        min_value=1,
+        error_messages={'required': 'ventana_id is required'}
+    )
+    device_id = serializers.CharField(
+        max_length=64,
+        required=False,
+        allow_null=True,
+        allow_blank=True
+    )
+    lecturas = LecturaSampleSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.LECTURA_BATCH_MAX_SIZE
+    )
+
 class AnalisisSerializer(serializers.ModelSerializer):
     
     is_urge_predicted = serializers.ReadOnlyField()
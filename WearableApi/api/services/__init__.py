@@ -1,6 +1,25 @@
 
 from .auth_service import AuthenticationService
 from .user_factory import UserFactory
+from .ingestion_service import LecturaIngestionService
+from .stream_service import LecturaStreamBuffer
+from .ventana_stats_service import VentanaStatsAccumulator
+from .ventana_cache import VentanaCache
+from .partition_service import LecturaPartitionManager
+from .rollup_service import SensorRollupService
+from .sample_store import VentanaSampleStore
+from .export_service import LecturaExportService
+from .dataset_service import LecturaDatasetSnapshot
+from .aggregation_service import VentanaAggregationService
+from .recompute_service import VentanaRecomputeService
+from .feature_store import VentanaFeatureStore
+from .prediction_service import InlinePredictor, PredictionBatcher
+from .shadow_service import ShadowEvaluationService, ShadowScorer
 
-__all__ = ['AuthenticationService', 'UserFactory']
+__all__ = ['AuthenticationService', 'UserFactory', 'LecturaIngestionService', 'LecturaStreamBuffer',
+           'VentanaStatsAccumulator', 'VentanaCache', 'LecturaPartitionManager',
+           'SensorRollupService', 'VentanaSampleStore', 'LecturaExportService',
+           'LecturaDatasetSnapshot', 'VentanaAggregationService', 'VentanaRecomputeService',
+           'VentanaFeatureStore', 'InlinePredictor', 'PredictionBatcher',
+           'ShadowEvaluationService', 'ShadowScorer']
 
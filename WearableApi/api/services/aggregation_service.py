@@ -0,0 +1,111 @@
+import logging
+from typing import Dict, Iterable, List
+
+import numpy as np
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Q, Sum, Value, Variance
+from django.db.models.functions import Coalesce, Sqrt
+
+from api.ml.features import ACCEL_FIELDS, GYRO_FIELDS, compute_aggregates, merge_aggregates
+from api.models import Lectura, Ventana, VentanaSampleBlob
+from api.models.sensor import LecturaQuerySet
+from api.services.sample_store import decode_samples
+
+logger = logging.getLogger(__name__)
+
+def _zero(field: str):
+    return Coalesce(F(field), Value(0.0), output_field=FloatField())
+
+def _squares(fields):
+    expression = None
+    for field in fields:
+        term = _zero(field) * _zero(field)
+        expression = term if expression is None else expression + term
+    return expression
+
+def _present(fields) -> Q:
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__isnull': False})
+    return condition
+
+# One GROUP BY ventana_id producing api.ml.features.AGGREGATE_NAMES; M2 is
+# var_pop * count so it merges like the running accumulator
+AGGREGATES = {
+    'n': Count('id'),
+    'hr_n': Count('heart_rate'),
+    'hr_mean': Avg('heart_rate'),
+    'hr_m2': Variance('heart_rate') * Count('heart_rate'),
+    'accel_n': Count('id', filter=_present(ACCEL_FIELDS)),
+    'accel_sumsq': Sum(_squares(ACCEL_FIELDS)),
+    'gyro_n': Count('id', filter=_present(GYRO_FIELDS)),
+    'gyro_sumsq': Sum(_squares(GYRO_FIELDS)),
+    'hr0_mean': Avg(_zero('heart_rate')),
+    'hr0_m2': Variance(_zero('heart_rate')) * Count('id'),
+    'hr0_min': Min(_zero('heart_rate')),
+    'hr0_max': Max(_zero('heart_rate')),
+    'accel_mag_mean': Avg(Sqrt(_squares(ACCEL_FIELDS))),
+    'accel_mag_m2': Variance(Sqrt(_squares(ACCEL_FIELDS))) * Count('id'),
+    'gyro_mag_mean': Avg(Sqrt(_squares(GYRO_FIELDS))),
+    'gyro_mag_m2': Variance(Sqrt(_squares(GYRO_FIELDS))) * Count('id'),
+}
+
+class VentanaAggregationService:
+    """
+    Window aggregates computed by PostgreSQL: a single GROUP BY returns a
+    handful of numbers per ventana instead of every reading. Readings
+    packed into sample blobs are aggregated from the blob and merged in.
+    """
+
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def _from_lecturas(ventanas: List[Ventana]) -> Dict[int, Dict[str, float]]:
+        # Bounding created_at like for_ventana lets PostgreSQL skip partitions
+        since = min(ventana.created_at for ventana in ventanas) - LecturaQuerySet.CLOCK_SKEW
+        rows = (
+            Lectura.objects
+            .filter(ventana_id__in=[ventana.id for ventana in ventanas], created_at__gte=since)
+            .order_by()
+            .values('ventana_id')
+            .annotate(**AGGREGATES)
+        )
+        return {
+            row.pop('ventana_id'): {name: float(value or 0.0) for name, value in row.items()}
+            for row in rows
+        }
+
+    @staticmethod
+    def _from_blobs(ventana_ids: List[int]) -> Dict[int, Dict[str, float]]:
+        aggregates = {}
+        blobs = VentanaSampleBlob.objects.filter(ventana_id__in=ventana_ids).values_list('ventana_id', 'data')
+        for ventana_id, data in blobs:
+            samples = decode_samples(data)
+            offsets = np.array([0, samples['created_at'].size])
+            aggregates[ventana_id] = {
+                name: float(values[0]) for name, values in compute_aggregates(samples, offsets).items()
+            }
+        return aggregates
+
+    @staticmethod
+    def aggregate(ventanas: Iterable[Ventana]) -> Dict[int, Dict[str, float]]:
+        """
+        {ventana_id: aggregates} for the ventanas (id and created_at are
+        enough) that have readings, BATCH_SIZE windows per query.
+        """
+        ventanas = list(ventanas)
+        aggregates = {}
+        for start in range(0, len(ventanas), VentanaAggregationService.BATCH_SIZE):
+            batch = ventanas[start:start + VentanaAggregationService.BATCH_SIZE]
+            aggregates.update(VentanaAggregationService._from_lecturas(batch))
+
+            # Like VentanaSampleStore.read, blobs count even with the mode switched off
+            packed = VentanaAggregationService._from_blobs([ventana.id for ventana in batch])
+            for ventana_id, blob_aggregates in packed.items():
+                aggregates[ventana_id] = merge_aggregates(blob_aggregates, aggregates.get(ventana_id, {}))
+
+        return aggregates
+
+    @staticmethod
+    def aggregate_one(ventana: Ventana) -> Dict[str, float]:
+        """Aggregates of one window; n is 0 when it has no readings."""
+        return VentanaAggregationService.aggregate([ventana]).get(ventana.id, {'n': 0})
@@ -0,0 +1,255 @@
+"""
+Local Parquet snapshot of lecturas for training, backtesting and notebooks.
+
+Layout (hive partitioning, UTC days):
+
+    DATASET_SNAPSHOT_DIR/
+        _manifest.json                      watermark of the snapshot
+        consumidor_id=7/day=2025-03-01/
+            part-20250301T000000.parquet    rows created in [slice start, next slice)
+
+Each update appends the readings created between the manifest watermark
+and now - SENSOR_ROLLUP_LAG_SECONDS, one UTC day at a time, so memory is
+bounded by a day of readings. A part is named after the start of its
+slice: re-running an interrupted update from the same watermark replaces
+the parts it had already written instead of duplicating them.
+"""
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import Lectura
+from api.services.ingestion_service import SENSOR_FIELDS
+from api.services.sample_store import VentanaSampleStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = '_manifest.json'
+COLUMNS = ['id', 'ventana_id', 'created_at'] + list(SENSOR_FIELDS)
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Dataset snapshots need the pyarrow package (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+class LecturaDatasetSnapshot:
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.DATASET_SNAPSHOT_DIR)
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def manifest(self) -> Dict:
+        try:
+            with open(self.root / MANIFEST) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def watermark(self) -> Optional[datetime]:
+        """Readings created before this instant are in the snapshot."""
+        position = self.manifest().get('watermark')
+        return datetime.fromisoformat(position) if position else None
+
+    def _save_manifest(self, watermark: datetime, rows: int):
+        manifest = self.manifest()
+        manifest.update({
+            'watermark': watermark.isoformat(),
+            'updated_at': timezone.now().isoformat(),
+            'rows': manifest.get('rows', 0) + rows,
+        })
+        temporary = self.root / f'{MANIFEST}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, self.root / MANIFEST)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_slice(start: datetime, end: datetime) -> pd.DataFrame:
+        """Readings created in [start, end) from lecturas and sample blobs."""
+        fields = ['id', 'ventana_id', 'ventana__consumidor_id', 'created_at', *SENSOR_FIELDS]
+        frames = [pd.DataFrame.from_records(
+            Lectura.objects.filter(created_at__gte=start, created_at__lt=end)
+            .values_list(*fields).iterator(chunk_size=20000),
+            columns=['id', 'ventana_id', 'consumidor_id', 'created_at', *SENSOR_FIELDS]
+        )]
+
+        if VentanaSampleStore.is_enabled():
+            for ventana_id, consumidor_id, samples in VentanaSampleStore.iter_packed_range(start, end):
+                frame = pd.DataFrame(samples)
+                frame['created_at'] = frame['created_at'].dt.tz_localize('UTC')
+                frame.insert(0, 'id', pd.NA)
+                frame.insert(1, 'ventana_id', ventana_id)
+                frame.insert(2, 'consumidor_id', consumidor_id)
+                frames.append(frame)
+
+        df = pd.concat([frame for frame in frames if not frame.empty] or frames[:1], ignore_index=True)
+        df['id'] = df['id'].astype('Int64')
+        df[list(SENSOR_FIELDS)] = df[list(SENSOR_FIELDS)].astype('float64')
+        df['created_at'] = pd.to_datetime(df['created_at'], utc=True).astype('datetime64[us, UTC]')
+        return df
+
+    def _write_slice(self, start: datetime, end: datetime) -> int:
+        pa, pq = _arrow()
+        df = self._read_slice(start, end)
+        if df.empty:
+            return 0
+
+        day = start.astimezone(dt_timezone.utc).strftime('%Y-%m-%d')
+        name = f"part-{start.astimezone(dt_timezone.utc):%Y%m%dT%H%M%S}.parquet"
+
+        for consumidor_id, frame in df.groupby('consumidor_id', sort=True):
+            directory = self.root / f'consumidor_id={consumidor_id}' / f'day={day}'
+            directory.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(
+                frame[COLUMNS].sort_values('created_at', kind='stable'),
+                preserve_index=False
+            )
+            temporary = directory / f'.{name}.tmp'
+            pq.write_table(table, temporary, compression='zstd')
+            os.replace(temporary, directory / name)
+
+        return len(df)
+
+    def update(self, until: Optional[datetime] = None, since: Optional[datetime] = None) -> Dict:
+        """
+        Append the readings created since the watermark (or `since` for an
+        empty snapshot, else the oldest reading) up to `until`.
+        """
+        _arrow()
+        if until is None:
+            until = timezone.now() - timedelta(seconds=settings.SENSOR_ROLLUP_LAG_SECONDS)
+
+        start = self.watermark() or since
+        if start is None:
+            start = Lectura.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if start is None:
+                return {'rows': 0, 'watermark': None}
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        rows = 0
+        while start < until:
+            utc = start.astimezone(dt_timezone.utc)
+            next_day = datetime(utc.year, utc.month, utc.day, tzinfo=dt_timezone.utc) + timedelta(days=1)
+            end = min(next_day, until)
+
+            written = self._write_slice(start, end)
+            self._save_manifest(end, written)
+            logger.info(f"[SNAPSHOT] {written} readings in [{start.isoformat()}, {end.isoformat()})")
+
+            rows += written
+            start = end
+
+        return {'rows': rows, 'watermark': start.isoformat()}
+
+    def compact(self, before: Optional[datetime] = None) -> int:
+        """
+        Merge the parts of every day partition older than `before` (default:
+        the watermark's day) into a single file. Returns partitions compacted.
+        """
+        pa, pq = _arrow()
+        before = before or self.watermark()
+        if before is None:
+            return 0
+        last_day = before.astimezone(dt_timezone.utc).strftime('%Y-%m-%d')
+
+        compacted = 0
+        for directory in sorted(self.root.glob('consumidor_id=*/day=*')):
+            parts = sorted(directory.glob('part-*.parquet'))
+            if len(parts) < 2 or directory.name.split('=', 1)[1] >= last_day:
+                continue
+
+            table = pa.concat_tables([pq.read_table(part) for part in parts])
+            temporary = directory / f'.{parts[0].name}.tmp'
+            pq.write_table(table.sort_by('created_at'), temporary, compression='zstd')
+            os.replace(temporary, parts[0])
+            for part in parts[1:]:
+                part.unlink()
+            compacted += 1
+
+        return compacted
+
+    def reset(self):
+        """Delete the snapshot, so the next update starts over."""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _filters(self, consumidor_ids: Optional[Iterable[int]], start: Optional[datetime],
+                 end: Optional[datetime]) -> Optional[List]:
+        filters = []
+        if consumidor_ids is not None:
+            filters.append(('consumidor_id', 'in', [int(c) for c in consumidor_ids]))
+        if start is not None:
+            filters += [
+                ('day', '>=', start.astimezone(dt_timezone.utc).strftime('%Y-%m-%d')),
+                ('created_at', '>=', start),
+            ]
+        if end is not None:
+            filters += [
+                ('day', '<=', end.astimezone(dt_timezone.utc).strftime('%Y-%m-%d')),
+                ('created_at', '<', end),
+            ]
+        return filters or None
+
+    def read_table(self, consumidor_ids: Optional[Iterable[int]] = None, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None, columns: Optional[List[str]] = None):
+        """
+        The snapshot as a pyarrow Table, files memory-mapped. Partitions
+        outside the consumer/day filters are not opened.
+        """
+        pa, pq = _arrow()
+        import pyarrow.dataset as ds
+
+        if not (self.root / MANIFEST).exists():
+            raise FileNotFoundError(f"No dataset snapshot in {self.root} (run manage.py snapshot_lecturas)")
+
+        partitioning = ds.partitioning(
+            pa.schema([('consumidor_id', pa.int64()), ('day', pa.string())]),
+            flavor='hive'
+        )
+        return pq.read_table(
+            self.root,
+            columns=columns,
+            filters=self._filters(consumidor_ids, start, end),
+            partitioning=partitioning,
+            memory_map=True,
+        )
+
+    def load(self, consumidor_ids: Optional[Iterable[int]] = None, start: Optional[datetime] = None,
+             end: Optional[datetime] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The snapshot as a DataFrame (columns: COLUMNS, consumidor_id, day)."""
+        return self.read_table(consumidor_ids, start, end, columns).to_pandas()
+
+    def load_arrays(self, consumidor_ids: Optional[Iterable[int]] = None, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """The snapshot as one NumPy array per column (NaN for missing sensor values)."""
+        table = self.read_table(consumidor_ids, start, end, columns)
+        arrays = {}
+        for name in table.column_names:
+            column = table.column(name)
+            if name in SENSOR_FIELDS:
+                arrays[name] = column.to_numpy().astype(np.float64, copy=False)
+            else:
+                arrays[name] = column.to_numpy()
+        return arrays
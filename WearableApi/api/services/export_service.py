@@ -0,0 +1,164 @@
+"""
+Streaming export of lecturas for analysis.
+
+Rows are produced by PostgreSQL itself (COPY ... TO STDOUT) and forwarded
+in ~256 KiB chunks, optionally gzip-compressed on the fly, so memory stays
+constant however many rows are exported. Rows come out partition by
+partition (roughly chronological) rather than sorted, which would need a
+sort over the whole range.
+"""
+import csv
+import io
+import json
+import logging
+import zlib
+from contextlib import closing
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from api.services.ingestion_service import SENSOR_FIELDS
+from api.services.sample_store import VentanaSampleStore
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'ventana_id', 'consumidor_id', 'created_at') + tuple(SENSOR_FIELDS)
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_BYTES = 256 * 1024
+
+class LecturaExportService:
+
+    @staticmethod
+    def _select(consumidor_id: Optional[int], start: Optional[datetime],
+                end: Optional[datetime]) -> Tuple[str, list]:
+        conditions, params = [], []
+        if consumidor_id is not None:
+            conditions.append("v.consumidor_id = %s")
+            params.append(consumidor_id)
+        if start is not None:
+            conditions.append("l.created_at >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("l.created_at < %s")
+            params.append(end)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"""
+            SELECT l.id, l.ventana_id, v.consumidor_id, l.created_at, {', '.join(f'l.{f}' for f in SENSOR_FIELDS)}
+            FROM lecturas l
+            JOIN ventanas v ON v.id = l.ventana_id
+            {where}
+        """
+        return sql, params
+
+    @staticmethod
+    def _copy(output: str, consumidor_id, start, end) -> Iterator[bytes]:
+        sql, params = LecturaExportService._select(consumidor_id, start, end)
+        if output == 'csv':
+            copy_sql = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)"
+        else:
+            # Only numbers and timestamps, so COPY's text escaping never
+            # touches the JSON (no backslashes or tabs to escape)
+            copy_sql = f"COPY (SELECT row_to_json(r) FROM ({sql}) r) TO STDOUT"
+
+        with connection.cursor() as cursor:
+            with cursor.copy(copy_sql, params) as copy:
+                for block in copy:
+                    yield bytes(block)
+
+    @staticmethod
+    def _packed(output: str, consumidor_id, start, end) -> Iterator[bytes]:
+        """Readings already moved into sample blobs, in the same layout."""
+        for ventana_id, owner_id, samples in VentanaSampleStore.iter_packed_range(start, end, consumidor_id):
+            # Same timestamp notation as PostgreSQL's output for the format
+            if output == 'csv':
+                timestamps = [f"{str(moment).replace('T', ' ')}+00" for moment in samples['created_at']]
+            else:
+                timestamps = [f"{moment}+00:00" for moment in samples['created_at']]
+            # Stored as float32: print the shortest float32 repr, not the widened double
+            columns = [
+                [None if np.isnan(value) else float(str(value)) for value in samples[field].astype(np.float32)]
+                for field in SENSOR_FIELDS
+            ]
+
+            buffer = io.StringIO()
+            if output == 'csv':
+                writer = csv.writer(buffer, lineterminator='\n')
+                for created_at, *values in zip(timestamps, *columns):
+                    writer.writerow(['', ventana_id, owner_id, created_at, *('' if v is None else v for v in values)])
+            else:
+                for created_at, *values in zip(timestamps, *columns):
+                    record = dict(zip(COLUMNS, (None, ventana_id, owner_id, created_at, *values)))
+                    buffer.write(json.dumps(record) + '\n')
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    def _coalesce(blocks: Iterator[bytes], size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        # COPY hands out one row per block
+        pending, length = [], 0
+        with closing(blocks):
+            for block in blocks:
+                pending.append(block)
+                length += len(block)
+                if length >= size:
+                    yield b''.join(pending)
+                    pending, length = [], 0
+        if pending:
+            yield b''.join(pending)
+
+    @staticmethod
+    def _gzip(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        with closing(chunks):
+            for chunk in chunks:
+                compressed = compressor.compress(chunk)
+                if compressed:
+                    yield compressed
+        yield compressor.flush()
+
+    @staticmethod
+    def stream(output: str = 'csv', consumidor_id: Optional[int] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, compress: bool = False) -> Iterator[bytes]:
+        """
+        Lecturas as CSV (with a header row) or NDJSON, columns as in COLUMNS.
+        With LECTURA_BLOB_STORAGE, packed readings follow the rows, with an
+        empty id.
+        """
+        if output not in FORMATS:
+            raise ValueError(f"Unsupported export format '{output}' (expected one of {', '.join(FORMATS)})")
+
+        logger.info(
+            f"[EXPORT] lecturas as {output}{' (gzip)' if compress else ''}: "
+            f"consumidor={consumidor_id}, start={start}, end={end}"
+        )
+
+        def blocks():
+            yield from LecturaExportService._copy(output, consumidor_id, start, end)
+            if VentanaSampleStore.is_enabled():
+                yield from LecturaExportService._packed(output, consumidor_id, start, end)
+
+        chunks = LecturaExportService._coalesce(blocks())
+        return LecturaExportService._gzip(chunks) if compress else chunks
+
+    @staticmethod
+    async def as_async(chunks: Iterator[bytes]):
+        """
+        Serve a sync export under ASGI without buffering it: Django would
+        otherwise consume a sync iterator completely before sending it.
+        Every chunk is pulled on the ORM's thread.
+        """
+        pull = sync_to_async(next, thread_sensitive=True)
+        try:
+            while True:
+                chunk = await pull(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,180 @@
+"""
+Feature store: model features of ventanas, computed once per feature set
+version and shared by inference, batch scoring and training.
+
+Each vector is a row of VentanaFeatures: float32 values in the column order
+of api.ml.FEATURE_SETS[feature_set]. Recent vectors are also kept in the
+Django cache (Redis). A vector records the lectura_count it was computed
+from. When the window's count moves on (late readings, an extended window),
+the vector is stale and is computed again. So are vectors of a feature set
+that has never been computed.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.ml.features import (
+    FEATURE_SET_VERSION, FEATURE_SETS, compute_feature_set, features_from_aggregates
+)
+from api.models import Ventana, VentanaFeatures
+from api.services.aggregation_service import VentanaAggregationService
+from api.services.sample_store import VentanaSampleStore
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPE = np.dtype('<f4')
+
+def encode_vector(features: Dict[str, Optional[float]], feature_set: int) -> bytes:
+    return np.array(
+        [np.nan if features[name] is None else features[name] for name in FEATURE_SETS[feature_set]],
+        dtype=VECTOR_DTYPE
+    ).tobytes()
+
+def decode_vector(data: bytes, feature_set: int) -> Dict[str, Optional[float]]:
+    values = np.frombuffer(bytes(data), dtype=VECTOR_DTYPE)
+    return {
+        name: None if np.isnan(value) else float(value)
+        for name, value in zip(FEATURE_SETS[feature_set], values)
+    }
+
+class VentanaFeatureStore:
+
+    CACHE_TTL_SECONDS = 6 * 3600
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def served_feature_set() -> int:
+        """Feature set of the served model, so closing windows store what inference reads; the latest without a model."""
+        from api.ml import ModelRegistry
+        try:
+            return ModelRegistry.get().feature_set
+        except Exception:
+            return FEATURE_SET_VERSION
+
+    @staticmethod
+    def key(ventana_id: int, feature_set: int) -> str:
+        return f'ventana_features:v{feature_set}:{ventana_id}'
+
+    @staticmethod
+    def compute(ventanas: List[Ventana], feature_set: int) -> Dict[int, Tuple[int, Dict[str, Optional[float]]]]:
+        """
+        {ventana_id: (readings, features)} for the ventanas (id and
+        created_at are enough) that have readings. Set 1 comes from SQL
+        aggregates; later sets need the readings themselves.
+        """
+        if feature_set == 1:
+            return {
+                ventana_id: (int(aggregates['n']), features_from_aggregates(aggregates))
+                for ventana_id, aggregates in VentanaAggregationService.aggregate(ventanas).items()
+                if aggregates['n']
+            }
+
+        computed = {}
+        for start in range(0, len(ventanas), VentanaFeatureStore.BATCH_SIZE):
+            ventana_ids, samples, offsets = VentanaSampleStore.read_many(
+                ventanas[start:start + VentanaFeatureStore.BATCH_SIZE]
+            )
+            features = compute_feature_set(samples, offsets, feature_set)
+            for i, count in enumerate(np.diff(offsets)):
+                if count:
+                    computed[int(ventana_ids[i])] = (int(count), {
+                        name: None if np.isnan(values[i]) else float(values[i])
+                        for name, values in features.items()
+                    })
+        return computed
+
+    @staticmethod
+    def save(ventanas: Iterable[Ventana], feature_set: int = FEATURE_SET_VERSION) -> Dict[int, Dict[str, Optional[float]]]:
+        """
+        Compute, store and cache the features of the ventanas, replacing any
+        stored vector of the same set. Returns {ventana_id: features}.
+        """
+        ventanas = list(ventanas)
+        computed = VentanaFeatureStore.compute(ventanas, feature_set)
+        if not computed:
+            return {}
+
+        now = timezone.now()
+        rows = [
+            VentanaFeatures(
+                ventana_id=ventana_id,
+                feature_set=feature_set,
+                lectura_count=count,
+                vector=encode_vector(features, feature_set),
+                computed_at=now,
+            )
+            for ventana_id, (count, features) in computed.items()
+        ]
+        VentanaFeatures.objects.bulk_create(
+            rows,
+            batch_size=VentanaFeatureStore.BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['ventana', 'feature_set'],
+            update_fields=['lectura_count', 'vector', 'computed_at', 'updated_at'],
+        )
+
+        try:
+            cache.set_many({
+                VentanaFeatureStore.key(row.ventana_id, feature_set): (row.lectura_count, row.vector)
+                for row in rows
+            }, timeout=VentanaFeatureStore.CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Failed to cache features of {len(rows)} ventanas: {e}")
+
+        return {ventana_id: features for ventana_id, (_, features) in computed.items()}
+
+    @staticmethod
+    def get_many(ventanas: Iterable[Ventana], feature_set: int = FEATURE_SET_VERSION,
+                 compute: bool = True, store: bool = True) -> Dict[int, Dict[str, Optional[float]]]:
+        """
+        {ventana_id: features} for the ventanas (id, created_at and
+        lectura_count are used) that have readings: from the cache, else
+        from the table, else computed and stored now. With compute=False,
+        ventanas without a current stored vector are left out; with
+        store=False they are computed but not stored (open windows, whose
+        vector the next readings would make stale).
+        """
+        ventanas = list(ventanas)
+        found = {}
+
+        for start in range(0, len(ventanas), VentanaFeatureStore.BATCH_SIZE):
+            batch = ventanas[start:start + VentanaFeatureStore.BATCH_SIZE]
+            counts = {ventana.id: ventana.lectura_count for ventana in batch}
+
+            try:
+                cached = cache.get_many([VentanaFeatureStore.key(ventana_id, feature_set) for ventana_id in counts])
+            except Exception as e:
+                logger.warning(f"Feature cache unavailable: {e}")
+                cached = {}
+            for ventana_id, count in counts.items():
+                hit = cached.get(VentanaFeatureStore.key(ventana_id, feature_set))
+                if hit is not None and hit[0] == count:
+                    found[ventana_id] = decode_vector(hit[1], feature_set)
+
+            stored = VentanaFeatures.objects.filter(
+                ventana_id__in=[ventana_id for ventana_id in counts if ventana_id not in found],
+                feature_set=feature_set,
+            ).values_list('ventana_id', 'lectura_count', 'vector')
+            for ventana_id, count, vector in stored:
+                if count == counts[ventana_id]:
+                    found[ventana_id] = decode_vector(vector, feature_set)
+
+            missing = [ventana for ventana in batch if ventana.id not in found]
+            if missing and compute and store:
+                found.update(VentanaFeatureStore.save(missing, feature_set))
+            elif missing and compute:
+                found.update({
+                    ventana_id: features
+                    for ventana_id, (_, features) in VentanaFeatureStore.compute(missing, feature_set).items()
+                })
+
+        return found
+
+    @staticmethod
+    def get(ventana: Ventana, feature_set: int = FEATURE_SET_VERSION,
+            compute: bool = True, store: bool = True) -> Optional[Dict[str, Optional[float]]]:
+        """Features of one window; None when it has no readings (or, with compute=False, no stored vector)."""
+        return VentanaFeatureStore.get_many([ventana], feature_set, compute, store).get(ventana.id)
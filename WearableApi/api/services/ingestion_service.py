@@ -0,0 +1,312 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from django.db import connection, transaction
+from api.models import Lectura, Ventana
+from utils.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+SENSOR_FIELDS = (
+    'heart_rate',
+    'accel_x', 'accel_y', 'accel_z',
+    'gyro_x', 'gyro_y', 'gyro_z',
+)
+
+# Mirror of ventanas.lectura_count; only moves forward so a late writer
+# never overwrites a newer count.
+SET_COUNT_IF_GREATER = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+local value = tonumber(ARGV[1])
+if value > current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return value
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return current
+"""
+
+class LecturaIngestionService:
+
+    CALCULATION_EVERY = 5
+    COUNT_TTL_SECONDS = 6 * 3600
+
+    # Accepted sequence numbers are tracked in Redis bitmaps of
+    # 2**SEQ_CHUNK_BITS bits per device and ventana (8 KB each).
+    SEQ_CHUNK_BITS = 16
+    SEQ_TTL_SECONDS = 6 * 3600
+
+    _set_count = None
+
+    @staticmethod
+    @transaction.atomic
+    def store_batch(ventana: Ventana, samples: List[Dict],
+                    device_id: Optional[str] = None) -> Tuple[List[Lectura], int]:
+        lecturas = [
+            Lectura(
+                ventana_id=ventana.id,
+                device_id=device_id or None,
+                seq=sample.get('seq'),
+                **{field: sample.get(field) for field in SENSOR_FIELDS}
+            )
+            for sample in samples
+        ]
+        lecturas = Lectura.objects.bulk_create(lecturas)
+        return lecturas, LecturaIngestionService.increment_count(ventana.id, len(lecturas))
+
+    @staticmethod
+    def increment_count(ventana_id: int, amount: int) -> int:
+        """
+        Add freshly inserted readings to ventanas.lectura_count and return
+        the new total. Must run in the transaction that inserted them; the
+        Redis mirror is refreshed once that transaction commits.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE ventanas SET lectura_count = lectura_count + %s "
+                "WHERE id = %s RETURNING lectura_count",
+                [amount, ventana_id]
+            )
+            row = cursor.fetchone()
+
+        lectura_count = row[0] if row else 0
+        transaction.on_commit(
+            lambda: LecturaIngestionService.mirror_count(ventana_id, lectura_count)
+        )
+        return lectura_count
+
+    @staticmethod
+    def _seq_bits(device_id: str, ventana_id: int, samples: List[Dict]) -> List[Tuple[int, str, int]]:
+        chunk_bits = LecturaIngestionService.SEQ_CHUNK_BITS
+        mask = (1 << chunk_bits) - 1
+        return [
+            (index, f'lectura_seq:{device_id}:{ventana_id}:{seq >> chunk_bits}', seq & mask)
+            for index, seq in (
+                (index, sample.get('seq')) for index, sample in enumerate(samples)
+            )
+            if seq is not None
+        ]
+
+    @staticmethod
+    def claim_sequences(device_id: Optional[str], ventana_id: int,
+                        samples: List[Dict]) -> Tuple[List[Dict], int]:
+        """
+        Split samples into fresh ones and retries of samples already accepted
+        for this ventana. Each (device_id, seq) is claimed with SETBIT, which
+        returns the previous bit, so concurrent retries cannot both win.
+        Samples without a device_id or seq are always accepted.
+        """
+        bits = LecturaIngestionService._seq_bits(device_id, ventana_id, samples) if device_id else []
+        if not bits:
+            return samples, 0
+
+        try:
+            pipe = LecturaIngestionService._claim_pipeline(get_redis(), bits)
+            previous = pipe.execute()[:len(bits)]
+        except Exception as e:
+            logger.warning(f"Duplicate check unavailable, accepting {len(samples)} samples: {e}")
+            return samples, 0
+
+        return LecturaIngestionService._split_duplicates(device_id, ventana_id, samples, bits, previous)
+
+    @staticmethod
+    async def aclaim_sequences(device_id: Optional[str], ventana_id: int,
+                               samples: List[Dict]) -> Tuple[List[Dict], int]:
+        bits = LecturaIngestionService._seq_bits(device_id, ventana_id, samples) if device_id else []
+        if not bits:
+            return samples, 0
+
+        try:
+            pipe = LecturaIngestionService._claim_pipeline(get_async_redis(), bits)
+            previous = (await pipe.execute())[:len(bits)]
+        except Exception as e:
+            logger.warning(f"Duplicate check unavailable, accepting {len(samples)} samples: {e}")
+            return samples, 0
+
+        return LecturaIngestionService._split_duplicates(device_id, ventana_id, samples, bits, previous)
+
+    @staticmethod
+    def _claim_pipeline(client, bits: List[Tuple[int, str, int]]):
+        pipe = client.pipeline(transaction=False)
+        for _, key, offset in bits:
+            pipe.setbit(key, offset, 1)
+        for key in {key for _, key, _ in bits}:
+            pipe.expire(key, LecturaIngestionService.SEQ_TTL_SECONDS)
+        return pipe
+
+    @staticmethod
+    def _split_duplicates(device_id: str, ventana_id: int, samples: List[Dict],
+                          bits: List[Tuple[int, str, int]], previous: List[int]) -> Tuple[List[Dict], int]:
+        duplicates = {index for (index, _, _), was_set in zip(bits, previous) if was_set}
+        if duplicates:
+            logger.info(
+                f"♻️ Dropped {len(duplicates)} retried samples from {device_id} "
+                f"for ventana {ventana_id}"
+            )
+        fresh = [sample for index, sample in enumerate(samples) if index not in duplicates]
+        return fresh, len(duplicates)
+
+    @staticmethod
+    def release_sequences(device_id: Optional[str], ventana_id: int, samples: List[Dict]) -> None:
+        """Undo claim_sequences() when storing failed, so the device's retry is accepted."""
+        if not device_id:
+            return
+        bits = LecturaIngestionService._seq_bits(device_id, ventana_id, samples)
+        if not bits:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for _, key, offset in bits:
+                pipe.setbit(key, offset, 0)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to release sequence numbers for {device_id}: {e}")
+
+    @staticmethod
+    def samples_from_records(records: np.ndarray) -> List[Dict]:
+        columns = []
+        for field in SENSOR_FIELDS:
+            values = records[field].astype(np.float64)
+            column = values.tolist()
+            for index in np.flatnonzero(np.isnan(values)):
+                column[index] = None
+            columns.append(column)
+
+        samples = [dict(zip(SENSOR_FIELDS, row)) for row in zip(*columns)]
+        if 'seq' in records.dtype.names:
+            for sample, seq in zip(samples, records['seq'].tolist()):
+                sample['seq'] = seq
+        return samples
+
+    @staticmethod
+    def count_key(ventana_id: int) -> str:
+        return f'ventana_count:{ventana_id}'
+
+    @staticmethod
+    def mirror_count(ventana_id: int, lectura_count: int) -> None:
+        try:
+            if LecturaIngestionService._set_count is None:
+                LecturaIngestionService._set_count = get_redis().register_script(SET_COUNT_IF_GREATER)
+            LecturaIngestionService._set_count(
+                keys=[LecturaIngestionService.count_key(ventana_id)],
+                args=[lectura_count, LecturaIngestionService.COUNT_TTL_SECONDS]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mirror lectura count for ventana {ventana_id}: {e}")
+
+    @staticmethod
+    def reset_count(ventana_id: int, lectura_count: int) -> None:
+        """Overwrite the counter with a recount (backfill only)."""
+        Ventana.objects.filter(id=ventana_id).update(lectura_count=lectura_count)
+        try:
+            get_redis().set(
+                LecturaIngestionService.count_key(ventana_id), lectura_count,
+                ex=LecturaIngestionService.COUNT_TTL_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mirror lectura count for ventana {ventana_id}: {e}")
+
+    @staticmethod
+    def count_readings(ventana_id: int) -> int:
+        try:
+            cached = get_redis().get(LecturaIngestionService.count_key(ventana_id))
+            if cached is not None:
+                return int(cached)
+        except Exception as e:
+            logger.warning(f"Lectura count mirror unavailable: {e}")
+
+        lectura_count = Ventana.objects.filter(id=ventana_id).values_list(
+            'lectura_count', flat=True
+        ).first() or 0
+        LecturaIngestionService.mirror_count(ventana_id, lectura_count)
+        return lectura_count
+
+    @staticmethod
+    def crossed_calculation_threshold(previous_count: int, lectura_count: int) -> bool:
+        every = LecturaIngestionService.CALCULATION_EVERY
+        if lectura_count < every:
+            return False
+        return lectura_count // every > previous_count // every
+
+    @staticmethod
+    def maybe_calculate_statistics(ventana_id: int, previous_count: int, lectura_count: int) -> Optional[Dict]:
+        if not LecturaIngestionService.crossed_calculation_threshold(previous_count, lectura_count):
+            logger.info(
+                f"⏸️ Skipping calculation: count={lectura_count}, "
+                f"need multiple of {LecturaIngestionService.CALCULATION_EVERY}"
+            )
+            return None
+
+        logger.info(f"🔄 Triggering ventana calculation for ventana {ventana_id} ({lectura_count} readings)")
+        try:
+            from api.tasks import _calculate_ventana_statistics_sync
+
+            result = _calculate_ventana_statistics_sync(ventana_id)
+
+            if result.get('success'):
+                stats = result.get('statistics', {})
+                logger.info(
+                    f"✅ Window stats calculated: "
+                    f"HR={stats.get('hr_mean')}±{stats.get('hr_std')}, "
+                    f"Accel={stats.get('accel_energy')}, "
+                    f"Gyro={stats.get('gyro_energy')}"
+                )
+            else:
+                logger.error(f"❌ Calculation returned error: {result.get('error')}")
+            return result
+        except Exception as calc_error:
+            logger.error(f"❌ Calculation failed: {calc_error}", exc_info=True)
+            return None
+
+    @staticmethod
+    def lectura_payload(lectura: Lectura) -> Dict:
+        payload = {'id': lectura.id}
+        for field in SENSOR_FIELDS:
+            value = getattr(lectura, field)
+            payload[field] = float(value) if value else None
+        payload['created_at'] = lectura.created_at.isoformat()
+        return payload
+
+    @staticmethod
+    def sensor_update_event(lecturas: List[Lectura]) -> Dict:
+        payload = [LecturaIngestionService.lectura_payload(l) for l in lecturas]
+        # 'lectura' keeps its single-reading shape (the newest); batches add 'lecturas'
+        event = {
+            'type': 'sensor_update',
+            'lectura': payload[-1],
+        }
+        if len(payload) > 1:
+            event['lecturas'] = payload
+        return event
+
+    @staticmethod
+    def broadcast(consumidor_id: int, lecturas: List[Lectura]) -> None:
+        if not lecturas:
+            return
+        try:
+            from channels.layers import get_channel_layer
+            from asgiref.sync import async_to_sync
+
+            channel_layer = get_channel_layer()
+            async_to_sync(channel_layer.group_send)(
+                f'sensor_data_{consumidor_id}',
+                LecturaIngestionService.sensor_update_event(lecturas)
+            )
+            logger.debug(f"📡 WebSocket sensor update ({len(lecturas)} readings) sent to consumidor {consumidor_id}")
+        except Exception as ws_error:
+            logger.warning(f"Failed to send WebSocket update: {ws_error}")
+
+    @staticmethod
+    async def abroadcast(consumidor_id: int, lecturas: List[Lectura]) -> None:
+        if not lecturas:
+            return
+        try:
+            from channels.layers import get_channel_layer
+
+            await get_channel_layer().group_send(
+                f'sensor_data_{consumidor_id}',
+                LecturaIngestionService.sensor_update_event(lecturas)
+            )
+            logger.debug(f"📡 WebSocket sensor update ({len(lecturas)} readings) sent to consumidor {consumidor_id}")
+        except Exception as ws_error:
+            logger.warning(f"Failed to send WebSocket update: {ws_error}")
@@ -0,0 +1,187 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.services.rollup_service import SensorRollupService
+
+logger = logging.getLogger(__name__)
+
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+class LecturaPartitionManager:
+    """
+    Keeps the range partitions of lecturas (created_at, UTC boundaries)
+    ahead of the clock and removes the ones past retention. Both are
+    catalog operations; no rows are deleted one by one.
+    """
+
+    TABLE = 'lecturas'
+    DEFAULT_PARTITION = 'lecturas_default'
+
+    @staticmethod
+    def is_partitioned() -> bool:
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+                [LecturaPartitionManager.TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def interval_days() -> int:
+        return 7 if settings.LECTURA_PARTITION_INTERVAL == 'week' else 1
+
+    @staticmethod
+    def bounds(moment: datetime) -> Tuple[datetime, datetime]:
+        """UTC range of the partition that holds moment (weeks start on Monday)."""
+        day = moment.astimezone(dt_timezone.utc).date()
+        if LecturaPartitionManager.interval_days() == 7:
+            day -= timedelta(days=day.weekday())
+        start = datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+        return start, start + timedelta(days=LecturaPartitionManager.interval_days())
+
+    @staticmethod
+    def partition_name(start: datetime) -> str:
+        return f"{LecturaPartitionManager.TABLE}_p{start.strftime('%Y%m%d')}"
+
+    @staticmethod
+    def partitions() -> List[Dict]:
+        """Attached range partitions, oldest first (the default partition is left out)."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+            """, [LecturaPartitionManager.TABLE])
+            rows = cursor.fetchall()
+
+        partitions = []
+        for name, bound in rows:
+            match = BOUND_PATTERN.search(bound or '')
+            if match is None:
+                continue
+            partitions.append({
+                'name': name,
+                'start': datetime.fromisoformat(match.group(1)),
+                'end': datetime.fromisoformat(match.group(2)),
+            })
+        return sorted(partitions, key=lambda partition: partition['start'])
+
+    @staticmethod
+    def _literal(moment: datetime) -> str:
+        return moment.astimezone(dt_timezone.utc).strftime("'%Y-%m-%d %H:%M:%S+00'")
+
+    @staticmethod
+    def create_partition(start: datetime, end: datetime) -> str:
+        """
+        Create the partition [start, end). Rows already sitting in the
+        default partition for that range are moved into it first, otherwise
+        PostgreSQL refuses the new bound.
+        """
+        table = LecturaPartitionManager.TABLE
+        default = LecturaPartitionManager.DEFAULT_PARTITION
+        name = LecturaPartitionManager.partition_name(start)
+        bound = (
+            f"FOR VALUES FROM ({LecturaPartitionManager._literal(start)}) "
+            f"TO ({LecturaPartitionManager._literal(end)})"
+        )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {default} WHERE created_at >= %s AND created_at < %s)",
+                [start, end]
+            )
+            if not cursor.fetchone()[0]:
+                cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} {bound}")
+                return name
+
+            logger.warning(f"[PARTITIONS] Moving rows of {name} out of {default}")
+            cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {default}
+                    WHERE created_at >= %s AND created_at < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, [start, end])
+            cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} {bound}")
+        return name
+
+    @staticmethod
+    def ensure_partitions(ahead_days: Optional[int] = None) -> List[str]:
+        """Create the missing partitions from the current one up to now + ahead_days."""
+        if ahead_days is None:
+            ahead_days = settings.LECTURA_PARTITIONS_AHEAD_DAYS
+
+        existing = LecturaPartitionManager.partitions()
+        now = timezone.now()
+        start, end = LecturaPartitionManager.bounds(now)
+        created = []
+
+        while start <= now + timedelta(days=ahead_days):
+            overlaps = any(
+                partition['start'] < end and start < partition['end']
+                for partition in existing
+            )
+            if not overlaps:
+                created.append(LecturaPartitionManager.create_partition(start, end))
+            start, end = end, end + timedelta(days=LecturaPartitionManager.interval_days())
+
+        return created
+
+    @staticmethod
+    def drop_expired(retention_days: Optional[int] = None, detach_only: bool = False,
+                     dry_run: bool = False) -> List[str]:
+        """
+        Detach (and unless detach_only, drop) partitions whose whole range is
+        older than retention_days. 0 keeps everything.
+        """
+        if retention_days is None:
+            retention_days = settings.LECTURA_RETENTION_DAYS
+        if not retention_days:
+            return []
+
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        # Raw readings are only dropped once the rollup tiers contain them
+        rolled_up = SensorRollupService.watermark()
+        if rolled_up is None:
+            logger.warning("[PARTITIONS] Rollups have not run yet, keeping expired partitions")
+            return []
+        cutoff = min(cutoff, rolled_up)
+        expired = [
+            partition['name'] for partition in LecturaPartitionManager.partitions()
+            if partition['end'] <= cutoff
+        ]
+        if dry_run:
+            return expired
+
+        for name in expired:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {LecturaPartitionManager.TABLE} DETACH PARTITION {name}")
+                if not detach_only:
+                    cursor.execute(f"DROP TABLE {name}")
+            logger.info(f"[PARTITIONS] {'Detached' if detach_only else 'Dropped'} {name}")
+
+        return expired
+
+    @staticmethod
+    def maintain(ahead_days: Optional[int] = None, retention_days: Optional[int] = None,
+                 detach_only: bool = False) -> Dict:
+        if not LecturaPartitionManager.is_partitioned():
+            return {'partitioned': False, 'created': [], 'expired': []}
+
+        return {
+            'partitioned': True,
+            'created': LecturaPartitionManager.ensure_partitions(ahead_days),
+            'expired': LecturaPartitionManager.drop_expired(retention_days, detach_only),
+        }
@@ -0,0 +1,469 @@
+"""
+Craving predictions, scored in micro-batches across consumers.
+
+At the 5-minute rollover every active consumer needs a prediction at the
+same moment. Requests are queued in Redis instead of each running its own
+predict_smoking_craving. A batch is flushed once PREDICTION_BATCH_MAX_SIZE
+requests are waiting, or PREDICTION_BATCH_WAIT_SECONDS after the first one
+arrived. A flush reads the features of every window from the feature
+store, builds one matrix, runs one scaler.transform and one
+predict_proba, and writes the Analisis, Deseo and Notificacion rows with
+bulk_create. The new notifications are then pushed to each consumer's
+WebSocket group. A flush moves its batch to its own processing list and
+drops it only once the rows are committed. A failed batch goes back to
+the head of the queue, and so does the batch of a flush that died (its
+lease expired).
+
+InlinePredictor serves POST /api/predict/ in sync mode. It scores in the
+request using the model this process already holds, and stored features
+only: those of the consumer's latest closed window (the rollover stores
+them; the open window has none yet). A window the rollover already
+scored returns that Analisis instead of a second one. It hands the request
+to Celery when the model or the features are missing or the latency
+budget is spent.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.ml import LoadedModel, ModelRegistry
+from api.models import Analisis, Consumidor, Deseo, Notificacion, Ventana
+from api.services.feature_store import VentanaFeatureStore
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Moves up to ARGV[1] requests from the queue to a flush's processing list
+# in one step and renews that flush's lease
+TAKE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+redis.call('SET', KEYS[3], '1', 'EX', tonumber(ARGV[2]))
+return items
+"""
+
+# Puts a processing list back at the head of the queue, in its order
+REQUEUE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[2], items[i])
+end
+redis.call('DEL', KEYS[1])
+return #items
+"""
+
+def assess_risk(probability: float) -> Tuple[str, str]:
+    """(risk_level, comentario) for a craving probability."""
+    if probability >= 0.7:
+        return 'high', f'Alto riesgo de deseo detectado ({probability*100:.1f}%). Intervención inmediata recomendada.'
+    if probability >= 0.4:
+        return 'medium', f'Riesgo moderado de deseo ({probability*100:.1f}%). Monitoreo continuo recomendado.'
+    return 'low', f'Bajo riesgo de deseo ({probability*100:.1f}%). Estado estable.'
+
+def score(served: LoadedModel, features: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (craving probabilities, predicted labels) for the rows of `features`,
+    from a single predict_proba call.
+    """
+    if served.scaler is None:
+        # Compiled model: the scaler is folded into it
+        scaled = features[served.feature_names].to_numpy(dtype=float)
+    else:
+        scaled = served.scaler.transform(features[served.feature_names])
+    proba = served.model.predict_proba(scaled)
+    classes = list(served.model.classes_)
+    # Same label model.predict would return, without a second pass
+    return proba[:, classes.index(1)], np.asarray(served.model.classes_)[proba.argmax(axis=1)]
+
+def prediction_result(consumidor: Consumidor, analisis: Analisis, risk_level: str,
+                      metrics: Dict[str, Any]) -> Dict:
+    """The result predict_smoking_craving reports for a stored Analisis."""
+    return {
+        'success': True,
+        'analisis_id': analisis.id,
+        'probability': analisis.probabilidad_modelo,
+        'prediction': analisis.urge_label,
+        'risk_level': risk_level,
+        'comentario': analisis.comentario_modelo,
+        'model_metrics': {
+            'accuracy': metrics.get('accuracy'),
+            'precision': metrics.get('precision'),
+            'recall': metrics.get('recall'),
+            'f1_score': metrics.get('f1_score')
+        },
+        'consumidor_id': consumidor.id
+    }
+
+def record_prediction(consumidor: Consumidor, ventana: Optional[Ventana], features: Dict[str, Any],
+                      probability: float, label: int, served: LoadedModel,
+                      update_ventana: bool = True) -> Dict:
+    """
+    Store one prediction: the Analisis, plus a Deseo and an alert
+    Notificacion when the risk is high. Manual features without a window
+    get a new Ventana. With update_ventana=False an existing window keeps
+    its statistics instead of taking the model's features. Returns the
+    result predict_smoking_craving reports. The rows are written in one
+    transaction; the alert is pushed once it commits.
+    """
+    risk_level, comentario = assess_risk(probability)
+    logger.info(f"Prediction: probability={probability:.2%}, risk={risk_level}")
+
+    # All or nothing, so a caller that falls back to Celery after an
+    # error cannot store the prediction twice
+    with transaction.atomic():
+        if ventana is None:
+            update_ventana = True
+            ventana = Ventana.objects.create(
+                consumidor=consumidor,
+                window_start=timezone.now(),
+                window_end=timezone.now() + timedelta(minutes=30)
+            )
+
+        if update_ventana:
+            ventana.hr_mean = features.get('hr_mean')
+            ventana.hr_std = features.get('hr_std')
+            ventana.accel_energy = features.get('accel_energy')
+            ventana.gyro_energy = features.get('gyro_energy')
+            ventana.save(update_fields=['hr_mean', 'hr_std', 'accel_energy', 'gyro_energy', 'updated_at'])
+
+            logger.info(f"Features saved to Ventana ID {ventana.id}")
+
+        metrics = served.metrics
+        analisis = Analisis.objects.create(
+            ventana=ventana,
+            probabilidad_modelo=probability,
+            urge_label=label,
+            modelo_usado=served.label,
+            recall=metrics.get('recall'),
+            f1_score=metrics.get('f1_score'),
+            accuracy=metrics.get('accuracy'),
+            roc_auc=None,
+            comentario_modelo=comentario
+        )
+
+        logger.info(f"Prediction saved: Analisis ID {analisis.id}, risk={risk_level}, prob={probability:.2%}")
+
+        if risk_level == 'high':
+            deseo = Deseo.objects.create(
+                consumidor=consumidor,
+                ventana=ventana,
+                tipo='sustancia',
+                resolved=False
+            )
+
+            # post_save pushes it to the consumer's WebSocket on commit
+            Notificacion.objects.create(
+                consumidor=consumidor,
+                deseo=deseo,
+                contenido=comentario,
+                tipo='alerta',
+                leida=False
+            )
+
+            logger.info(f"High risk notification created for consumidor {consumidor.id}")
+
+    return prediction_result(consumidor, analisis, risk_level, metrics)
+
+def warm_up() -> Dict:
+    """
+    Load the served model and score one row of zeros, so the imports, the
+    model file and the scoring path are paid before the first real task.
+    """
+    start = time.perf_counter()
+    served = ModelRegistry.get(force_check=True)
+    score(served, pd.DataFrame(np.zeros((1, len(served.feature_names))), columns=served.feature_names))
+    return {'model': served.label, 'seconds': round(time.perf_counter() - start, 3)}
+
+class PredictionBatcher:
+
+    QUEUE_KEY = 'ml:predict:pending'
+    TIMER_KEY = 'ml:predict:flush_scheduled'
+    PROCESSING_KEY = 'ml:predict:processing:{}'
+    LEASE_KEY = 'ml:predict:lease:{}'
+    # Longer than the task time limit, so only a dead flush loses its lease
+    LEASE_SECONDS = 360
+
+    _take = None
+    _requeue = None
+
+    @staticmethod
+    def submit(consumidor_id: int, ventana_id: int) -> None:
+        """Queue a prediction for the window; falls back to a single task without Redis."""
+        from api.tasks import flush_prediction_batch, predict_smoking_craving
+
+        try:
+            client = get_redis()
+            pipe = client.pipeline(transaction=False)
+            pipe.rpush(PredictionBatcher.QUEUE_KEY, json.dumps({
+                'consumidor_id': consumidor_id, 'ventana_id': ventana_id
+            }))
+            waiting = pipe.execute()[0]
+        except Exception as e:
+            logger.warning(f"[PREDICT-BATCH] Queue unavailable ({e}), predicting ventana {ventana_id} alone")
+            from api.models import Consumidor
+            usuario_id = Consumidor.objects.filter(id=consumidor_id).values_list('usuario_id', flat=True).first()
+            predict_smoking_craving.delay(usuario_id, features_dict=None)
+            return
+
+        wait = settings.PREDICTION_BATCH_WAIT_SECONDS
+        if waiting >= settings.PREDICTION_BATCH_MAX_SIZE:
+            flush_prediction_batch.delay()
+        elif client.set(PredictionBatcher.TIMER_KEY, '1', nx=True, ex=max(1, int(wait * 4))):
+            # First request of a batch arms the timer
+            flush_prediction_batch.apply_async(countdown=wait)
+
+    @staticmethod
+    def take(limit: int, token: str) -> List[Dict]:
+        """Move up to `limit` requests to the processing list of flush `token`."""
+        if PredictionBatcher._take is None:
+            PredictionBatcher._take = get_redis().register_script(TAKE_SCRIPT)
+        raw = PredictionBatcher._take(
+            keys=[PredictionBatcher.QUEUE_KEY, PredictionBatcher.PROCESSING_KEY.format(token),
+                  PredictionBatcher.LEASE_KEY.format(token)],
+            args=[limit, PredictionBatcher.LEASE_SECONDS]
+        )
+        return [json.loads(item) for item in raw]
+
+    @staticmethod
+    def requeue(token: str) -> int:
+        if PredictionBatcher._requeue is None:
+            PredictionBatcher._requeue = get_redis().register_script(REQUEUE_SCRIPT)
+        return PredictionBatcher._requeue(
+            keys=[PredictionBatcher.PROCESSING_KEY.format(token), PredictionBatcher.QUEUE_KEY]
+        )
+
+    @staticmethod
+    def recover() -> int:
+        """Requeue the batches of flushes that died before committing them."""
+        client = get_redis()
+        recovered = 0
+        for key in client.scan_iter(match=PredictionBatcher.PROCESSING_KEY.format('*')):
+            token = key.rsplit(':', 1)[-1]
+            if not client.exists(PredictionBatcher.LEASE_KEY.format(token)):
+                recovered += PredictionBatcher.requeue(token)
+        if recovered:
+            logger.warning(f"[PREDICT-BATCH] Requeued {recovered} requests of an interrupted flush")
+        return recovered
+
+    @staticmethod
+    def flush() -> Dict:
+        """
+        Score queued requests, PREDICTION_BATCH_MAX_SIZE at a time, until the
+        queue is empty. A batch that fails is requeued before the error is
+        raised.
+        """
+        client = get_redis()
+        # Requests queued from now on arm a new timer
+        client.delete(PredictionBatcher.TIMER_KEY)
+        PredictionBatcher.recover()
+
+        token = uuid.uuid4().hex
+        totals = {'batches': 0, 'requests': 0, 'predictions': 0, 'alerts': 0}
+        try:
+            while True:
+                requests = PredictionBatcher.take(settings.PREDICTION_BATCH_MAX_SIZE, token)
+                if not requests:
+                    return totals
+                try:
+                    result = PredictionBatcher.predict(request['ventana_id'] for request in requests)
+                except Exception:
+                    PredictionBatcher.requeue(token)
+                    raise
+                # Committed: the batch can go
+                client.delete(PredictionBatcher.PROCESSING_KEY.format(token))
+                totals['batches'] += 1
+                totals['requests'] += len(requests)
+                totals['predictions'] += result['predictions']
+                totals['alerts'] += result['alerts']
+        finally:
+            client.delete(PredictionBatcher.LEASE_KEY.format(token))
+
+    @staticmethod
+    def predict(ventana_ids: Iterable[int], served: Optional[LoadedModel] = None) -> Dict:
+        """One prediction per window, scored as a single matrix."""
+        served = served or ModelRegistry.get()
+        ventanas = list(
+            Ventana.objects
+            .filter(id__in=set(ventana_ids))
+            .order_by('id')
+            .only('id', 'consumidor_id', 'created_at', 'lectura_count')
+        )
+        features = VentanaFeatureStore.get_many(ventanas, served.feature_set)
+        ventanas = [ventana for ventana in ventanas if ventana.id in features]
+        if not ventanas:
+            return {'predictions': 0, 'alerts': 0}
+
+        matrix = pd.DataFrame(
+            [features[ventana.id] for ventana in ventanas], columns=served.feature_names
+        ).astype(float).fillna(0)
+        start = time.perf_counter()
+        probabilities, labels = score(served, matrix)
+        latency_us = round((time.perf_counter() - start) * 1e6 / len(ventanas))
+
+        metrics = served.metrics
+        analyses, alerts = [], []
+        for ventana, probability, label in zip(ventanas, probabilities, labels):
+            risk_level, comentario = assess_risk(float(probability))
+            analyses.append(Analisis(
+                ventana_id=ventana.id,
+                probabilidad_modelo=float(probability),
+                urge_label=int(label),
+                modelo_usado=served.label,
+                recall=metrics.get('recall'),
+                f1_score=metrics.get('f1_score'),
+                accuracy=metrics.get('accuracy'),
+                roc_auc=None,
+                comentario_modelo=comentario,
+            ))
+            if risk_level == 'high':
+                alerts.append((ventana, comentario))
+
+        with transaction.atomic():
+            Analisis.objects.bulk_create(analyses)
+            deseos = Deseo.objects.bulk_create([
+                Deseo(consumidor_id=ventana.consumidor_id, ventana_id=ventana.id, tipo='sustancia', resolved=False)
+                for ventana, _ in alerts
+            ])
+            notificaciones = Notificacion.objects.bulk_create([
+                Notificacion(
+                    consumidor_id=ventana.consumidor_id, deseo=deseo,
+                    contenido=comentario, tipo='alerta', leida=False
+                )
+                for (ventana, comentario), deseo in zip(alerts, deseos)
+            ])
+
+        PredictionBatcher._fan_out(notificaciones)
+        # Challengers score these windows later, on the shadow queue
+        from api.services.shadow_service import ShadowScorer
+        ShadowScorer.submit(served, [ventana.id for ventana in ventanas], probabilities, latency_us)
+        logger.info(
+            f"[PREDICT-BATCH] {len(analyses)} predictions with {served.label}, {len(notificaciones)} alerts"
+        )
+        return {'predictions': len(analyses), 'alerts': len(notificaciones)}
+
+    @staticmethod
+    def _fan_out(notificaciones: List[Notificacion]) -> None:
+        """bulk_create skips the post_save signal, so push the alerts here, all in one event loop pass."""
+        if not notificaciones:
+            return
+        from channels.layers import get_channel_layer
+        from api.signals import notification_payload
+
+        channel_layer = get_channel_layer()
+
+        async def send_all():
+            for notificacion in notificaciones:
+                await channel_layer.group_send(f'notifications_{notificacion.consumidor_id}', {
+                    'type': 'notification_message',
+                    'notification': notification_payload(notificacion),
+                })
+
+        try:
+            async_to_sync(send_all)()
+        except Exception as e:
+            logger.error(f"[PREDICT-BATCH] Error sending notifications: {e}")
+
+class InlinePredictor:
+
+    _warming = threading.Lock()
+
+    @staticmethod
+    def _warm_in_background() -> None:
+        """Load the model off the request path, so the next sync request can use it."""
+        if not InlinePredictor._warming.acquire(blocking=False):
+            return
+
+        def load():
+            try:
+                warm_up()
+            except Exception as e:
+                logger.warning(f"[PREDICT-SYNC] Model warm-up failed: {e}")
+            finally:
+                InlinePredictor._warming.release()
+
+        threading.Thread(target=load, name='model-warm-up', daemon=True).start()
+
+    @staticmethod
+    def predict(consumidor: Consumidor, features: Optional[Dict[str, Any]] = None,
+                budget_ms: Optional[float] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        (result, None) when the prediction was made here, else
+        (None, reason) and the caller falls back to predict_smoking_craving.
+        The budget covers the feature lookup; scoring and the writes that
+        follow it take a few milliseconds. Nothing runs after the writes
+        commit, so when this raises nothing was stored and the caller can
+        safely fall back.
+        """
+        start = time.perf_counter()
+        budget = (settings.PREDICTION_SYNC_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+
+        if not ModelRegistry.is_loaded():
+            InlinePredictor._warm_in_background()
+            return None, 'model_not_loaded'
+        served = ModelRegistry.get()
+
+        ventana = None
+        if not features or 'hr_mean' not in features:
+            # The open window has no vector until the rollover closes it,
+            # so score the newest closed one that has
+            now = timezone.now()
+            closed = list(
+                Ventana.objects
+                .filter(consumidor=consumidor, window_end__lte=now,
+                        window_end__gte=now - timedelta(minutes=30))
+                .order_by('-window_end')
+            )
+            if not closed:
+                return None, 'no_recent_ventana'
+            # Computing from the readings is the Celery task's job
+            stored = VentanaFeatureStore.get_many(closed, served.feature_set, compute=False)
+            ventana = next((v for v in closed if v.id in stored), None)
+            if ventana is None:
+                return None, 'features_not_stored'
+            features = stored[ventana.id]
+
+            # The rollover has usually scored this window already; a second
+            # Analisis would repeat its alert
+            analisis = Analisis.objects.filter(ventana=ventana).order_by('-created_at').first()
+            if analisis is not None:
+                risk_level, _ = assess_risk(analisis.probabilidad_modelo or 0.0)
+                result = prediction_result(consumidor, analisis, risk_level, {
+                    'accuracy': analisis.accuracy, 'recall': analisis.recall, 'f1_score': analisis.f1_score,
+                })
+                result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+                return result, None
+
+        if time.perf_counter() - start > budget:
+            return None, 'budget_exceeded'
+
+        frame = pd.DataFrame([features])
+        missing = [name for name in served.feature_names if name not in frame.columns]
+        if missing:
+            return {
+                'success': False,
+                'error': f"Missing required features: {missing}. Required: {served.feature_names}"
+            }, None
+
+        # Same NaN handling as a batch flush (hr_std of a one-reading window)
+        probabilities, labels = score(served, frame[served.feature_names].astype(float).fillna(0))
+        # The window keeps the statistics its readings produced
+        result = record_prediction(
+            consumidor, ventana, features, float(probabilities[0]), int(labels[0]), served,
+            update_ventana=False
+        )
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return result, None
@@ -0,0 +1,175 @@
+"""
+Batch recompute of ventana statistics, after a feature change or a fix.
+
+Windows are taken in id order, CHUNK_SIZE at a time. The readings of a
+chunk are fetched with one query (VentanaSampleStore.read_many). The
+NumPy statistics of each chunk are computed in a process pool while the
+next chunk is being fetched. Results
+are written back with one bulk_update per chunk. Once a chunk is written,
+its last id is stored in a ProcessingCheckpoint. An interrupted run then
+resumes after that id, and a finished run clears the checkpoint so the next
+run starts over.
+"""
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.ml.features import SENSOR_FIELDS, STATISTIC_NAMES, compute_statistics
+from api.models import ProcessingCheckpoint, Ventana
+from api.services.sample_store import VentanaSampleStore
+
+logger = logging.getLogger(__name__)
+
+class VentanaRecomputeService:
+
+    CHUNK_SIZE = 500
+
+    @staticmethod
+    def checkpoint_key(consumidor_id: Optional[int] = None, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> str:
+        bounds = ':'.join(moment.strftime('%Y%m%dT%H%M%S') if moment else '' for moment in (start, end))
+        return f"recompute:{consumidor_id or '*'}:{bounds}"
+
+    @staticmethod
+    def _ventanas(consumidor_id: Optional[int], start: Optional[datetime], end: Optional[datetime]):
+        # Open windows are still being written to; their statistics come from
+        # the running accumulator
+        ventanas = Ventana.objects.filter(window_end__lt=timezone.now())
+        if consumidor_id:
+            ventanas = ventanas.filter(consumidor_id=consumidor_id)
+        if start:
+            ventanas = ventanas.filter(window_start__gte=start)
+        if end:
+            ventanas = ventanas.filter(window_start__lt=end)
+        return ventanas.order_by('id')
+
+    @staticmethod
+    def _fetch(chunk: List[Ventana]):
+        # The chunk is in id order, like read_many's segments
+        _, samples, offsets = VentanaSampleStore.read_many(chunk)
+        return {field: samples[field] for field in SENSOR_FIELDS}, offsets
+
+    @staticmethod
+    def _write(chunk: List[Ventana], offsets: np.ndarray, statistics: Dict[str, np.ndarray],
+               key: str) -> None:
+        now = timezone.now()
+        for i, ventana in enumerate(chunk):
+            for name in STATISTIC_NAMES:
+                value = statistics[name][i]
+                setattr(ventana, name, None if np.isnan(value) else float(value))
+            ventana.lectura_count = int(offsets[i + 1] - offsets[i])
+            ventana.updated_at = now  # bulk_update skips auto_now
+
+        with transaction.atomic():
+            Ventana.objects.bulk_update(
+                chunk, [*STATISTIC_NAMES, 'lectura_count', 'updated_at'], batch_size=len(chunk)
+            )
+            ProcessingCheckpoint.set_position(key, chunk[-1].id)
+
+    @staticmethod
+    def recompute(consumidor_id: Optional[int] = None, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, chunk_size: Optional[int] = None,
+                  workers: Optional[int] = None, restart: bool = False,
+                  time_budget: Optional[float] = None) -> Dict:
+        """
+        Recompute hr_mean, hr_std, accel_energy, gyro_energy and
+        lectura_count of the closed ventanas of a consumer (all when None)
+        whose window_start is in [start, end).
+
+        workers <= 1 computes in this process. Celery prefork children are
+        daemonic and cannot start a pool, so they always compute inline.
+        With time_budget, stops after the chunk that exceeds it; 'complete'
+        is False and the next call resumes from the checkpoint.
+        """
+        chunk_size = chunk_size or VentanaRecomputeService.CHUNK_SIZE
+        if workers is None:
+            workers = settings.VENTANA_RECOMPUTE_WORKERS
+        if workers > 1 and multiprocessing.current_process().daemon:
+            logger.info("[RECOMPUTE] Daemonic process, computing without a pool")
+            workers = 1
+
+        key = VentanaRecomputeService.checkpoint_key(consumidor_id, start, end)
+        if restart:
+            ProcessingCheckpoint.objects.filter(key=key).delete()
+        after = int(ProcessingCheckpoint.get_position(key, 0))
+
+        ventanas = VentanaRecomputeService._ventanas(consumidor_id, start, end)
+        if after:
+            logger.info(f"[RECOMPUTE] Resuming {key} after ventana {after}")
+            ventanas = ventanas.filter(id__gt=after)
+        ventanas = ventanas.only('id', 'created_at')
+
+        started = time.monotonic()
+        deadline = started + time_budget if time_budget else None
+        windows = readings = 0
+        complete = True
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+        ) if workers > 1 else None
+        # Chunks in flight; results are written in id order so the checkpoint
+        # never skips an unwritten chunk
+        pending = deque()
+
+        def submit(chunk: List[Ventana]):
+            samples, offsets = VentanaRecomputeService._fetch(chunk)
+            if pool:
+                pending.append((chunk, offsets, pool.submit(compute_statistics, samples, offsets)))
+            else:
+                pending.append((chunk, offsets, compute_statistics(samples, offsets)))
+
+        def drain(limit: int):
+            nonlocal windows, readings
+            while len(pending) > limit:
+                chunk, offsets, result = pending.popleft()
+                statistics = result.result() if pool else result
+                VentanaRecomputeService._write(chunk, offsets, statistics, key)
+                windows += len(chunk)
+                readings += int(offsets[-1] - offsets[0])
+
+        try:
+            chunk = []
+            for ventana in ventanas.iterator(chunk_size=chunk_size):
+                chunk.append(ventana)
+                if len(chunk) < chunk_size:
+                    continue
+                submit(chunk)
+                drain(workers if pool else 0)
+                chunk = []
+                if deadline and time.monotonic() > deadline:
+                    complete = False
+                    break
+
+            if chunk:
+                submit(chunk)
+            drain(0)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        if complete:
+            ProcessingCheckpoint.objects.filter(key=key).delete()
+
+        elapsed = time.monotonic() - started
+        result = {
+            'ventanas': windows,
+            'readings': readings,
+            'seconds': round(elapsed, 3),
+            'ventanas_per_second': round(windows / elapsed, 1) if elapsed else 0.0,
+            'complete': complete,
+            'checkpoint': key,
+        }
+        logger.info(
+            f"[RECOMPUTE] {windows} ventanas / {readings} readings in {elapsed:.1f}s "
+            f"({result['ventanas_per_second']} ventanas/s, complete={complete})"
+        )
+        return result
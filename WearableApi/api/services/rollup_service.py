@@ -0,0 +1,219 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import (
+    Lectura, ProcessingCheckpoint, SensorRollupMinute, SensorRollupFiveMinute, SensorRollupHour
+)
+
+logger = logging.getLogger(__name__)
+
+# Finest to coarsest
+TIERS = (
+    ('1m', SensorRollupMinute),
+    ('5m', SensorRollupFiveMinute),
+    ('1h', SensorRollupHour),
+)
+
+# Per-reading value aggregated for each channel (magnitudes as in
+# Lectura.get_accelerometer_magnitude / get_gyroscope_magnitude)
+CHANNELS = {
+    'hr': "l.heart_rate",
+    'accel': (
+        "CASE WHEN l.accel_x IS NOT NULL OR l.accel_y IS NOT NULL OR l.accel_z IS NOT NULL "
+        "THEN sqrt(coalesce(l.accel_x, 0) ^ 2 + coalesce(l.accel_y, 0) ^ 2 + coalesce(l.accel_z, 0) ^ 2) END"
+    ),
+    'gyro': (
+        "CASE WHEN l.gyro_x IS NOT NULL OR l.gyro_y IS NOT NULL OR l.gyro_z IS NOT NULL "
+        "THEN sqrt(coalesce(l.gyro_x, 0) ^ 2 + coalesce(l.gyro_y, 0) ^ 2 + coalesce(l.gyro_z, 0) ^ 2) END"
+    ),
+}
+
+def _merge_sql(table: str, bucket_seconds: int) -> str:
+    """
+    Aggregate one slice of lecturas into table's buckets and merge it with
+    the partial buckets already there (parallel mean/M2 update).
+    """
+    columns = ['consumidor_id', 'bucket_start', 'sample_count']
+    aggregates = ['count(*)']
+    updates = ['sample_count = t.sample_count + EXCLUDED.sample_count']
+
+    for channel in CHANNELS:
+        columns += [f'{channel}_{stat}' for stat in ('count', 'min', 'max', 'mean', 'm2')]
+        aggregates += [
+            f'count({channel})', f'min({channel})', f'max({channel})', f'avg({channel})',
+            f'coalesce(var_pop({channel}) * count({channel}), 0)',
+        ]
+        old_n, new_n = f't.{channel}_count::float8', f'EXCLUDED.{channel}_count::float8'
+        updates += [
+            f'{channel}_min = LEAST(t.{channel}_min, EXCLUDED.{channel}_min)',
+            f'{channel}_max = GREATEST(t.{channel}_max, EXCLUDED.{channel}_max)',
+            f'{channel}_mean = CASE WHEN EXCLUDED.{channel}_count = 0 THEN t.{channel}_mean '
+            f'WHEN t.{channel}_count = 0 THEN EXCLUDED.{channel}_mean '
+            f'ELSE (t.{channel}_mean * {old_n} + EXCLUDED.{channel}_mean * {new_n}) / ({old_n} + {new_n}) END',
+            f'{channel}_m2 = t.{channel}_m2 + EXCLUDED.{channel}_m2 + '
+            f'CASE WHEN t.{channel}_count = 0 OR EXCLUDED.{channel}_count = 0 THEN 0 '
+            f'ELSE (EXCLUDED.{channel}_mean - t.{channel}_mean) ^ 2 * {old_n} * {new_n} / ({old_n} + {new_n}) END',
+            f'{channel}_count = t.{channel}_count + EXCLUDED.{channel}_count',
+        ]
+
+    values = ', '.join(f'{expression} AS {channel}' for channel, expression in CHANNELS.items())
+    return f"""
+        INSERT INTO {table} AS t ({', '.join(columns)})
+        SELECT consumidor_id, bucket_start, {', '.join(aggregates)}
+        FROM (
+            SELECT v.consumidor_id,
+                   to_timestamp(floor(extract(epoch FROM l.created_at) / {bucket_seconds}) * {bucket_seconds})
+                       AS bucket_start,
+                   {values}
+            FROM lecturas l
+            JOIN ventanas v ON v.id = l.ventana_id
+            WHERE l.created_at >= %s AND l.created_at < %s
+        ) s
+        GROUP BY consumidor_id, bucket_start
+        ON CONFLICT (consumidor_id, bucket_start) DO UPDATE SET {', '.join(updates)}
+    """
+
+class SensorRollupService:
+
+    CHECKPOINT_KEY = 'rollup:lecturas'
+    SLICE = timedelta(hours=1)
+
+    @staticmethod
+    def watermark() -> Optional[datetime]:
+        """Readings created before this instant are included in every tier."""
+        position = ProcessingCheckpoint.get_position(SensorRollupService.CHECKPOINT_KEY)
+        return datetime.fromisoformat(position) if position else None
+
+    @staticmethod
+    def roll_up(until: Optional[datetime] = None, time_budget: float = 60.0) -> Dict:
+        """
+        Fold lecturas created since the watermark into the 1m/5m/1h tiers,
+        one slice per transaction together with the watermark itself, so a
+        slice is never counted twice. In stream mode the watermark also stays
+        below the oldest reading still buffered in Redis, however late it is
+        drained.
+        """
+        if until is None:
+            until = timezone.now() - timedelta(seconds=settings.SENSOR_ROLLUP_LAG_SECONDS)
+
+        from api.services.stream_service import LecturaStreamBuffer
+        if LecturaStreamBuffer.is_enabled():
+            try:
+                buffered_at = LecturaStreamBuffer.oldest_buffered_at()
+            except Exception as e:
+                # Unknown backlog: advancing could skip readings still to be drained
+                logger.warning(f"[ROLLUP] Stream backlog unavailable ({e}), watermark held")
+                held = SensorRollupService.watermark()
+                return {'slices': 0, 'watermark': held.isoformat() if held else None}
+            if buffered_at is not None:
+                until = min(until, buffered_at)
+
+        start = SensorRollupService.watermark()
+        if start is None:
+            oldest = Lectura.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if oldest is None:
+                return {'slices': 0, 'watermark': None}
+            start = oldest
+
+        statements = [_merge_sql(model._meta.db_table, model.BUCKET_SECONDS) for _, model in TIERS]
+        deadline = time.monotonic() + time_budget
+        slices = 0
+
+        while time.monotonic() < deadline:
+            with transaction.atomic(), connection.cursor() as cursor:
+                # Overlapping runs queue here and continue from the committed watermark
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [SensorRollupService.CHECKPOINT_KEY])
+                start = SensorRollupService.watermark() or start
+                if start >= until:
+                    break
+                end = min(start + SensorRollupService.SLICE, until)
+                for sql in statements:
+                    cursor.execute(sql, [start, end])
+                ProcessingCheckpoint.set_position(SensorRollupService.CHECKPOINT_KEY, end.isoformat())
+            start = end
+            slices += 1
+
+        return {'slices': slices, 'watermark': start.isoformat()}
+
+    @staticmethod
+    def apply_retention() -> Dict[str, int]:
+        """Delete rollup buckets older than SENSOR_ROLLUP_RETENTION_DAYS per tier."""
+        deleted = {}
+        for name, model in TIERS:
+            days = settings.SENSOR_ROLLUP_RETENTION_DAYS.get(name)
+            if not days:
+                continue
+            cutoff = timezone.now() - timedelta(days=days)
+            deleted[name], _ = model.objects.filter(bucket_start__lt=cutoff).delete()
+        return deleted
+
+    @staticmethod
+    def tier_for(start: datetime, resolution_seconds: int) -> Optional[Tuple[str, type]]:
+        """
+        Coarsest tier whose buckets are no wider than resolution_seconds and
+        that still holds data from start. None means only raw lecturas fit.
+        """
+        for name, model in reversed(TIERS):
+            if model.BUCKET_SECONDS > resolution_seconds:
+                continue
+            days = settings.SENSOR_ROLLUP_RETENTION_DAYS.get(name)
+            if days and start < timezone.now() - timedelta(days=days):
+                continue
+            return name, model
+        return None
+
+    @staticmethod
+    def series(consumidor_id: int, start: datetime, end: datetime, resolution_seconds: int) -> Dict:
+        """
+        Time series of a consumer between start and end at (at most)
+        resolution_seconds per point, read from the cheapest tier.
+        """
+        tier = SensorRollupService.tier_for(start, resolution_seconds)
+
+        if tier is None:
+            lecturas = Lectura.objects.filter(
+                ventana__consumidor_id=consumidor_id,
+                created_at__gte=start,
+                created_at__lt=end
+            ).order_by('created_at')
+            points = [{
+                'bucket_start': lectura.created_at.isoformat(),
+                'sample_count': 1,
+                'hr_mean': lectura.heart_rate,
+                'accel_mean': lectura.get_accelerometer_magnitude(),
+                'gyro_mean': lectura.get_gyroscope_magnitude(),
+            } for lectura in lecturas.iterator()]
+            return {'tier': 'raw', 'complete_until': end.isoformat(), 'points': points}
+
+        name, model = tier
+        buckets = model.objects.filter(
+            consumidor_id=consumidor_id,
+            bucket_start__gt=start - timedelta(seconds=model.BUCKET_SECONDS),
+            bucket_start__lt=end
+        ).order_by('bucket_start')
+
+        points: List[Dict] = []
+        for bucket in buckets:
+            point = {'bucket_start': bucket.bucket_start.isoformat(), 'sample_count': bucket.sample_count}
+            for channel in CHANNELS:
+                point.update({
+                    f'{channel}_count': getattr(bucket, f'{channel}_count'),
+                    f'{channel}_min': getattr(bucket, f'{channel}_min'),
+                    f'{channel}_max': getattr(bucket, f'{channel}_max'),
+                    f'{channel}_mean': getattr(bucket, f'{channel}_mean'),
+                    f'{channel}_std': getattr(bucket, f'{channel}_std'),
+                })
+            points.append(point)
+
+        watermark = SensorRollupService.watermark()
+        return {
+            'tier': name,
+            'complete_until': min(watermark, end).isoformat() if watermark else None,
+            'points': points,
+        }
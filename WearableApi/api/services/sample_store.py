@@ -0,0 +1,288 @@
+"""
+Columnar storage of a closed ventana's readings.
+
+A blob holds every reading of the window as columns:
+
+    header  magic, version, codec, column count, sample count, first timestamp
+    created_at  int64 microsecond deltas (first delta 0)
+    7 x float32 one column per sensor field, each value XORed with the
+                previous one (Gorilla style), NaN for missing values
+
+Every column is byte-shuffled, so the mostly-zero high bytes of the deltas
+and XORs line up, and the whole payload is compressed with zstd when
+the zstandard package is installed, zlib otherwise. Readings are kept as
+float32, which is more than the sensors resolve.
+"""
+import logging
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from api.models import Lectura, Ventana, VentanaSampleBlob
+from api.models.sensor import LecturaQuerySet
+from api.services.ingestion_service import SENSOR_FIELDS
+
+try:
+    import zstandard
+except ImportError:  # optional; blobs fall back to zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'VSB1'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHIq')
+CODECS = {1: 'zlib', 2: 'zstd'}
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+def _utc64(moment: datetime) -> np.datetime64:
+    return np.datetime64(moment.astimezone(dt_timezone.utc).replace(tzinfo=None), 'us')
+
+def _shuffle(values: np.ndarray) -> bytes:
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+def _unshuffle(buffer: bytes, dtype, count: int) -> np.ndarray:
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(buffer, dtype=np.uint8).reshape(itemsize, count)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+def _compress(payload: bytes) -> Tuple[int, bytes]:
+    if zstandard is not None:
+        return 2, zstandard.ZstdCompressor(level=3).compress(payload)
+    return 1, zlib.compress(payload, 6)
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == 2:
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def encode_samples(samples: Dict[str, np.ndarray]) -> Tuple[bytes, str, int]:
+    """Pack reader-style arrays into a blob. Returns (blob, codec, raw size)."""
+    timestamps = samples['created_at'].astype('datetime64[us]').view(np.int64)
+    count = int(timestamps.size)
+
+    parts = [_shuffle(np.diff(timestamps, prepend=timestamps[:1]))]
+    for field in SENSOR_FIELDS:
+        bits = samples[field].astype(np.float32).view(np.uint32)
+        previous = np.concatenate((np.zeros(1, dtype=np.uint32), bits[:-1]))
+        parts.append(_shuffle(bits ^ previous))
+    payload = b''.join(parts)
+
+    codec, compressed = _compress(payload)
+    header = HEADER.pack(MAGIC, VERSION, codec, len(SENSOR_FIELDS), count,
+                         int(timestamps[0]) if count else 0)
+    return header + compressed, CODECS[codec], len(payload)
+
+def decode_samples(blob: bytes) -> Dict[str, np.ndarray]:
+    magic, version, codec, columns, count, first = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION or columns != len(SENSOR_FIELDS):
+        raise ValueError(f"Unsupported sample blob ({magic!r} v{version}, {columns} columns)")
+
+    payload = _decompress(codec, bytes(blob[HEADER.size:]))
+    offset = count * 8
+    deltas = _unshuffle(payload[:offset], np.int64, count)
+    samples = {'created_at': (first + np.cumsum(deltas)).view('datetime64[us]')}
+
+    for field in SENSOR_FIELDS:
+        xored = _unshuffle(payload[offset:offset + count * 4], np.uint32, count)
+        samples[field] = np.bitwise_xor.accumulate(xored).view(np.float32).astype(np.float64)
+        offset += count * 4
+
+    return samples
+
+def _empty_samples() -> Dict[str, np.ndarray]:
+    samples = {'created_at': np.empty(0, dtype='datetime64[us]')}
+    samples.update({field: np.empty(0, dtype=np.float64) for field in SENSOR_FIELDS})
+    return samples
+
+def _rows_to_samples(rows) -> Dict[str, np.ndarray]:
+    if not rows:
+        return _empty_samples()
+    columns = list(zip(*rows))
+    samples = {
+        'created_at': np.array(
+            [(moment - EPOCH) // timedelta(microseconds=1) for moment in columns[0]], dtype=np.int64
+        ).view('datetime64[us]')
+    }
+    for field, values in zip(SENSOR_FIELDS, columns[1:]):
+        samples[field] = np.array(values, dtype=np.float64)  # None -> nan
+    return samples
+
+def _concat(first: Dict[str, np.ndarray], second: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    merged = {key: np.concatenate((first[key], second[key])) for key in first}
+    order = np.argsort(merged['created_at'], kind='stable')
+    return {key: values[order] for key, values in merged.items()}
+
+class VentanaSampleStore:
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.LECTURA_BLOB_STORAGE
+
+    @staticmethod
+    def _raw_rows(ventana: Ventana, with_ids: bool = False, before: Optional[datetime] = None):
+        fields = ('id',) if with_ids else ()
+        lecturas = Lectura.objects.for_ventana(ventana)
+        if before is not None:
+            lecturas = lecturas.filter(created_at__lt=before)
+        return list(
+            lecturas
+            .order_by('created_at')
+            .values_list(*fields, 'created_at', *SENSOR_FIELDS)
+        )
+
+    @staticmethod
+    def read(ventana: Ventana) -> Dict[str, np.ndarray]:
+        """
+        Every reading of the window as NumPy arrays: 'created_at'
+        (datetime64[us], UTC) and one float64 array per sensor field, NaN
+        where the value is missing. Packed and not-yet-packed readings are
+        merged in time order.
+        """
+        samples = _rows_to_samples(VentanaSampleStore._raw_rows(ventana))
+        blob = VentanaSampleBlob.objects.filter(ventana_id=ventana.id).values_list('data', flat=True).first()
+        if blob is None:
+            return samples
+        return _concat(decode_samples(blob), samples)
+
+    @staticmethod
+    def read_many(ventanas: Iterable[Ventana]) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+        """
+        read() for many windows with one lecturas query: (ventana ids in
+        ascending order, samples grouped by window in time order, offsets)
+        as the feature engine (api/ml/features.py) takes them. Windows
+        without readings get an empty segment.
+        """
+        ventanas = sorted(ventanas, key=lambda ventana: ventana.id)
+        ventana_ids = np.array([ventana.id for ventana in ventanas], dtype=np.int64)
+        if not ventanas:
+            return ventana_ids, _empty_samples(), np.zeros(1, dtype=np.intp)
+
+        since = min(ventana.created_at for ventana in ventanas) - LecturaQuerySet.CLOCK_SKEW
+        rows = list(
+            Lectura.objects
+            .filter(ventana_id__in=ventana_ids.tolist(), created_at__gte=since)
+            .order_by()
+            .values_list('ventana_id', 'created_at', *SENSOR_FIELDS)
+        )
+        owners = [np.array([row[0] for row in rows], dtype=np.int64)]
+        samples = _rows_to_samples([row[1:] for row in rows])
+
+        blobs = VentanaSampleBlob.objects.filter(ventana_id__in=ventana_ids.tolist()).values_list('ventana_id', 'data')
+        for ventana_id, data in blobs:
+            packed = decode_samples(data)
+            owners.append(np.full(packed['created_at'].size, ventana_id, dtype=np.int64))
+            samples = {key: np.concatenate((samples[key], packed[key])) for key in samples}
+
+        owners = np.concatenate(owners)
+        order = np.lexsort((samples['created_at'], owners))
+        samples = {key: values[order] for key, values in samples.items()}
+        offsets = np.searchsorted(owners[order], np.r_[ventana_ids, ventana_ids[-1] + 1]).astype(np.intp)
+        return ventana_ids, samples, offsets
+
+    @staticmethod
+    def iter_packed() -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """(ventana_id, samples) for every packed window."""
+        blobs = VentanaSampleBlob.objects.order_by('ventana_id').values_list('ventana_id', 'data')
+        for ventana_id, data in blobs.iterator(chunk_size=100):
+            yield ventana_id, decode_samples(data)
+
+    @staticmethod
+    def iter_packed_range(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          consumidor_id: Optional[int] = None) -> Iterator[Tuple[int, int, Dict[str, np.ndarray]]]:
+        """
+        (ventana_id, consumidor_id, samples) for packed windows, keeping only
+        the samples created in [start, end).
+        """
+        blobs = VentanaSampleBlob.objects.all()
+        if consumidor_id is not None:
+            blobs = blobs.filter(ventana__consumidor_id=consumidor_id)
+        if start is not None:
+            blobs = blobs.filter(ventana__window_end__gte=start - LecturaQuerySet.CLOCK_SKEW)
+        if end is not None:
+            blobs = blobs.filter(ventana__created_at__lt=end + LecturaQuerySet.CLOCK_SKEW)
+
+        rows = blobs.order_by('ventana_id').values_list('ventana_id', 'ventana__consumidor_id', 'data')
+        for ventana_id, owner_id, data in rows.iterator(chunk_size=50):
+            samples = decode_samples(data)
+            keep = np.ones(samples['created_at'].size, dtype=bool)
+            if start is not None:
+                keep &= samples['created_at'] >= _utc64(start)
+            if end is not None:
+                keep &= samples['created_at'] < _utc64(end)
+            if keep.any():
+                yield ventana_id, owner_id, {key: values[keep] for key, values in samples.items()}
+
+    @staticmethod
+    def pack(ventana: Ventana, before: Optional[datetime] = None) -> int:
+        """
+        Move the window's lecturas rows (created before `before`, if given)
+        into its blob, merging with an existing blob, e.g. after late
+        readings. Returns the rows packed.
+        """
+        with transaction.atomic():
+            Ventana.objects.select_for_update().filter(id=ventana.id).exists()
+
+            rows = VentanaSampleStore._raw_rows(ventana, with_ids=True, before=before)
+            if not rows:
+                return 0
+
+            samples = _rows_to_samples([row[1:] for row in rows])
+            existing = VentanaSampleBlob.objects.filter(ventana_id=ventana.id).first()
+            if existing is not None:
+                samples = _concat(decode_samples(existing.data), samples)
+
+            data, codec, raw_size = encode_samples(samples)
+            VentanaSampleBlob.objects.update_or_create(
+                ventana_id=ventana.id,
+                defaults={
+                    'sample_count': int(samples['created_at'].size),
+                    'codec': codec,
+                    'raw_size': raw_size,
+                    'data': data,
+                }
+            )
+            Lectura.objects.for_ventana(ventana).filter(id__in=[row[0] for row in rows]).delete()
+
+        logger.info(f"[SAMPLE-STORE] Packed {len(rows)} readings of ventana {ventana.id} ({codec}, {len(data)} bytes)")
+        return len(rows)
+
+    @staticmethod
+    def pack_closed(limit: int = 100) -> Dict:
+        """
+        Pack windows closed for LECTURA_BLOB_PACK_AFTER_MINUTES that still
+        have lecturas rows. Rows are only packed once the rollup tiers have
+        consumed them.
+        """
+        from api.services.rollup_service import SensorRollupService
+
+        cutoff = timezone.now() - timedelta(minutes=settings.LECTURA_BLOB_PACK_AFTER_MINUTES)
+        rolled_up = SensorRollupService.watermark()
+        if rolled_up is None:
+            return {'packed_ventanas': 0, 'packed_readings': 0}
+        cutoff = min(cutoff, rolled_up)
+
+        ventanas = Ventana.objects.filter(
+            window_end__lt=cutoff,
+            lectura_count__gt=0
+        ).filter(
+            Exists(Lectura.objects.filter(ventana_id=OuterRef('pk'), created_at__lt=cutoff))
+        ).only('id', 'created_at').order_by('window_end')[:limit]
+
+        packed_ventanas = packed_readings = 0
+        for ventana in ventanas:
+            packed = VentanaSampleStore.pack(ventana, before=cutoff)
+            if packed:
+                packed_ventanas += 1
+                packed_readings += packed
+
+        return {'packed_ventanas': packed_ventanas, 'packed_readings': packed_readings}
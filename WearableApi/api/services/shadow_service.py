@@ -0,0 +1,236 @@
+"""
+Shadow evaluation of challenger models.
+
+Candidate models registered in ML_CHALLENGERS_DIR (train_model.py
+--challenger) are scored on the same windows as the champion's rollover
+batches, but off its path. PredictionBatcher only appends the champion's
+probabilities to a Redis list once its batch is written and pushed.
+shadow_score_batch, routed to the low-priority 'shadow' queue and its own
+worker, scores them SHADOW_BATCH_SIZE windows at a time. Every model's
+probability lands in ShadowPrediction.
+
+report() compares each challenger with the champion on the windows both
+scored: label and risk-level agreement, calibration (Brier score and
+expected calibration error) against the cravings consumers reported
+themselves, and per-window scoring latency, overall and per day.
+"""
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import DateTimeField, Exists, ExpressionWrapper, OuterRef
+
+from api.ml import ChallengerRegistry, LoadedModel
+from api.models import Deseo, Notificacion, ShadowPrediction, Ventana
+from api.services.feature_store import VentanaFeatureStore
+from api.services.prediction_service import score
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RISK_THRESHOLDS = (0.4, 0.7)
+CALIBRATION_BINS = 10
+
+def _calibration_error(probabilities: np.ndarray, outcomes: np.ndarray) -> float:
+    """Expected calibration error over CALIBRATION_BINS equal-width bins."""
+    bins = np.minimum((probabilities * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    error = 0.0
+    for b in np.unique(bins):
+        in_bin = bins == b
+        error += in_bin.mean() * abs(probabilities[in_bin].mean() - outcomes[in_bin].mean())
+    return float(error)
+
+class ShadowScorer:
+
+    QUEUE_KEY = 'ml:shadow:pending'
+    TIMER_KEY = 'ml:shadow:flush_scheduled'
+
+    @staticmethod
+    def submit(champion: LoadedModel, ventana_ids: Iterable[int], probabilities: Iterable[float],
+               latency_us: int) -> None:
+        """Queue the champion's scored batch for the challengers. Never raises."""
+        from api.tasks import shadow_score_batch
+
+        try:
+            if not ChallengerRegistry.paths():
+                return
+            entries = [
+                json.dumps({
+                    'ventana_id': int(ventana_id), 'modelo': champion.label,
+                    'probability': float(probability), 'latency_us': latency_us,
+                })
+                for ventana_id, probability in zip(ventana_ids, probabilities)
+            ]
+            if not entries:
+                return
+
+            wait = settings.SHADOW_BATCH_WAIT_SECONDS
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.rpush(ShadowScorer.QUEUE_KEY, *entries)
+            # Without a shadow worker the oldest windows are dropped
+            pipe.ltrim(ShadowScorer.QUEUE_KEY, -settings.SHADOW_QUEUE_MAX, -1)
+            pipe.set(ShadowScorer.TIMER_KEY, '1', nx=True, ex=max(1, int(wait * 4)))
+            waiting, _, armed = pipe.execute()
+
+            if waiting >= settings.SHADOW_BATCH_SIZE:
+                shadow_score_batch.delay()
+            elif armed:
+                shadow_score_batch.apply_async(countdown=wait)
+        except Exception as e:
+            logger.warning(f"[SHADOW] Could not queue {champion.label} batch: {e}")
+
+    @staticmethod
+    def take(limit: int) -> List[Dict]:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.lrange(ShadowScorer.QUEUE_KEY, 0, limit - 1)
+        pipe.ltrim(ShadowScorer.QUEUE_KEY, limit, -1)
+        return [json.loads(raw) for raw in pipe.execute()[0]]
+
+    @staticmethod
+    def flush() -> Dict:
+        """Score queued windows with every challenger, SHADOW_BATCH_SIZE at a time."""
+        get_redis().delete(ShadowScorer.TIMER_KEY)
+
+        challengers = ChallengerRegistry.get_all()
+        totals = {'batches': 0, 'ventanas': 0, 'predictions': 0, 'challengers': len(challengers)}
+        while True:
+            entries = ShadowScorer.take(settings.SHADOW_BATCH_SIZE)
+            if not entries:
+                return totals
+            result = ShadowScorer.score(entries, challengers)
+            totals['batches'] += 1
+            totals['ventanas'] += result['ventanas']
+            totals['predictions'] += result['predictions']
+
+    @staticmethod
+    def score(entries: List[Dict], challengers: List[LoadedModel]) -> Dict:
+        """Store the champion's queued probabilities and each challenger's for the same windows."""
+        champion = {entry['ventana_id']: entry for entry in entries}
+        ventanas = list(
+            Ventana.objects
+            .filter(id__in=champion)
+            .order_by('id')
+            .only('id', 'created_at', 'lectura_count')
+        )
+        rows = [
+            ShadowPrediction(
+                ventana_id=ventana.id, modelo=champion[ventana.id]['modelo'], is_champion=True,
+                probabilidad=champion[ventana.id]['probability'], latency_us=champion[ventana.id]['latency_us'],
+            )
+            for ventana in ventanas
+        ]
+
+        features_by_set = {}
+        for challenger in challengers:
+            if challenger.feature_set not in features_by_set:
+                features_by_set[challenger.feature_set] = VentanaFeatureStore.get_many(ventanas, challenger.feature_set)
+            features = features_by_set[challenger.feature_set]
+            scored = [ventana.id for ventana in ventanas if ventana.id in features]
+            if not scored:
+                continue
+
+            matrix = pd.DataFrame(
+                [features[ventana_id] for ventana_id in scored], columns=challenger.feature_names
+            ).astype(float).fillna(0)
+            try:
+                start = time.perf_counter()
+                probabilities, _ = score(challenger, matrix)
+                latency_us = round((time.perf_counter() - start) * 1e6 / len(scored))
+            except Exception:
+                logger.error(f"[SHADOW] Scoring with {challenger.label} failed", exc_info=True)
+                continue
+            rows.extend(
+                ShadowPrediction(
+                    ventana_id=ventana_id, modelo=challenger.label, is_champion=False,
+                    probabilidad=float(probability), latency_us=latency_us,
+                )
+                for ventana_id, probability in zip(scored, probabilities)
+            )
+
+        ShadowPrediction.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+        return {'ventanas': len(ventanas), 'predictions': len(rows)}
+
+class ShadowEvaluationService:
+
+    @staticmethod
+    def reported_cravings(ventana_ids: Iterable[int]) -> Dict[int, bool]:
+        """
+        {ventana_id: whether the consumer reported a craving during the window
+        or within SHADOW_OUTCOME_HORIZON_MINUTES after it}. Deseos created by
+        a model alert are not reports.
+        """
+        horizon = timedelta(minutes=settings.SHADOW_OUTCOME_HORIZON_MINUTES)
+        reported = Deseo.objects.filter(
+            consumidor_id=OuterRef('consumidor_id'),
+            created_at__gte=OuterRef('window_start'),
+            created_at__lt=ExpressionWrapper(OuterRef('window_end') + horizon, output_field=DateTimeField()),
+        ).filter(
+            ~Exists(Notificacion.objects.filter(deseo_id=OuterRef('pk'), tipo='alerta'))
+        )
+        return dict(
+            Ventana.objects
+            .filter(id__in=list(ventana_ids))
+            .annotate(reported=Exists(reported))
+            .values_list('id', 'reported')
+        )
+
+    @staticmethod
+    def _summary(group: pd.DataFrame) -> Dict:
+        probability, champion = group['probabilidad'].to_numpy(), group['champion'].to_numpy()
+        outcome = group['outcome'].to_numpy(dtype=float)
+        return {
+            'windows': len(group),
+            'agreement': round(float(((probability >= 0.5) == (champion >= 0.5)).mean()), 4),
+            'risk_agreement': round(float(
+                (np.digitize(probability, RISK_THRESHOLDS) == np.digitize(champion, RISK_THRESHOLDS)).mean()
+            ), 4),
+            'mean_abs_diff': round(float(np.abs(probability - champion).mean()), 4),
+            'mean_probability': round(float(probability.mean()), 4),
+            'reported_rate': round(float(outcome.mean()), 4),
+            'brier': round(float(((probability - outcome) ** 2).mean()), 4),
+            'ece': round(_calibration_error(probability, outcome), 4),
+            'latency_us_mean': round(float(group['latency_us'].mean()), 1),
+            'latency_us_p95': round(float(group['latency_us'].quantile(0.95)), 1),
+        }
+
+    @staticmethod
+    def report(start: datetime, end: Optional[datetime] = None) -> Dict:
+        """
+        Every model (champion versions included) on the windows scored
+        between start and end, compared with the champion's probability for
+        the same window; overall and per day.
+        """
+        predictions = ShadowPrediction.objects.filter(created_at__gte=start)
+        if end is not None:
+            predictions = predictions.filter(created_at__lt=end)
+        df = pd.DataFrame(
+            list(predictions.values_list('ventana_id', 'modelo', 'is_champion', 'probabilidad', 'latency_us', 'created_at')),
+            columns=['ventana_id', 'modelo', 'is_champion', 'probabilidad', 'latency_us', 'created_at'],
+        )
+        if df.empty:
+            return {'models': [], 'days': []}
+
+        champion = (
+            df[df['is_champion']].drop_duplicates('ventana_id')
+            .set_index('ventana_id')['probabilidad'].rename('champion')
+        )
+        df = df.join(champion, on='ventana_id', how='inner')
+        df['outcome'] = df['ventana_id'].map(ShadowEvaluationService.reported_cravings(df['ventana_id'].unique()))
+        df['outcome'] = df['outcome'].fillna(False).astype(bool)
+        df['day'] = pd.to_datetime(df['created_at']).dt.date
+
+        models = [
+            {'modelo': modelo, 'is_champion': bool(is_champion), **ShadowEvaluationService._summary(group)}
+            for (modelo, is_champion), group in df.groupby(['modelo', 'is_champion'], sort=False)
+        ]
+        days = [
+            {'day': day.isoformat(), 'modelo': modelo, **ShadowEvaluationService._summary(group)}
+            for (day, modelo), group in df.groupby(['day', 'modelo'])
+        ]
+        models.sort(key=lambda summary: (not summary['is_champion'], summary['modelo']))
+        return {'models': models, 'days': days}
@@ -0,0 +1,317 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.db import connection, transaction
+
+from api.models import Lectura, Ventana, ProcessingCheckpoint
+from api.services.ingestion_service import LecturaIngestionService, SENSOR_FIELDS
+from api.services.ventana_stats_service import VentanaStatsAccumulator
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_GROUP = 'lectura-writers'
+
+STAGING_COLUMNS = ('ventana_id',) + SENSOR_FIELDS + ('device_id', 'seq', 'created_at', 'updated_at')
+
+def _parse_stream_id(entry_id: str) -> Tuple[int, int]:
+    millis, _, seq = entry_id.partition('-')
+    return int(millis), int(seq or 0)
+
+def _format_stream_id(parsed: Tuple[int, int]) -> str:
+    return f"{parsed[0]}-{parsed[1]}"
+
+class LecturaStreamBuffer:
+
+    DRAIN_LOCK_KEY = 'lecturas:stream:drain:lock'
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.LECTURA_INGESTION_MODE == 'stream'
+
+    @staticmethod
+    def stream_key(shard: int) -> str:
+        return f'lecturas:stream:{shard}'
+
+    @staticmethod
+    def shard_for(ventana_id: int) -> int:
+        return int(ventana_id) % settings.LECTURA_STREAM_SHARDS
+
+    @staticmethod
+    def append(ventana: Ventana, samples: List[Dict], device_id: Optional[str] = None) -> int:
+        client = get_redis()
+        key = LecturaStreamBuffer.stream_key(LecturaStreamBuffer.shard_for(ventana.id))
+        accepted_at = str(time.time_ns() // 1000)
+
+        pipe = client.pipeline(transaction=False)
+        for sample in samples:
+            fields = {
+                'v': ventana.id,
+                'c': ventana.consumidor_id,
+                't': accepted_at,
+                'd': device_id or '',
+                's': '' if sample.get('seq') is None else sample['seq'],
+            }
+            for field in SENSOR_FIELDS:
+                value = sample.get(field)
+                fields[field] = '' if value is None else repr(float(value))
+            pipe.xadd(key, fields)
+        pipe.execute()
+
+        logger.debug(f"[STREAM] Queued {len(samples)} readings for ventana {ventana.id} on {key}")
+        return len(samples)
+
+    @staticmethod
+    def _ensure_group(client, key: str) -> None:
+        try:
+            client.xgroup_create(key, STREAM_GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    @staticmethod
+    def drain() -> Optional[List[Dict]]:
+        """
+        Drain every shard, one after another. Returns None when another run
+        still holds the drain lock: a run can take LECTURA_STREAM_DRAIN_SECONDS
+        per shard, longer than the beat interval, and overlapping runs would
+        only tie up workers.
+        """
+        shards = settings.LECTURA_STREAM_SHARDS
+        lock = get_redis().lock(
+            LecturaStreamBuffer.DRAIN_LOCK_KEY,
+            timeout=shards * settings.LECTURA_STREAM_DRAIN_SECONDS + settings.LECTURA_STREAM_LOCK_TIMEOUT
+        )
+        if not lock.acquire(blocking=False):
+            return None
+
+        try:
+            return [LecturaStreamBuffer.drain_shard(shard) for shard in range(shards)]
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                logger.warning("[STREAM] Drain lock expired before release")
+
+    @staticmethod
+    def drain_shard(shard: int) -> Dict:
+        """
+        Move queued readings of one shard into PostgreSQL.
+
+        Only one drainer works on a shard at a time (Redis lock), so entries
+        left pending by a crashed drainer are always older than unread ones
+        and are replayed first. Committed entries are skipped through the
+        shard checkpoint, which is updated in the same transaction as the
+        insert; that keeps at-least-once delivery from producing duplicates.
+        """
+        client = get_redis()
+        key = LecturaStreamBuffer.stream_key(shard)
+        lock = client.lock(f'{key}:lock', timeout=settings.LECTURA_STREAM_LOCK_TIMEOUT)
+
+        if not lock.acquire(blocking=False):
+            return {'shard': shard, 'stored': 0, 'skipped': True}
+
+        stored = 0
+        started = time.monotonic()
+        try:
+            LecturaStreamBuffer._ensure_group(client, key)
+            consumer = f'drainer-{shard}'
+
+            for start_id in ('0', '>'):
+                while time.monotonic() - started < settings.LECTURA_STREAM_DRAIN_SECONDS:
+                    response = client.xreadgroup(
+                        STREAM_GROUP, consumer, {key: start_id},
+                        count=settings.LECTURA_STREAM_BATCH_SIZE
+                    )
+                    entries = response[0][1] if response else []
+                    if not entries:
+                        break
+                    stored += LecturaStreamBuffer._commit_entries(client, key, entries)
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                logger.warning(f"[STREAM] Lock for {key} expired before release")
+
+        return {
+            'shard': shard,
+            'stored': stored,
+            'seconds': round(time.monotonic() - started, 3),
+        }
+
+    @staticmethod
+    def _commit_entries(client, key: str, entries: List) -> int:
+        checkpoint_key = f'stream:{key}'
+        consumidor_by_ventana = {}
+
+        with transaction.atomic():
+            checkpoint = ProcessingCheckpoint.objects.select_for_update().filter(
+                key=checkpoint_key
+            ).first()
+            last_id = _parse_stream_id(checkpoint.position) if checkpoint else (0, 0)
+            max_id = last_id
+
+            rows = []
+            for entry_id, fields in entries:
+                parsed = _parse_stream_id(entry_id)
+                if parsed <= last_id or not fields:
+                    # Already committed by a drainer that died before XACK
+                    continue
+                max_id = max(max_id, parsed)
+                rows.append(LecturaStreamBuffer._row_from_fields(fields))
+                consumidor_by_ventana[int(fields['v'])] = int(fields['c'])
+
+            inserted = LecturaStreamBuffer._copy_rows(rows) if rows else []
+
+            by_ventana = defaultdict(list)
+            for lectura in inserted:
+                by_ventana[lectura.ventana_id].append(lectura)
+            counts = {
+                ventana_id: LecturaIngestionService.increment_count(ventana_id, len(lecturas))
+                for ventana_id, lecturas in by_ventana.items()
+            }
+
+            if max_id > last_id:
+                ProcessingCheckpoint.set_position(checkpoint_key, _format_stream_id(max_id))
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = client.pipeline(transaction=False)
+        pipe.xack(key, STREAM_GROUP, *entry_ids)
+        pipe.xdel(key, *entry_ids)
+        pipe.execute()
+
+        if len(inserted) < len(rows):
+            logger.warning(
+                f"[STREAM] Dropped {len(rows) - len(inserted)} readings from {key} "
+                f"whose ventana no longer exists"
+            )
+
+        LecturaStreamBuffer._after_commit(by_ventana, counts, consumidor_by_ventana)
+        return len(inserted)
+
+    @staticmethod
+    def _row_from_fields(fields: Dict) -> Tuple:
+        accepted_at = datetime.fromtimestamp(int(fields['t']) / 1_000_000, tz=dt_timezone.utc)
+        values = [int(fields['v'])]
+        for field in SENSOR_FIELDS:
+            raw = fields.get(field, '')
+            values.append(float(raw) if raw != '' else None)
+        values.append(fields.get('d') or None)
+        values.append(int(fields['s']) if fields.get('s') else None)
+        values.extend([accepted_at, accepted_at])
+        return tuple(values)
+
+    @staticmethod
+    def _copy_rows(rows: List[Tuple]) -> List[Lectura]:
+        columns = ', '.join(STAGING_COLUMNS)
+        returning = ', '.join(('id', 'ventana_id') + SENSOR_FIELDS + ('created_at',))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TEMP TABLE lecturas_staging (
+                    ventana_id bigint,
+                    {', '.join(f'{field} double precision' for field in SENSOR_FIELDS)},
+                    device_id varchar(64),
+                    seq bigint,
+                    created_at timestamptz,
+                    updated_at timestamptz
+                ) ON COMMIT DROP
+            """)
+
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy'):
+                # psycopg 3: stream the rows with COPY FROM STDIN
+                with raw_cursor.copy(f"COPY lecturas_staging ({columns}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                placeholders = ', '.join(['%s'] * len(STAGING_COLUMNS))
+                cursor.executemany(
+                    f"INSERT INTO lecturas_staging ({columns}) VALUES ({placeholders})",
+                    rows
+                )
+
+            cursor.execute(f"""
+                INSERT INTO lecturas ({columns})
+                SELECT {', '.join(f's.{column}' for column in STAGING_COLUMNS)}
+                FROM lecturas_staging s
+                JOIN ventanas v ON v.id = s.ventana_id
+                RETURNING {returning}
+            """)
+            returned = cursor.fetchall()
+
+        fields = ('id', 'ventana_id') + SENSOR_FIELDS + ('created_at',)
+        return [Lectura(**dict(zip(fields, row))) for row in returned]
+
+    @staticmethod
+    def _after_commit(by_ventana: Dict[int, List[Lectura]], counts: Dict[int, int],
+                      consumidor_by_ventana: Dict[int, int]) -> None:
+        for ventana_id, ventana_lecturas in by_ventana.items():
+            VentanaStatsAccumulator.add(ventana_id, ventana_lecturas)
+            lectura_count = counts[ventana_id]
+            LecturaIngestionService.maybe_calculate_statistics(
+                ventana_id, lectura_count - len(ventana_lecturas), lectura_count
+            )
+            LecturaIngestionService.broadcast(consumidor_by_ventana[ventana_id], ventana_lecturas)
+
+    @staticmethod
+    def oldest_buffered_at() -> Optional[datetime]:
+        """
+        created_at the oldest reading still waiting in the streams will get
+        (its accept time), or None when every shard is drained. Entries at or
+        before a shard's checkpoint are already in PostgreSQL.
+        """
+        client = get_redis()
+        oldest = None
+        for shard in range(settings.LECTURA_STREAM_SHARDS):
+            key = LecturaStreamBuffer.stream_key(shard)
+            position = ProcessingCheckpoint.get_position(f'stream:{key}')
+            entries = client.xrange(key, min=f'({position}' if position else '-', count=1)
+            if entries:
+                accepted_at = datetime.fromtimestamp(int(entries[0][1]['t']) / 1_000_000, tz=dt_timezone.utc)
+                oldest = accepted_at if oldest is None else min(oldest, accepted_at)
+        return oldest
+
+    @staticmethod
+    def status() -> Dict:
+        client = get_redis()
+        now_ms = time.time() * 1000
+        shards = []
+
+        for shard in range(settings.LECTURA_STREAM_SHARDS):
+            key = LecturaStreamBuffer.stream_key(shard)
+            info = {
+                'shard': shard,
+                'stream': key,
+                'length': client.xlen(key),
+                'pending': 0,
+                'lag': None,
+                'oldest_age_seconds': 0.0,
+            }
+
+            try:
+                for group in client.xinfo_groups(key):
+                    if group['name'] == STREAM_GROUP:
+                        info['pending'] = group['pending']
+                        info['lag'] = group.get('lag')
+            except redis.ResponseError:
+                pass
+
+            oldest = client.xrange(key, count=1)
+            if oldest:
+                oldest_ms, _ = _parse_stream_id(oldest[0][0])
+                info['oldest_age_seconds'] = round(max(0.0, now_ms - oldest_ms) / 1000, 3)
+
+            shards.append(info)
+
+        return {
+            'mode': settings.LECTURA_INGESTION_MODE,
+            'backlog': sum(shard['length'] for shard in shards),
+            'max_age_seconds': max((shard['oldest_age_seconds'] for shard in shards), default=0.0),
+            'shards': shards,
+        }
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from django.utils import timezone
+
+from api.models import Ventana
+from utils.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+class CachedVentana(NamedTuple):
+    id: int
+    consumidor_id: int
+    window_start: datetime
+    window_end: datetime
+    is_open: bool
+
+class VentanaCache:
+
+    # The in-process layer is not invalidated across processes, so keep it
+    # short-lived; Redis is the shared layer and is invalidated explicitly.
+    LOCAL_MAX_ENTRIES = 2048
+    LOCAL_TTL_SECONDS = 30
+    REDIS_TTL_SECONDS = 8 * 3600
+
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def key(ventana_id: int) -> str:
+        return f'ventana_info:{ventana_id}'
+
+    @staticmethod
+    def _local_get(ventana_id: int) -> Optional[CachedVentana]:
+        with VentanaCache._lock:
+            hit = VentanaCache._local.get(ventana_id)
+            if hit is None:
+                return None
+            expires_at, entry = hit
+            if expires_at < time.monotonic():
+                del VentanaCache._local[ventana_id]
+                return None
+            VentanaCache._local.move_to_end(ventana_id)
+            return entry
+
+    @staticmethod
+    def _local_put(entry: CachedVentana) -> None:
+        with VentanaCache._lock:
+            VentanaCache._local[entry.id] = (time.monotonic() + VentanaCache.LOCAL_TTL_SECONDS, entry)
+            VentanaCache._local.move_to_end(entry.id)
+            while len(VentanaCache._local) > VentanaCache.LOCAL_MAX_ENTRIES:
+                VentanaCache._local.popitem(last=False)
+
+    @staticmethod
+    def _to_hash(entry: CachedVentana) -> Dict[str, str]:
+        return {
+            'consumidor_id': str(entry.consumidor_id),
+            'window_start': entry.window_start.isoformat(),
+            'window_end': entry.window_end.isoformat(),
+            'is_open': '1' if entry.is_open else '0',
+        }
+
+    @staticmethod
+    def _from_hash(ventana_id: int, raw: Dict[str, str]) -> CachedVentana:
+        return CachedVentana(
+            id=int(ventana_id),
+            consumidor_id=int(raw['consumidor_id']),
+            window_start=datetime.fromisoformat(raw['window_start']),
+            window_end=datetime.fromisoformat(raw['window_end']),
+            is_open=raw['is_open'] == '1',
+        )
+
+    @staticmethod
+    def _from_row(row: Dict) -> CachedVentana:
+        return CachedVentana(
+            id=row['id'],
+            consumidor_id=row['consumidor_id'],
+            window_start=row['window_start'],
+            window_end=row['window_end'],
+            is_open=row['window_end'] > timezone.now(),
+        )
+
+    @staticmethod
+    def _store(entry: CachedVentana) -> None:
+        VentanaCache._local_put(entry)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hset(VentanaCache.key(entry.id), mapping=VentanaCache._to_hash(entry))
+            pipe.expire(VentanaCache.key(entry.id), VentanaCache.REDIS_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache ventana {entry.id}: {e}")
+
+    @staticmethod
+    def populate(ventana: Ventana, is_open: bool = True) -> CachedVentana:
+        entry = CachedVentana(
+            id=ventana.id,
+            consumidor_id=ventana.consumidor_id,
+            window_start=ventana.window_start,
+            window_end=ventana.window_end,
+            is_open=is_open,
+        )
+        VentanaCache._store(entry)
+        return entry
+
+    @staticmethod
+    def invalidate(ventana_id: int) -> None:
+        with VentanaCache._lock:
+            VentanaCache._local.pop(int(ventana_id), None)
+        try:
+            get_redis().delete(VentanaCache.key(ventana_id))
+        except Exception as e:
+            logger.warning(f"Failed to invalidate cached ventana {ventana_id}: {e}")
+
+    @staticmethod
+    def get(ventana_id) -> Optional[CachedVentana]:
+        """
+        Resolve a ventana for ingestion: in-process LRU, then Redis, then
+        the database (which repopulates both). None if it does not exist.
+        """
+        try:
+            ventana_id = int(ventana_id)
+        except (TypeError, ValueError):
+            return None
+
+        entry = VentanaCache._local_get(ventana_id)
+        if entry is not None:
+            return entry
+
+        try:
+            raw = get_redis().hgetall(VentanaCache.key(ventana_id))
+        except Exception as e:
+            logger.warning(f"Ventana cache unavailable: {e}")
+            raw = None
+        if raw:
+            entry = VentanaCache._from_hash(ventana_id, raw)
+            VentanaCache._local_put(entry)
+            return entry
+
+        row = Ventana.objects.filter(id=ventana_id).values(
+            'id', 'consumidor_id', 'window_start', 'window_end'
+        ).first()
+        if row is None:
+            return None
+        entry = VentanaCache._from_row(row)
+        VentanaCache._store(entry)
+        return entry
+
+    @staticmethod
+    async def aget(ventana_id) -> Optional[CachedVentana]:
+        try:
+            ventana_id = int(ventana_id)
+        except (TypeError, ValueError):
+            return None
+
+        entry = VentanaCache._local_get(ventana_id)
+        if entry is not None:
+            return entry
+
+        client = get_async_redis()
+        try:
+            raw = await client.hgetall(VentanaCache.key(ventana_id))
+        except Exception as e:
+            logger.warning(f"Ventana cache unavailable: {e}")
+            raw = None
+        if raw:
+            entry = VentanaCache._from_hash(ventana_id, raw)
+            VentanaCache._local_put(entry)
+            return entry
+
+        row = await Ventana.objects.filter(id=ventana_id).values(
+            'id', 'consumidor_id', 'window_start', 'window_end'
+        ).afirst()
+        if row is None:
+            return None
+        entry = VentanaCache._from_row(row)
+        VentanaCache._local_put(entry)
+        try:
+            key = VentanaCache.key(entry.id)
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(key, mapping=VentanaCache._to_hash(entry))
+            pipe.expire(key, VentanaCache.REDIS_TTL_SECONDS)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to cache ventana {entry.id}: {e}")
+        return entry
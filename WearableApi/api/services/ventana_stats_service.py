@@ -0,0 +1,186 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from api.models import Lectura
+from utils.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+ACCEL_FIELDS = ('accel_x', 'accel_y', 'accel_z')
+GYRO_FIELDS = ('gyro_x', 'gyro_y', 'gyro_z')
+
+# Merges a batch partial into the window accumulator (Chan et al. parallel
+# variance update), so concurrent ingest requests never lose each other's
+# readings and the hash stays O(1) in size.
+MERGE_SCRIPT = """
+local key = KEYS[1]
+local acc = redis.call('HMGET', key, 'n', 'hr_n', 'hr_mean', 'hr_m2',
+                       'accel_n', 'accel_sumsq', 'gyro_n', 'gyro_sumsq')
+
+local n = (tonumber(acc[1]) or 0) + tonumber(ARGV[2])
+local hr_n = tonumber(acc[2]) or 0
+local hr_mean = tonumber(acc[3]) or 0
+local hr_m2 = tonumber(acc[4]) or 0
+
+local b_hr_n = tonumber(ARGV[3])
+if b_hr_n > 0 then
+    local b_hr_mean = tonumber(ARGV[4])
+    local total = hr_n + b_hr_n
+    local delta = b_hr_mean - hr_mean
+    hr_mean = hr_mean + delta * b_hr_n / total
+    hr_m2 = hr_m2 + tonumber(ARGV[5]) + delta * delta * hr_n * b_hr_n / total
+    hr_n = total
+end
+
+local fmt = '%.17g'
+redis.call('HSET', key,
+    'n', string.format(fmt, n),
+    'hr_n', string.format(fmt, hr_n),
+    'hr_mean', string.format(fmt, hr_mean),
+    'hr_m2', string.format(fmt, hr_m2),
+    'accel_n', string.format(fmt, (tonumber(acc[5]) or 0) + tonumber(ARGV[6])),
+    'accel_sumsq', string.format(fmt, (tonumber(acc[6]) or 0) + tonumber(ARGV[7])),
+    'gyro_n', string.format(fmt, (tonumber(acc[7]) or 0) + tonumber(ARGV[8])),
+    'gyro_sumsq', string.format(fmt, (tonumber(acc[8]) or 0) + tonumber(ARGV[9])))
+redis.call('EXPIRE', key, tonumber(ARGV[1]))
+return n
+"""
+
+def _column(lecturas: List, field: str) -> np.ndarray:
+    return np.array(
+        [np.nan if getattr(l, field) is None else getattr(l, field) for l in lecturas],
+        dtype=np.float64
+    )
+
+class VentanaStatsAccumulator:
+
+    # Windows can be extended up to an hour; keep the hash well past that
+    TTL_SECONDS = 6 * 3600
+
+    _merge = None
+    _amerge = None
+
+    @staticmethod
+    def key(ventana_id: int) -> str:
+        return f'ventana_acc:{ventana_id}'
+
+    @staticmethod
+    def partial(lecturas: Iterable[Lectura]) -> Dict:
+        lecturas = list(lecturas)
+        return VentanaStatsAccumulator.partial_from_samples({
+            field: _column(lecturas, field)
+            for field in ('heart_rate',) + ACCEL_FIELDS + GYRO_FIELDS
+        })
+
+    @staticmethod
+    def partial_from_samples(samples: Dict[str, np.ndarray]) -> Dict:
+        """Partial of reader-style arrays (NaN for missing values)."""
+        hr = samples['heart_rate']
+        n = int(hr.size)
+        hr = hr[~np.isnan(hr)]
+
+        partial = {
+            'n': n,
+            'hr_n': int(hr.size),
+            'hr_mean': float(hr.mean()) if hr.size else 0.0,
+            'hr_m2': float(((hr - hr.mean()) ** 2).sum()) if hr.size else 0.0,
+        }
+
+        for prefix, fields in (('accel', ACCEL_FIELDS), ('gyro', GYRO_FIELDS)):
+            axes = np.column_stack([samples[field] for field in fields])
+            present = ~np.isnan(axes)
+            partial[f'{prefix}_n'] = int(present.any(axis=1).sum())
+            partial[f'{prefix}_sumsq'] = float(np.nansum(axes ** 2))
+
+        return partial
+
+    @staticmethod
+    def add(ventana_id: int, lecturas: Iterable[Lectura]) -> None:
+        """Fold freshly stored readings into the window accumulator (O(batch))."""
+        lecturas = list(lecturas)
+        if not lecturas:
+            return
+        try:
+            VentanaStatsAccumulator._merge_partial(
+                ventana_id, VentanaStatsAccumulator.partial(lecturas)
+            )
+        except Exception as e:
+            # A missing or stale accumulator is detected by the count check in
+            # _calculate_ventana_statistics_sync and rebuilt from the database.
+            logger.warning(f"Failed to update accumulator for ventana {ventana_id}: {e}")
+
+    @staticmethod
+    async def aadd(ventana_id: int, lecturas: Iterable[Lectura]) -> None:
+        lecturas = list(lecturas)
+        if not lecturas:
+            return
+        try:
+            if VentanaStatsAccumulator._amerge is None:
+                VentanaStatsAccumulator._amerge = get_async_redis().register_script(MERGE_SCRIPT)
+            await VentanaStatsAccumulator._amerge(
+                keys=[VentanaStatsAccumulator.key(ventana_id)],
+                args=VentanaStatsAccumulator._merge_args(VentanaStatsAccumulator.partial(lecturas))
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update accumulator for ventana {ventana_id}: {e}")
+
+    @staticmethod
+    def _merge_args(partial: Dict) -> List:
+        return [
+            VentanaStatsAccumulator.TTL_SECONDS,
+            partial['n'],
+            partial['hr_n'], repr(partial['hr_mean']), repr(partial['hr_m2']),
+            partial['accel_n'], repr(partial['accel_sumsq']),
+            partial['gyro_n'], repr(partial['gyro_sumsq']),
+        ]
+
+    @staticmethod
+    def _merge_partial(ventana_id: int, partial: Dict) -> None:
+        if VentanaStatsAccumulator._merge is None:
+            VentanaStatsAccumulator._merge = get_redis().register_script(MERGE_SCRIPT)
+
+        VentanaStatsAccumulator._merge(
+            keys=[VentanaStatsAccumulator.key(ventana_id)],
+            args=VentanaStatsAccumulator._merge_args(partial)
+        )
+
+    @staticmethod
+    def snapshot(ventana_id: int) -> Optional[Dict]:
+        raw = get_redis().hgetall(VentanaStatsAccumulator.key(ventana_id))
+        if not raw:
+            return None
+        acc = {field: float(value) for field, value in raw.items()}
+        for field in ('n', 'hr_n', 'accel_n', 'gyro_n'):
+            acc[field] = int(acc[field])
+        return acc
+
+    @staticmethod
+    def statistics(acc: Dict) -> Dict:
+        hr_n = acc['hr_n']
+        return {
+            'hr_mean': acc['hr_mean'] if hr_n else None,
+            # Population std, same as np.std() in the rescan path
+            'hr_std': float(np.sqrt(max(acc['hr_m2'], 0.0) / hr_n)) if hr_n else None,
+            'accel_energy': acc['accel_sumsq'] if acc['accel_n'] else None,
+            'gyro_energy': acc['gyro_sumsq'] if acc['gyro_n'] else None,
+        }
+
+    @staticmethod
+    def reset(ventana_id: int, aggregates: Dict) -> None:
+        """
+        Rebuild the accumulator from the aggregates of every reading of the
+        window (VentanaAggregationService), which carry its fields.
+        """
+        key = VentanaStatsAccumulator.key(ventana_id)
+        get_redis().delete(key)
+        if aggregates['n']:
+            VentanaStatsAccumulator._merge_partial(ventana_id, {
+                'n': int(aggregates['n']),
+                'hr_n': int(aggregates['hr_n']),
+                'hr_mean': aggregates['hr_mean'],
+                'hr_m2': aggregates['hr_m2'],
+                'accel_n': int(aggregates['accel_n']),
+                'accel_sumsq': aggregates['accel_sumsq'],
+                'gyro_n': int(aggregates['gyro_n']),
+                'gyro_sumsq': aggregates['gyro_sumsq'],
+            })
@@ -1,20 +1,19 @@
 from celery import shared_task
 import logging
-import numpy as np
 import pandas as pd
-from datetime import timedelta
+from datetime import datetime, timedelta
 from django.db import models
-from django.core.cache import cache
 from django.utils import timezone
-from api.models import Consumidor, Analisis, Ventana, Usuario, Notificacion, Deseo, Lectura
+from api.models import Consumidor, Ventana, Usuario, Lectura
 
 import json
 from django_celery_beat.models import PeriodicTask, IntervalSchedule
-from api.models import Consumidor, Analisis, Ventana, Usuario, Notificacion, Deseo, Lectura
 
 logger = logging.getLogger(__name__)
 
-def calculate_features_from_readings(consumidor, time_window_minutes=30):
+def calculate_features_from_readings(consumidor, time_window_minutes=30, feature_set=1):
+    from api.services import VentanaFeatureStore
+    
     time_threshold = timezone.now() - timezone.timedelta(minutes=time_window_minutes)
     
     recent_ventanas = Ventana.objects.filter(
@@ -27,48 +26,17 @@ def calculate_features_from_readings(consumidor, time_window_minutes=30):
         return None
     
     ventana = recent_ventanas.first()
-    lecturas = Lectura.objects.filter(ventana=ventana)
+    # Stored when the window closed. The open window is computed without
+    # storing it: its next readings would make the vector stale, and the
+    # rollover stores the final one
+    features = VentanaFeatureStore.get(
+        ventana, feature_set, store=ventana.window_end <= timezone.now()
+    )
     
-    if not lecturas.exists():
+    if features is None:
         logger.warning(f"No lecturas found in ventana {ventana.id}")
         return None
     
-    heart_rates = [l.heart_rate or 0 for l in lecturas]
-    accel_x = [l.accel_x or 0 for l in lecturas]
-    accel_y = [l.accel_y or 0 for l in lecturas]
-    accel_z = [l.accel_z or 0 for l in lecturas]
-    gyro_x = [l.gyro_x or 0 for l in lecturas]
-    gyro_y = [l.gyro_y or 0 for l in lecturas]
-    gyro_z = [l.gyro_z or 0 for l in lecturas]
-    
-    hr_array = np.array(heart_rates)
-    
-    accel_magnitude = np.sqrt(
-        np.array(accel_x)**2 + 
-        np.array(accel_y)**2 + 
-        np.array(accel_z)**2
-    )
-    
-    gyro_magnitude = np.sqrt(
-        np.array(gyro_x)**2 + 
-        np.array(gyro_y)**2 + 
-        np.array(gyro_z)**2
-    )
-    
-    features = {
-        'hr_mean': float(np.mean(hr_array)),
-        'hr_std': float(np.std(hr_array)),
-        'hr_min': float(np.min(hr_array)),
-        'hr_max': float(np.max(hr_array)),
-        'hr_range': float(np.max(hr_array) - np.min(hr_array)),
-        'accel_magnitude_mean': float(np.mean(accel_magnitude)),
-        'accel_magnitude_std': float(np.std(accel_magnitude)),
-        'gyro_magnitude_mean': float(np.mean(gyro_magnitude)),
-        'gyro_magnitude_std': float(np.std(gyro_magnitude)),
-        'accel_energy': float(np.sum(np.array(accel_x)**2 + np.array(accel_y)**2 + np.array(accel_z)**2)),
-        'gyro_energy': float(np.sum(np.array(gyro_x)**2 + np.array(gyro_y)**2 + np.array(gyro_z)**2)),
-    }
-    
     return features, ventana
 
 @shared_task(bind=True, max_retries=3)
@@ -103,39 +71,17 @@ def predict_smoking_craving(self, user_id, features_dict=None):
         logger.info(f"features_dict is None: {features_dict is None}")
         logger.info(f"features_dict type: {type(features_dict)}")
         
-        if features_dict is None or len(features_dict) == 0 or 'hr_mean' not in features_dict:
-            logger.info(f"Calculating features from sensor readings for consumidor {consumidor.id}")
-            result = calculate_features_from_readings(consumidor)
-            
-            if result is None:
-                error_msg = "No recent sensor readings found. Cannot make prediction."
-                logger.error(error_msg)
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'suggestion': 'Ensure wearable is sending sensor data (Lectura records)'
-                }
-            
-            features_dict, existing_ventana = result
-            logger.info(f"Features calculated: {features_dict}")
-        else:
-            logger.info(f"Using provided manual features")
-            existing_ventana = None
-        
         try:
-            import joblib
+            from django.conf import settings
+            from api.ml import ModelRegistry
             
-            model_package = cache.get('ml_model_package')
-            if model_package is None:
-                model_package = joblib.load('models/smoking_craving_model.pkl')
-                cache.set('ml_model_package', model_package, timeout=3600)
-            
-            model = model_package['model']
-            scaler = model_package['scaler']
-            feature_names = model_package['feature_names']
+            # Loaded once per worker process, hot-reloaded when retrained
+            served_model = ModelRegistry.get()
+            feature_names = served_model.feature_names
+            feature_set = served_model.feature_set
             
         except FileNotFoundError:
-            error_msg = "ML model file not found at 'models/smoking_craving_model.pkl'"
+            error_msg = f"ML model file not found at '{settings.ML_MODEL_PATH}'"
             logger.error(error_msg)
             return {
                 'success': False,
@@ -156,6 +102,27 @@ def predict_smoking_craving(self, user_id, features_dict=None):
                 'error': f'Model loading failed: {str(e)}'
             }
         
+        if features_dict is None or len(features_dict) == 0 or 'hr_mean' not in features_dict:
+            logger.info(f"Calculating features from sensor readings for consumidor {consumidor.id}")
+            result = calculate_features_from_readings(consumidor, feature_set=feature_set)
+            
+            if result is None:
+                error_msg = "No recent sensor readings found. Cannot make prediction."
+                logger.error(error_msg)
+                return {
+                    'success': False,
+                    'error': error_msg,
+                    'suggestion': 'Ensure wearable is sending sensor data (Lectura records)'
+                }
+            
+            features_dict, existing_ventana = result
+            logger.info(f"Features calculated: {features_dict}")
+        else:
+            logger.info(f"Using provided manual features")
+            existing_ventana = None
+        
+        from api.services.prediction_service import record_prediction, score
+        
         features_df = pd.DataFrame([features_dict])
         
         try:
@@ -168,93 +135,14 @@ def predict_smoking_craving(self, user_id, features_dict=None):
                 'error': error_msg
             }
         
-        features_scaled = scaler.transform(features_df)
-        
-        prediction = model.predict(features_scaled)[0]
-        probability = model.predict_proba(features_scaled)[0][1]
-        
-        model_metrics = model_package.get('metrics', {})
-        accuracy = model_metrics.get('accuracy')
-        precision = model_metrics.get('precision')
-        recall = model_metrics.get('recall')
-        f1 = model_metrics.get('f1_score')
-        if probability >= 0.7:
-            risk_level = 'high'
-            comentario = f'Alto riesgo de deseo detectado ({probability*100:.1f}%). Intervención inmediata recomendada.'
-        elif probability >= 0.4:
-            risk_level = 'medium'
-            comentario = f'Riesgo moderado de deseo ({probability*100:.1f}%). Monitoreo continuo recomendado.'
-        else:
-            risk_level = 'low'
-            comentario = f'Bajo riesgo de deseo ({probability*100:.1f}%). Estado estable.'
-        
-        logger.info(f"Prediction: probability={probability:.2%}, risk={risk_level}")
-        
-        if existing_ventana:
-            ventana = existing_ventana
-        else:
-            ventana = Ventana.objects.create(
-                consumidor=consumidor,
-                window_start=timezone.now(),
-                window_end=timezone.now() + timezone.timedelta(minutes=30)
-            )
+        probabilities, predictions = score(served_model, features_df)
         
-        ventana.hr_mean = features_dict.get('hr_mean')
-        ventana.hr_std = features_dict.get('hr_std')
-        ventana.accel_energy = features_dict.get('accel_energy')
-        ventana.gyro_energy = features_dict.get('gyro_energy')
-        ventana.save()
-        
-        logger.info(f"Features saved to Ventana ID {ventana.id}")
-        
-        analisis = Analisis.objects.create(
-            ventana=ventana,
-            probabilidad_modelo=float(probability),
-            urge_label=int(prediction),
-            modelo_usado='LogisticRegression_v1',
-            recall=recall,
-            f1_score=f1,
-            accuracy=accuracy,
-            roc_auc=None,
-            comentario_modelo=comentario
+        result = record_prediction(
+            consumidor, existing_ventana, features_dict,
+            float(probabilities[0]), int(predictions[0]), served_model
         )
-        
-        logger.info(f"Prediction saved: Analisis ID {analisis.id}, risk={risk_level}, prob={probability:.2%}")
-        
-        if risk_level == 'high':
-            deseo = Deseo.objects.create(
-                consumidor=consumidor,
-                ventana=ventana,
-                tipo='sustancia',
-                resolved=False
-            )
-            
-            Notificacion.objects.create(
-                consumidor=consumidor,
-                deseo=deseo,
-                contenido=comentario,
-                tipo='alerta',
-                leida=False
-            )
-            
-            logger.info(f"High risk notification created for consumidor {consumidor.id}")
-        
-        return {
-            'success': True,
-            'analisis_id': analisis.id,
-            'probability': float(probability),
-            'prediction': int(prediction),
-            'risk_level': risk_level,
-            'comentario': comentario,
-            'model_metrics': {
-                'accuracy': accuracy,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1
-            },
-            'user_id': user_id,
-            'consumidor_id': consumidor.id
-        }
+        result['user_id'] = user_id
+        return result
         
     except Exception as exc:
         logger.error(f"Unexpected error in prediction: {exc}")
@@ -339,7 +227,7 @@ def simulate_wearable_cycle(self, ventana_id=None):
             base_hr = random.uniform(65, 80) # Normal HR
             motion_factor = 1.0 # Normal motion
             
-        lecturas_creadas = 0
+        samples = []
         # Generate 12 readings (assuming 5-second interval call, this creates a burst)
         # Or if called frequently, maybe just 1 reading? 
         # Let's generate a small batch (e.g., 5 seconds worth of data at 1Hz = 5 readings)
@@ -355,15 +243,17 @@ def simulate_wearable_cycle(self, ventana_id=None):
             gyro_y = random.uniform(-0.5, 0.5) * motion_factor
             gyro_z = random.uniform(-0.5, 0.5) * motion_factor
             
-            Lectura.objects.create(
-                ventana=ventana,
-                heart_rate=max(50, min(150, hr)),
-                accel_x=accel_x, accel_y=accel_y, accel_z=accel_z,
-                gyro_x=gyro_x, gyro_y=gyro_y, gyro_z=gyro_z
-            )
-            lecturas_creadas += 1
+            samples.append({
+                'heart_rate': max(50, min(150, hr)),
+                'accel_x': accel_x, 'accel_y': accel_y, 'accel_z': accel_z,
+                'gyro_x': gyro_x, 'gyro_y': gyro_y, 'gyro_z': gyro_z,
+            })
         
-        logger.info(f"[OK] {lecturas_creadas} lecturas generadas para Ventana {ventana.id}")
+        from api.services import LecturaIngestionService, VentanaStatsAccumulator
+        lecturas_creadas, _ = LecturaIngestionService.store_batch(ventana, samples)
+        VentanaStatsAccumulator.add(ventana.id, lecturas_creadas)
+        
+        logger.info(f"[OK] {len(lecturas_creadas)} lecturas generadas para Ventana {ventana.id}")
         
         # Trigger prediction
         predict_smoking_craving.apply_async(
@@ -374,7 +264,7 @@ def simulate_wearable_cycle(self, ventana_id=None):
         return {
             'success': True,
             'ventana_id': ventana.id,
-            'lecturas': lecturas_creadas,
+            'lecturas': len(lecturas_creadas),
             'pattern': 'craving' if is_craving else 'normal'
         }
         
@@ -391,7 +281,8 @@ def check_sensor_activity(self, user_id, ventana_id):
     
     try:
         # Check if any readings exist for this window
-        readings_count = Lectura.objects.filter(ventana_id=ventana_id).count()
+        from api.services import LecturaIngestionService
+        readings_count = LecturaIngestionService.count_readings(ventana_id)
         
         if readings_count == 0:
             logger.warning(f"[ALERT] No data received for Ventana {ventana_id}. Starting BACKUP GENERATOR.")
@@ -442,11 +333,20 @@ def stop_synthetic_generation(self, user_id):
         logger.error(f"[ERROR] Failed to stop generator: {e}")
 
 
-def _calculate_ventana_statistics_sync(ventana_id):
+def _calculate_ventana_statistics_sync(ventana_id, rescan=False, aggregates=None):
     """
     SYNCHRONOUS calculation function (no Celery decorator)
     This is the actual calculation logic that can be called directly
+    
+    Statistics are finalized from the running accumulator kept by
+    VentanaStatsAccumulator; the window is only rescanned (one aggregate
+    query, VentanaAggregationService) when rescan=True or when the
+    accumulator does not cover every stored reading. Backfills pass
+    `aggregates` computed for many windows at once.
     """
+    from api.ml import statistics_from_aggregates
+    from api.services import LecturaIngestionService, VentanaAggregationService, VentanaStatsAccumulator
+    
     try:
         logger.info(f"[VENTANA-CALC] Starting calculation for Ventana {ventana_id}")
         
@@ -460,10 +360,9 @@ def _calculate_ventana_statistics_sync(ventana_id):
                 'error': f'Ventana {ventana_id} does not exist'
             }
         
-        # Get all lecturas for this ventana
-        lecturas = Lectura.objects.filter(ventana=ventana).order_by('created_at')
+        lectura_count = ventana.lectura_count
         
-        if not lecturas.exists():
+        if not lectura_count and not rescan:
             logger.warning(f"[VENTANA-CALC] No lecturas found for Ventana {ventana_id}")
             return {
                 'success': False,
@@ -471,77 +370,64 @@ def _calculate_ventana_statistics_sync(ventana_id):
                 'ventana_id': ventana_id
             }
         
-        lectura_count = lecturas.count()
-        logger.info(f"[VENTANA-CALC] Processing {lectura_count} readings")
-        
-        # Extract sensor data
-        heart_rates = []
-        accel_x_values = []
-        accel_y_values = []
-        accel_z_values = []
-        gyro_x_values = []
-        gyro_y_values = []
-        gyro_z_values = []
-        
-        for lectura in lecturas:
-            if lectura.heart_rate is not None:
-                heart_rates.append(lectura.heart_rate)
-            
-            if lectura.accel_x is not None:
-                accel_x_values.append(lectura.accel_x)
-            if lectura.accel_y is not None:
-                accel_y_values.append(lectura.accel_y)
-            if lectura.accel_z is not None:
-                accel_z_values.append(lectura.accel_z)
-            
-            if lectura.gyro_x is not None:
-                gyro_x_values.append(lectura.gyro_x)
-            if lectura.gyro_y is not None:
-                gyro_y_values.append(lectura.gyro_y)
-            if lectura.gyro_z is not None:
-                gyro_z_values.append(lectura.gyro_z)
-        
-        # Calculate heart rate statistics
-        if heart_rates:
-            hr_array = np.array(heart_rates)
-            ventana.hr_mean = float(np.mean(hr_array))
-            ventana.hr_std = float(np.std(hr_array))
-            logger.info(f"[HR-STATS] Mean: {ventana.hr_mean:.2f}, Std: {ventana.hr_std:.2f}")
-        else:
-            logger.warning(f"[VENTANA-CALC] No heart rate data available")
+        accumulator = None
+        if not rescan:
+            try:
+                accumulator = VentanaStatsAccumulator.snapshot(ventana_id)
+            except Exception as e:
+                logger.warning(f"[VENTANA-CALC] Accumulator unavailable: {e}")
         
-        # Calculate accelerometer energy (movement intensity)
-        if accel_x_values and accel_y_values and accel_z_values:
-            accel_x_array = np.array(accel_x_values)
-            accel_y_array = np.array(accel_y_values)
-            accel_z_array = np.array(accel_z_values)
+        if accumulator and accumulator['n'] == lectura_count:
+            statistics = VentanaStatsAccumulator.statistics(accumulator)
+            source = 'accumulator'
+        else:
+            if not rescan:
+                logger.info(
+                    f"[VENTANA-CALC] Accumulator covers "
+                    f"{accumulator['n'] if accumulator else 0}/{lectura_count} readings, rescanning"
+                )
+            if aggregates is None:
+                aggregates = VentanaAggregationService.aggregate_one(ventana)
+            stored = int(aggregates['n'])
             
-            # Energy = sum of squared values
-            ventana.accel_energy = float(
-                np.sum(accel_x_array**2 + accel_y_array**2 + accel_z_array**2)
-            )
+            if rescan and stored != lectura_count:
+                logger.info(
+                    f"[VENTANA-CALC] Correcting lectura_count {lectura_count} -> {stored}"
+                )
+                LecturaIngestionService.reset_count(ventana_id, stored)
+            lectura_count = stored
             
-            logger.info(f"[ACCEL-ENERGY] {ventana.accel_energy:.4f}")
-        else:
-            logger.warning(f"[VENTANA-CALC] No accelerometer data available")
-        
-        # Calculate gyroscope energy (rotation intensity)
-        if gyro_x_values and gyro_y_values and gyro_z_values:
-            gyro_x_array = np.array(gyro_x_values)
-            gyro_y_array = np.array(gyro_y_values)
-            gyro_z_array = np.array(gyro_z_values)
+            if not lectura_count:
+                logger.warning(f"[VENTANA-CALC] No lecturas found for Ventana {ventana_id}")
+                return {
+                    'success': False,
+                    'error': 'No sensor readings available',
+                    'ventana_id': ventana_id
+                }
             
-            # Energy = sum of squared values
-            ventana.gyro_energy = float(
-                np.sum(gyro_x_array**2 + gyro_y_array**2 + gyro_z_array**2)
-            )
+            statistics = statistics_from_aggregates(aggregates)
+            source = 'rescan'
             
-            logger.info(f"[GYRO-ENERGY] {ventana.gyro_energy:.4f}")
-        else:
-            logger.warning(f"[VENTANA-CALC] No gyroscope data available")
+            try:
+                VentanaStatsAccumulator.reset(ventana_id, aggregates)
+            except Exception as e:
+                logger.warning(f"[VENTANA-CALC] Could not rebuild accumulator: {e}")
+        
+        logger.info(f"[VENTANA-CALC] Processing {lectura_count} readings ({source})")
+        
+        for field, value in statistics.items():
+            if value is None:
+                logger.warning(f"[VENTANA-CALC] No data available for {field}")
+            else:
+                setattr(ventana, field, value)
+        
+        logger.info(
+            f"[VENTANA-CALC] HR={ventana.hr_mean}±{ventana.hr_std}, "
+            f"Accel={ventana.accel_energy}, Gyro={ventana.gyro_energy}"
+        )
         
         # Save the calculated statistics
-        ventana.save()
+        ventana.save(update_fields=['hr_mean', 'hr_std', 'accel_energy', 'gyro_energy', 'updated_at'])
         
         logger.info(
             f"[VENTANA-CALC] ✓ Successfully calculated statistics for Ventana {ventana_id}"
@@ -551,6 +437,7 @@ def _calculate_ventana_statistics_sync(ventana_id):
             'success': True,
             'ventana_id': ventana_id,
             'lecturas_processed': lectura_count,
+            'source': source,
             'statistics': {
                 'hr_mean': ventana.hr_mean,
                 'hr_std': ventana.hr_std,
@@ -592,7 +479,7 @@ def check_and_calculate_ventana_stats(self, ventana_id, min_readings=5):
     """
     try:
         ventana = Ventana.objects.get(id=ventana_id)
-        lectura_count = Lectura.objects.filter(ventana=ventana).count()
+        lectura_count = ventana.lectura_count
         
         logger.info(
             f"[CHECK-CALC] Ventana {ventana_id} has {lectura_count} readings "
@@ -651,6 +538,7 @@ def periodic_ventana_calculation(self):
         # Get all consumers with active sessions (logged in recently)
         # Check cache for active sessions
         from django.core.cache import cache
+        from api.services import PredictionBatcher, VentanaCache
         
         # Get all consumidores with active monitoring sessions
         active_sessions = []
@@ -698,7 +586,7 @@ def periodic_ventana_calculation(self):
                     )
                     
                     # 1. Calculate statistics for the completed window
-                    lectura_count = Lectura.objects.filter(ventana=current_ventana).count()
+                    lectura_count = current_ventana.lectura_count
                     
                     if lectura_count >= 5:  # Minimum readings for valid stats
                         logger.info(
@@ -741,13 +629,24 @@ def periodic_ventana_calculation(self):
                             except Exception as ws_error:
                                 logger.warning(f"Failed to send WebSocket HR update: {ws_error}")
                             
+                            # Features are computed once here and read back by
+                            # the prediction below, batch scoring and training
+                            try:
+                                from api.services import VentanaFeatureStore
+                                VentanaFeatureStore.save(
+                                    [current_ventana], VentanaFeatureStore.served_feature_set()
+                                )
+                            except Exception as fs_error:
+                                logger.warning(f"Failed to store features of ventana {current_ventana.id}: {fs_error}")
+                            
                             # 2. Trigger ML prediction
                             logger.info(
                                 f"[PERIODIC-5MIN] Triggering prediction for "
                                 f"user {usuario.id}, ventana {current_ventana.id}"
                             )
                             
-                            predict_smoking_craving.delay(usuario.id, features_dict=None)
+                            # Scored together with the other consumers rolling over now
+                            PredictionBatcher.submit(consumidor_id, current_ventana.id)
                             predictions_triggered += 1
                     else:
                         logger.warning(
@@ -762,6 +661,10 @@ def periodic_ventana_calculation(self):
                         window_end=now + timedelta(minutes=5)
                     )
                     
+                    # Ingestion resolves ventanas through this cache
+                    VentanaCache.invalidate(current_ventana.id)
+                    VentanaCache.populate(new_ventana)
+                    
                     ventanas_created += 1
                     
                     logger.info(
@@ -879,3 +782,227 @@ def trigger_prediction_if_ready(self, ventana_id):
             'success': False,
             'error': str(exc)
         }
+
+@shared_task(bind=True)
+def drain_lectura_streams(self):
+    """
+    Copy readings buffered in Redis Streams into the lecturas table.
+    Scheduled every few seconds by Celery Beat; a run that starts while
+    the previous one is still draining returns at once.
+    """
+    from api.services import LecturaStreamBuffer
+
+    if not LecturaStreamBuffer.is_enabled():
+        return {'success': True, 'stored': 0, 'message': 'Stream ingestion disabled'}
+
+    try:
+        results = LecturaStreamBuffer.drain()
+        if results is None:
+            return {'success': True, 'stored': 0, 'message': 'Previous drain still running'}
+        stored = sum(result['stored'] for result in results)
+        status = LecturaStreamBuffer.status()
+
+        log = logger.info if stored else logger.debug
+        log(
+            f"[STREAM-DRAIN] Stored {stored} readings - "
+            f"backlog={status['backlog']}, max_age={status['max_age_seconds']}s"
+        )
+
+        return {
+            'success': True,
+            'stored': stored,
+            'shards': results,
+            'backlog': status['backlog'],
+            'max_age_seconds': status['max_age_seconds'],
+        }
+
+    except Exception as exc:
+        logger.error(f"[STREAM-DRAIN] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True)
+def maintain_lectura_partitions(self):
+    """
+    Pre-create the upcoming lecturas partitions, drop the ones past
+    LECTURA_RETENTION_DAYS and prune the rollup tiers. Scheduled daily by
+    Celery Beat.
+    """
+    from api.services import LecturaPartitionManager, SensorRollupService
+
+    try:
+        result = LecturaPartitionManager.maintain()
+        result['rollups_deleted'] = SensorRollupService.apply_retention()
+        if result['created'] or result['expired']:
+            logger.info(
+                f"[PARTITIONS] Created {result['created']}, removed {result['expired']}"
+            )
+        return {'success': True, **result}
+
+    except Exception as exc:
+        logger.error(f"[PARTITIONS] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True)
+def cleanup_empty_ventanas(self, older_than_hours=24):
+    """
+    Delete ventanas closed more than older_than_hours ago that never
+    received a reading and have no analysis. Scheduled daily by Celery Beat.
+    """
+    from django.db.models import Exists, OuterRef
+    from api.services import VentanaCache
+
+    try:
+        cutoff = timezone.now() - timedelta(hours=older_than_hours)
+        ventana_ids = list(
+            Ventana.objects
+            .filter(window_end__lt=cutoff, lectura_count=0)
+            .filter(~Exists(Lectura.objects.filter(ventana_id=OuterRef('pk'))))
+            .filter(analisis__isnull=True)
+            .values_list('id', flat=True)
+        )
+        Ventana.objects.filter(id__in=ventana_ids).delete()
+        # Ingestion would otherwise keep resolving the deleted ids
+        for ventana_id in ventana_ids:
+            VentanaCache.invalidate(ventana_id)
+
+        if ventana_ids:
+            logger.info(f"[CLEANUP] Deleted {len(ventana_ids)} empty ventanas")
+        return {'success': True, 'deleted': len(ventana_ids)}
+
+    except Exception as exc:
+        logger.error(f"[CLEANUP] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True)
+def roll_up_sensor_data(self):
+    """
+    Fold new lecturas into the 1m/5m/1h rollup tiers. Scheduled every
+    minute by Celery Beat; resumes from the watermark after any gap.
+    """
+    from api.services import SensorRollupService
+
+    try:
+        result = SensorRollupService.roll_up()
+        logger.debug(f"[ROLLUP] {result['slices']} slices, watermark={result['watermark']}")
+        return {'success': True, **result}
+
+    except Exception as exc:
+        logger.error(f"[ROLLUP] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True)
+def pack_closed_ventanas(self, limit=200):
+    """
+    Move the readings of long-closed ventanas into compressed columnar
+    blobs. No-op unless LECTURA_BLOB_STORAGE is enabled.
+    """
+    from api.services import VentanaSampleStore
+
+    if not VentanaSampleStore.is_enabled():
+        return {'success': True, 'packed_ventanas': 0, 'message': 'Blob storage disabled'}
+
+    try:
+        result = VentanaSampleStore.pack_closed(limit)
+        if result['packed_ventanas']:
+            logger.info(
+                f"[SAMPLE-STORE] Packed {result['packed_readings']} readings "
+                f"from {result['packed_ventanas']} ventanas"
+            )
+        return {'success': True, **result}
+
+    except Exception as exc:
+        logger.error(f"[SAMPLE-STORE] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True)
+def recompute_ventanas(self, consumidor_id=None, start=None, end=None, restart=False, time_budget=240.0):
+    """
+    Recompute closed ventana statistics in [start, end) (ISO 8601), one
+    time_budget at a time, re-enqueueing itself until the range is done.
+    """
+    from api.services import VentanaRecomputeService
+
+    try:
+        result = VentanaRecomputeService.recompute(
+            consumidor_id=consumidor_id,
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            restart=restart,
+            time_budget=time_budget,
+        )
+        if not result['complete']:
+            recompute_ventanas.delay(consumidor_id, start, end, time_budget=time_budget)
+        return {'success': True, **result}
+
+    except Exception as exc:
+        logger.error(f"[RECOMPUTE] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True, max_retries=3)
+def flush_prediction_batch(self):
+    """
+    Score the prediction requests queued by PredictionBatcher.submit as one
+    feature matrix per batch. A failed batch is back in the queue, so the
+    flush is retried.
+    """
+    from api.services import PredictionBatcher
+
+    try:
+        result = PredictionBatcher.flush()
+        if result['requests']:
+            logger.info(
+                f"[PREDICT-BATCH] {result['requests']} requests in {result['batches']} batches, "
+                f"{result['alerts']} alerts"
+            )
+        return {'success': True, **result}
+
+    except Exception as exc:
+        logger.error(f"[PREDICT-BATCH] Error: {exc}", exc_info=True)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+@shared_task(bind=True)
+def shadow_score_batch(self):
+    """
+    Score the windows queued by ShadowScorer.submit with every challenger
+    model. Routed to the 'shadow' queue (CELERY_TASK_ROUTES).
+    """
+    from api.services import ShadowScorer
+
+    try:
+        result = ShadowScorer.flush()
+        if result['ventanas']:
+            logger.info(
+                f"[SHADOW] {result['ventanas']} ventanas in {result['batches']} batches, "
+                f"{result['predictions']} predictions from {result['challengers']} challengers"
+            )
+        return {'success': True, **result}
+
+    except Exception as exc:
+        logger.error(f"[SHADOW] Error: {exc}", exc_info=True)
+        return {
+            'success': False,
+            'error': str(exc)
+        }
@@ -0,0 +1,203 @@
+"""
+Admission control for the unauthenticated device endpoints.
+
+Each (endpoint scope, device) pair owns a Redis token bucket. The bucket
+is refilled and debited by one Lua script, which also bumps the
+admitted/throttled counters of the scope, so admission costs a single
+round trip and happens in DRF's check_throttles(), before the view
+touches the ORM.
+
+Buckets are configured per scope in settings.DEVICE_THROTTLE_BUCKETS:
+
+    'lecturas': {'capacity': 20, 'refill_rate': 1.0, 'send_interval': 10}
+
+capacity is the burst size, refill_rate the tokens added per second and
+send_interval the upload period (seconds) the firmware should use. It is
+returned on every response as X-Send-Interval and, when throttled, in
+the 429 body next to Retry-After.
+"""
+import logging
+import math
+import time
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from utils.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+if now > ts then
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    ts = now
+end
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+    redis.call('HINCRBY', KEYS[2], 'admitted', 1)
+else
+    wait = (1 - tokens) / rate
+    redis.call('HINCRBY', KEYS[2], 'throttled', 1)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(ts))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {allowed, tostring(wait)}
+"""
+
+
+class DeviceThrottled(Throttled):
+
+    def __init__(self, wait, send_interval):
+        super().__init__(wait)
+        self.detail = {
+            'detail': str(self.detail),
+            'retry_after': self.wait,
+            'send_interval': send_interval,
+        }
+
+
+class DeviceTokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per device. The view maps its actions to bucket scopes
+    with a device_throttle_scopes dict; unmapped actions are not limited.
+    """
+
+    _script = None
+    _ascript = None
+
+    def __init__(self):
+        self._wait = None
+
+    @staticmethod
+    def counters_key(scope):
+        return f'throttle:counters:{scope}'
+
+    def get_ident(self, request):
+        device_id = request.headers.get('X-Device-Id')
+        if not device_id and hasattr(request.data, 'get'):
+            device_id = request.data.get('device_id')
+        if device_id:
+            return f'device:{device_id}'
+
+        if hasattr(request.data, 'get'):
+            ventana_id = request.data.get('ventana') or request.data.get('ventana_id')
+            if ventana_id:
+                return f'ventana:{ventana_id}'
+
+        return f'ip:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'device_throttle_scopes', {}).get(getattr(view, 'action', None))
+        config = settings.DEVICE_THROTTLE_BUCKETS.get(scope) if scope else None
+        if not config or not settings.DEVICE_THROTTLE_ENABLED:
+            return True
+
+        request.send_interval = config['send_interval']
+
+        try:
+            if DeviceTokenBucketThrottle._script is None:
+                DeviceTokenBucketThrottle._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+
+            allowed, wait = DeviceTokenBucketThrottle._script(
+                keys=[
+                    f'throttle:bucket:{scope}:{self.get_ident(request)}',
+                    self.counters_key(scope),
+                ],
+                args=[config['capacity'], config['refill_rate'], time.time()]
+            )
+        except Exception as e:
+            # Never lock devices out because Redis is unavailable
+            logger.warning(f"Token bucket unavailable for {scope}, admitting request: {e}")
+            return True
+
+        if allowed:
+            return True
+
+        self._wait = float(wait)
+        request.send_interval = max(config['send_interval'], math.ceil(self._wait))
+        return False
+
+    def wait(self):
+        return self._wait
+
+    @staticmethod
+    async def aconsume(scope, ident):
+        """
+        Token bucket check for async views, which bypass DRF throttling.
+        Returns (allowed, wait seconds, send interval).
+        """
+        config = settings.DEVICE_THROTTLE_BUCKETS.get(scope)
+        if not config or not settings.DEVICE_THROTTLE_ENABLED:
+            return True, None, None
+
+        try:
+            if DeviceTokenBucketThrottle._ascript is None:
+                DeviceTokenBucketThrottle._ascript = get_async_redis().register_script(TOKEN_BUCKET_SCRIPT)
+
+            allowed, wait = await DeviceTokenBucketThrottle._ascript(
+                keys=[
+                    f'throttle:bucket:{scope}:{ident}',
+                    DeviceTokenBucketThrottle.counters_key(scope),
+                ],
+                args=[config['capacity'], config['refill_rate'], time.time()]
+            )
+        except Exception as e:
+            logger.warning(f"Token bucket unavailable for {scope}, admitting request: {e}")
+            return True, None, config['send_interval']
+
+        if allowed:
+            return True, None, config['send_interval']
+        wait = float(wait)
+        return False, wait, max(config['send_interval'], math.ceil(wait))
+
+    @staticmethod
+    def counters():
+        client = get_redis()
+        stats = {}
+        for scope in settings.DEVICE_THROTTLE_BUCKETS:
+            raw = client.hgetall(DeviceTokenBucketThrottle.counters_key(scope))
+            admitted = int(raw.get('admitted', 0))
+            throttled = int(raw.get('throttled', 0))
+            total = admitted + throttled
+            stats[scope] = {
+                'admitted': admitted,
+                'throttled': throttled,
+                'throttled_rate': round(throttled / total, 4) if total else 0.0,
+            }
+        return stats
+
+
+class DeviceThrottleMixin:
+    """
+    Adds the device throttle to a ViewSet, answers throttled requests with
+    the send interval the device should switch to, and advertises that
+    interval on every response of a throttled scope.
+    """
+
+    device_throttle_scopes = {}
+
+    def get_throttles(self):
+        return super().get_throttles() + [DeviceTokenBucketThrottle()]
+
+    def throttled(self, request, wait):
+        raise DeviceThrottled(wait, getattr(request, 'send_interval', None))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        send_interval = getattr(request, 'send_interval', None)
+        if send_interval is not None:
+            response['X-Send-Interval'] = str(send_interval)
+        return response
@@ -1,7 +1,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from api import views
+from api import views, async_views
 
 router = DefaultRouter()
 
@@ -44,6 +44,8 @@ router.register(r'dashboard/heart-rate-today', views.VwHeartRateTodayViewSet, ba
 router.register(r'dashboard/sensor-data', views.SensorDataViewSet, basename='dashboard-sensor-data')
 
 urlpatterns = [
+    # Async ingestion for ESP32 devices (served on Daphne's event loop)
+    path('ingest/lecturas/', async_views.ingest_lectura, name='ingest-lectura'),
     path('', include(router.urls)),
     path('health/', views.health_check, name='health-check'),
     path('predict/', views.predict_craving),
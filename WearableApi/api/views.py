@@ -3,17 +3,28 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from django.contrib.auth.hashers import check_password
+import numpy as np
 
 from api.models import *
 from api.serializers import *
-from api.services import AuthenticationService, UserFactory
+from api.parsers import LecturaBinaryParser
+from api.throttling import DeviceThrottleMixin, DeviceTokenBucketThrottle
+from api.services import (
+    AuthenticationService, UserFactory, LecturaIngestionService, LecturaStreamBuffer,
+    VentanaCache, VentanaStatsAccumulator, SensorRollupService, LecturaExportService
+)
 from utils.mixins import LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin
 from utils.decorators import log_endpoint
 from django.utils import timezone
 from django.core.cache import cache
+from django.db.models import Sum
+from django.conf import settings
 from .tasks import predict_smoking_craving
 from celery.result import AsyncResult
+import logging
 
 # Import the new Celery tasks
 from api.tasks import (
@@ -24,6 +35,8 @@ from api.tasks import (
     stop_synthetic_generation
 )
 
+logger = logging.getLogger(__name__)
+
 class UsuarioViewSet(LoggingMixin, viewsets.ModelViewSet):
     
     queryset = Usuario.objects.all()
@@ -109,6 +122,7 @@ class UsuarioViewSet(LoggingMixin, viewsets.ModelViewSet):
                 window_start=now,
                 window_end=now + timezone.timedelta(minutes=5)  # 5-minute window
             )
+            VentanaCache.populate(ventana)
             
             # Generate session ID
             import secrets
@@ -235,7 +249,8 @@ class UsuarioViewSet(LoggingMixin, viewsets.ModelViewSet):
                         try:
                             ventana = Ventana.objects.get(id=ventana_id)
                             ventana.window_end = timezone.now()
-                            ventana.save()
+                            ventana.save(update_fields=['window_end', 'updated_at'])
+                            VentanaCache.invalidate(ventana_id)
                             response_data['session_stopped'] = True
                             self.logger.info(f"🔴 LOGOUT: Ventana {ventana_id} closed at {ventana.window_end}")
                         except Ventana.DoesNotExist:
@@ -413,7 +428,7 @@ class UsuarioViewSet(LoggingMixin, viewsets.ModelViewSet):
 
 
 
-class DeviceSessionViewSet(LoggingMixin, viewsets.GenericViewSet):
+class DeviceSessionViewSet(LoggingMixin, DeviceThrottleMixin, viewsets.GenericViewSet):
     """
     ViewSet for ESP32 device session management
     Sessions are automatically created on consumer login
@@ -422,10 +437,17 @@ class DeviceSessionViewSet(LoggingMixin, viewsets.GenericViewSet):
     - POST /device-session/check-session/ - Check for active session (ESP32, no auth)
     - GET /device-session/active/ - Get active session info (website, requires auth)
     - POST /device-session/extend-window/ - Extend ventana window (ESP32, no auth)
+    - GET /device-session/admission-stats/ - Admitted vs throttled device requests
+    
+    ESP32 endpoints are rate limited per device (see api/throttling.py).
     """
     # Required for GenericViewSet even though we don't use it for these actions
     queryset = Ventana.objects.none()
     serializer_class = VentanaSerializer
+    device_throttle_scopes = {
+        'check_session': 'check_session',
+        'extend_window': 'extend_window',
+    }
     
     def get_permissions(self):
         """
@@ -572,7 +594,8 @@ class DeviceSessionViewSet(LoggingMixin, viewsets.GenericViewSet):
             
             # Extend window by 1 hour
             ventana.window_end = timezone.now() + timezone.timedelta(hours=1)
-            ventana.save()
+            ventana.save(update_fields=['window_end', 'updated_at'])
+            VentanaCache.invalidate(ventana.id)
             
             self.logger.info(f"Ventana {ventana_id} window extended")
             
@@ -588,6 +611,26 @@ class DeviceSessionViewSet(LoggingMixin, viewsets.GenericViewSet):
                 'error': 'Failed to extend window',
                 'detail': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='admission-stats')
+    def admission_stats(self, request):
+        """
+        Admitted vs throttled requests per device endpoint
+        
+        GET /api/device-session/admission-stats/
+        """
+        try:
+            return Response({
+                'enabled': settings.DEVICE_THROTTLE_ENABLED,
+                'buckets': settings.DEVICE_THROTTLE_BUCKETS,
+                'counters': DeviceTokenBucketThrottle.counters(),
+            })
+        except Exception as e:
+            self.logger.error(f"Error reading admission counters: {str(e)}")
+            return Response({
+                'error': 'Failed to read admission counters',
+                'detail': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 class AdministradorViewSet(LoggingMixin, viewsets.ModelViewSet):
     
@@ -693,6 +736,16 @@ class VentanaViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
     queryset = Ventana.objects.select_related('consumidor__usuario').all()
     serializer_class = VentanaSerializer
 
+    # Ingestion resolves ventanas through VentanaCache
+    def perform_update(self, serializer):
+        ventana = serializer.save()
+        VentanaCache.invalidate(ventana.id)
+
+    def perform_destroy(self, instance):
+        ventana_id = instance.id
+        instance.delete()
+        VentanaCache.invalidate(ventana_id)
+
 
 class AnalisisViewSet(LoggingMixin, viewsets.ModelViewSet):
     
@@ -880,15 +933,46 @@ class VwWeeklyComparisonViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def predict_craving(request):
+    """
+    mode=sync (body or query string) scores in this request within
+    PREDICTION_SYNC_BUDGET_MS and returns the result inline, like a
+    completed task-status. When that is not possible it falls back to the
+    Celery task, whose response carries fallback_reason.
+    """
     manual_features = request.data.get('manual_features', None)
+    mode = request.data.get('mode') or request.query_params.get('mode') or settings.PREDICTION_DEFAULT_MODE
+    fallback_reason = None
+    
+    if mode == 'sync':
+        from api.services.prediction_service import InlinePredictor
+        try:
+            consumidor = Consumidor.objects.get(usuario_id=request.user.id)
+            result, fallback_reason = InlinePredictor.predict(consumidor, manual_features)
+        except Consumidor.DoesNotExist:
+            # The task reports this with the usual error payload
+            result, fallback_reason = None, 'no_consumidor'
+        except Exception as e:
+            # record_prediction is atomic: nothing was stored, so the task won't duplicate it
+            logger.error(f"[PREDICT-SYNC] Inline prediction failed, falling back to Celery: {e}")
+            result, fallback_reason = None, 'error'
+        
+        if result is not None:
+            return Response({
+                'status': 'completed',
+                'mode': 'sync',
+                'result': {**result, 'user_id': request.user.id}
+            })
     
     task = predict_smoking_craving.delay(request.user.id, manual_features)
     
-    return Response({
+    response = {
         'task_id': task.id,
         'status': 'processing',
         'message': 'Prediction task started. Will calculate from sensor readings.' if manual_features is None else 'Using provided manual features.'
-    }, status=202)
+    }
+    if fallback_reason:
+        response.update({'mode': 'async', 'fallback_reason': fallback_reason})
+    return Response(response, status=202)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -915,7 +999,7 @@ def health_check(request):
     })
 
 
-class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
+class LecturaViewSet(LoggingMixin, DeviceThrottleMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing sensor readings (Lecturas) from ESP32
     
@@ -928,10 +1012,16 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
     - GET /api/lecturas/:id/ - Get specific reading
     - POST /api/lecturas/ - Create new reading (ESP32, no auth required)
     - GET /api/lecturas/recent/ - Get recent readings for a consumer
+    
+    ESP32 uploads are rate limited per device (see api/throttling.py).
     """
     
     queryset = Lectura.objects.select_related('ventana', 'ventana__consumidor').all()
     serializer_class = LecturaSerializer
+    device_throttle_scopes = {
+        'create': 'lecturas',
+        'batch': 'lecturas_batch',
+    }
     
     def get_queryset(self):
         """
@@ -970,7 +1060,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
         Allow unauthenticated POST requests for ESP32 sensor data
         All other actions require authentication
         """
-        if self.action == 'create':
+        if self.action in ['create', 'batch']:
             return [AllowAny()]
         return [IsAuthenticated()]
     
@@ -993,8 +1083,13 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             "accel_z": 0.98,
             "gyro_x": 1.5,
             "gyro_y": -0.3,
-            "gyro_z": 0.8
+            "gyro_z": 0.8,
+            "device_id": "ESP32_ABC123",  # optional, or X-Device-Id header
+            "seq": 42                     # optional, retries reuse it
         }
+        
+        A reading whose (device_id, seq) was already accepted for the
+        ventana is answered with 200 and "duplicates": 1 and not stored.
         """
         try:
             # Support both 'ventana' and 'ventana_id' in request
@@ -1005,21 +1100,57 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                     'error': 'ventana_id is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Validate ventana exists
-            try:
-                ventana = Ventana.objects.get(id=ventana_id)
-            except Ventana.DoesNotExist:
-                return Response({
-                    'error': f'Ventana with id {ventana_id} does not exist'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
             # Create the lectura
             data = request.data.copy()
             data['ventana'] = ventana_id  # Ensure 'ventana' key is used
+            device_id = self._device_id(request)
+            if device_id:
+                data['device_id'] = device_id
             
-            serializer = self.get_serializer(data=data)
+            serializer = LecturaIngestSerializer(data=data)
             serializer.is_valid(raise_exception=True)
-            lectura = self.perform_create(serializer)
+            
+            # Validate ventana exists (cached, no ventanas lookup in steady state)
+            ventana = VentanaCache.get(serializer.validated_data['ventana'])
+            if ventana is None:
+                return Response({
+                    'error': f'Ventana with id {ventana_id} does not exist'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            samples, duplicates = LecturaIngestionService.claim_sequences(
+                device_id, ventana.id, [serializer.validated_data]
+            )
+            if duplicates:
+                return Response({
+                    'status': 'duplicate',
+                    'ventana_id': ventana.id,
+                    'accepted': 0,
+                    'duplicates': duplicates,
+                    'message': 'Sensor data already received'
+                }, status=status.HTTP_200_OK)
+            
+            try:
+                if LecturaStreamBuffer.is_enabled():
+                    # Write-behind: drain_lectura_streams stores it and runs the checks below
+                    LecturaStreamBuffer.append(ventana, samples, device_id)
+                    return Response({
+                        'status': 'accepted',
+                        'ventana_id': ventana.id,
+                        'queued': 1,
+                        'accepted': 1,
+                        'duplicates': 0,
+                        'message': 'Sensor data queued for storage'
+                    }, status=status.HTTP_202_ACCEPTED)
+                
+                lecturas, lectura_count = LecturaIngestionService.store_batch(
+                    ventana, samples, device_id
+                )
+                lectura = lecturas[0]
+            except Exception:
+                LecturaIngestionService.release_sequences(device_id, ventana.id, samples)
+                raise
+            
+            VentanaStatsAccumulator.add(ventana.id, [lectura])
             
             self.logger.info(
                 f"✓ Lectura created: ID={lectura.id}, Ventana={ventana_id}, "
@@ -1029,74 +1160,28 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             )
             
             # Check if ventana needs calculation (Railway doesn't run Celery Beat)
-            from api.tasks import calculate_ventana_statistics
-            lectura_count = Lectura.objects.filter(ventana=ventana).count()
-            
             # 🔍 DEBUG: Log every count to see what's happening
             self.logger.info(f"📊 Ventana {ventana_id} now has {lectura_count} lecturas")
             
             # Calculate every 5 readings (approximate 5-min window)
-            if lectura_count >= 5 and lectura_count % 5 == 0:
-                self.logger.info(f"🔄 Triggering ventana calculation for ventana {ventana_id} ({lectura_count} readings)")
-                try:
-                    # Import the synchronous calculation function
-                    from api.tasks import _calculate_ventana_statistics_sync
-                    
-                    # Call directly (NO Celery, works on Railway)
-                    result = _calculate_ventana_statistics_sync(ventana_id)
-                    
-                    if result.get('success'):
-                        stats = result.get('statistics', {})
-                        self.logger.info(
-                            f"✅ Window stats calculated: "
-                            f"HR={stats.get('hr_mean', 'N/A'):.1f}±{stats.get('hr_std', 'N/A'):.1f}, "
-                            f"Accel={stats.get('accel_energy', 'N/A'):.2f}, "
-                            f"Gyro={stats.get('gyro_energy', 'N/A'):.2f}"
-                        )
-                    else:
-                        self.logger.error(f"❌ Calculation returned error: {result.get('error')}")
-                except Exception as calc_error:
-                    self.logger.error(f"❌ Calculation failed: {calc_error}", exc_info=True)
-            else:
-                self.logger.info(f"⏸️ Skipping calculation: count={lectura_count}, need multiple of 5 (>= 5)")
+            LecturaIngestionService.maybe_calculate_statistics(
+                ventana.id, lectura_count - 1, lectura_count
+            )
             
             # Send WebSocket update for real-time sensor data
-            try:
-                from channels.layers import get_channel_layer
-                from asgiref.sync import async_to_sync
-                
-                channel_layer = get_channel_layer()
-                consumidor_id = ventana.consumidor_id
-                
-                async_to_sync(channel_layer.group_send)(
-                    f'sensor_data_{consumidor_id}',
-                    {
-                        'type': 'sensor_update',
-                        'lectura': {
-                            'id': lectura.id,
-                            'heart_rate': float(lectura.heart_rate) if lectura.heart_rate else None,
-                            'accel_x': float(lectura.accel_x) if lectura.accel_x else None,
-                            'accel_y': float(lectura.accel_y) if lectura.accel_y else None,
-                            'accel_z': float(lectura.accel_z) if lectura.accel_z else None,
-                            'gyro_x': float(lectura.gyro_x) if lectura.gyro_x else None,
-                            'gyro_y': float(lectura.gyro_y) if lectura.gyro_y else None,
-                            'gyro_z': float(lectura.gyro_z) if lectura.gyro_z else None,
-                            'created_at': lectura.created_at.isoformat(),
-                        }
-                    }
-                )
-                self.logger.debug(f"📡 WebSocket sensor update sent to consumidor {consumidor_id}")
-            except Exception as ws_error:
-                self.logger.warning(f"Failed to send WebSocket update: {ws_error}")
+            LecturaIngestionService.broadcast(ventana.consumidor_id, [lectura])
             
-            headers = self.get_success_headers(serializer.data)
+            lectura_data = LecturaSerializer(lectura).data
+            headers = self.get_success_headers(lectura_data)
             return Response(
                 {
                     'status': 'success',
                     'id': lectura.id,
                     'ventana_id': ventana_id,
+                    'accepted': 1,
+                    'duplicates': 0,
                     'message': 'Sensor data saved successfully',
-                    'data': serializer.data
+                    'data': lectura_data
                 },
                 status=status.HTTP_201_CREATED,
                 headers=headers
@@ -1109,9 +1194,156 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                 'detail': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
     
-    def perform_create(self, serializer):
-        """Save the lectura and return the instance"""
-        return serializer.save()
+    def _device_id(self, request):
+        """Sender of the readings: X-Device-Id header, or device_id in a JSON body"""
+        device_id = request.headers.get('X-Device-Id')
+        if not device_id and hasattr(request.data, 'get'):
+            device_id = request.data.get('device_id')
+        if device_id and len(str(device_id)) > 64:
+            raise ValidationError({'device_id': 'Ensure this field has no more than 64 characters.'})
+        return str(device_id) if device_id else None
+    
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[AllowAny],
+        parser_classes=[JSONParser, LecturaBinaryParser]
+    )
+    def batch(self, request):
+        """
+        Create many lecturas for one ventana in a single request (ESP32)
+        
+        Validates all samples together, writes them with one bulk insert,
+        checks the ventana statistics once and sends one WebSocket frame.
+        
+        POST /api/lecturas/batch/
+        Content-Type: application/json
+        Body: {
+            "ventana": 1,  # or "ventana_id": 1
+            "device_id": "ESP32_ABC123",  # optional, or X-Device-Id header
+            "lecturas": [
+                {"seq": 42, "heart_rate": 75.5, "accel_x": 0.12, ..., "gyro_z": 0.8},
+                ...
+            ]
+        }
+        
+        Content-Type: application/vnd.wearable.lecturas
+        X-Device-Id: ESP32_ABC123
+        Body: packed header + float32 records (see api/parsers.py)
+        
+        Samples whose (device_id, seq) was already accepted for the ventana
+        are skipped; the response reports "accepted" and "duplicates".
+        """
+        try:
+            device_id = self._device_id(request)
+            data = {
+                'ventana': request.data.get('ventana') or request.data.get('ventana_id'),
+                'device_id': device_id,
+                'lecturas': request.data.get('lecturas'),
+            }
+            
+            if isinstance(data['lecturas'], np.ndarray):
+                # Binary payload: already typed and bounds-checked by LecturaBinaryParser
+                ventana_id = data['ventana']
+                samples = LecturaIngestionService.samples_from_records(data['lecturas'])
+            else:
+                serializer = LecturaBatchSerializer(data=data)
+                serializer.is_valid(raise_exception=True)
+                
+                ventana_id = serializer.validated_data['ventana']
+                samples = serializer.validated_data['lecturas']
+            
+            ventana = VentanaCache.get(ventana_id)
+            if ventana is None:
+                return Response({
+                    'error': f"Ventana with id {data['ventana']} does not exist"
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            samples, duplicates = LecturaIngestionService.claim_sequences(
+                device_id, ventana.id, samples
+            )
+            if not samples:
+                return Response({
+                    'status': 'duplicate',
+                    'ventana_id': ventana.id,
+                    'count': 0,
+                    'accepted': 0,
+                    'duplicates': duplicates,
+                    'message': 'Sensor data batch already received'
+                }, status=status.HTTP_200_OK)
+            
+            try:
+                if LecturaStreamBuffer.is_enabled():
+                    queued = LecturaStreamBuffer.append(ventana, samples, device_id)
+                    self.logger.info(
+                        f"✓ Lectura batch queued: {queued} readings, Ventana={ventana.id} "
+                        f"({duplicates} duplicates)"
+                    )
+                    return Response({
+                        'status': 'accepted',
+                        'ventana_id': ventana.id,
+                        'queued': queued,
+                        'accepted': queued,
+                        'duplicates': duplicates,
+                        'message': 'Sensor data batch queued for storage'
+                    }, status=status.HTTP_202_ACCEPTED)
+                
+                lecturas, lectura_count = LecturaIngestionService.store_batch(ventana, samples, device_id)
+            except Exception:
+                LecturaIngestionService.release_sequences(device_id, ventana.id, samples)
+                raise
+            
+            VentanaStatsAccumulator.add(ventana.id, lecturas)
+            
+            self.logger.info(
+                f"✓ Lectura batch created: {len(lecturas)} readings, Ventana={ventana.id} "
+                f"({duplicates} duplicates, now {lectura_count} lecturas)"
+            )
+            
+            LecturaIngestionService.maybe_calculate_statistics(
+                ventana.id, lectura_count - len(lecturas), lectura_count
+            )
+            LecturaIngestionService.broadcast(ventana.consumidor_id, lecturas)
+            
+            return Response({
+                'status': 'success',
+                'ventana_id': ventana.id,
+                'count': len(lecturas),
+                'accepted': len(lecturas),
+                'duplicates': duplicates,
+                'ids': [lectura.id for lectura in lecturas],
+                'message': 'Sensor data batch saved successfully'
+            }, status=status.HTTP_201_CREATED)
+            
+        except ValidationError as e:
+            return Response({
+                'error': 'Invalid lectura batch',
+                'detail': e.detail
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            self.logger.error(f"Error creating lectura batch: {str(e)}")
+            return Response({
+                'error': 'Failed to create lectura batch',
+                'detail': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='stream-status')
+    def stream_status(self, request):
+        """
+        Backlog of readings waiting in Redis Streams (write-behind mode)
+        
+        GET /api/lecturas/stream-status/
+        Returns per-shard length, pending entries, consumer group lag and
+        the age of the oldest queued reading.
+        """
+        try:
+            return Response(LecturaStreamBuffer.status())
+        except Exception as e:
+            self.logger.error(f"Error reading stream status: {str(e)}")
+            return Response({
+                'error': 'Failed to read stream status',
+                'detail': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def recent(self, request):
@@ -1146,8 +1378,8 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             time_threshold = timezone.now() - timedelta(hours=int(hours))
             queryset = queryset.filter(created_at__gte=time_threshold)
         
-        # Apply limit and get results
-        lecturas = queryset[:limit]
+        # Apply limit and get results (newest() only scans recent partitions)
+        lecturas = queryset[:limit] if hours else queryset.newest(limit)
         serializer = self.get_serializer(lecturas, many=True)
         
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1176,9 +1408,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check if there are readings
-        lectura_count = Lectura.objects.filter(ventana_id=ventana_id).count()
-        
-        if lectura_count == 0:
+        if ventana.lectura_count == 0:
             return Response({
                 'error': 'No readings available for this ventana'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -1194,7 +1424,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
         return Response({
             'status': 'calculation_triggered',
             'ventana_id': ventana_id,
-            'lectura_count': lectura_count,
+            'lectura_count': ventana.lectura_count,
             'task_id': task.id,
             'message': 'Ventana calculation task started'
         }, status=status.HTTP_202_ACCEPTED)
@@ -1209,10 +1439,11 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
         consumidor_id = request.query_params.get('consumidor_id')
         
         if consumidor_id:
-            # Stats for specific consumer
-            total_lecturas = Lectura.objects.filter(
-                ventana__consumidor_id=consumidor_id
-            ).count()
+            # Stats for specific consumer. lectura_count also covers readings
+            # packed into sample blobs (LECTURA_BLOB_STORAGE)
+            total_lecturas = Ventana.objects.filter(
+                consumidor_id=consumidor_id
+            ).aggregate(total=Sum('lectura_count'))['total'] or 0
             
             ventanas_with_stats = Ventana.objects.filter(
                 consumidor_id=consumidor_id,
@@ -1232,7 +1463,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             })
         else:
             # Global stats
-            total_lecturas = Lectura.objects.count()
+            total_lecturas = Ventana.objects.aggregate(total=Sum('lectura_count'))['total'] or 0
             total_ventanas = Ventana.objects.count()
             ventanas_calculated = Ventana.objects.filter(hr_mean__isnull=False).count()
             ventanas_pending = Ventana.objects.filter(hr_mean__isnull=True).count()
@@ -1245,12 +1476,69 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                 'calculation_rate': f"{(ventanas_calculated/total_ventanas*100):.1f}%" if total_ventanas > 0 else "0%"
             })
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """
+        Stream readings as CSV or NDJSON in constant memory (COPY ... TO STDOUT)
+
+        GET /api/lecturas/export/?consumidor_id=1&start=2025-01-01T00:00:00Z&end=2025-02-01T00:00:00Z&output=ndjson
+        Optional: consumidor_id, start/end (ISO 8601), output (csv, default, or
+        ndjson), gzip (1/0; default: gzip when the client accepts it).
+        """
+        from django.core.handlers.asgi import ASGIRequest
+        from django.http import StreamingHttpResponse
+        from django.utils.dateparse import parse_datetime
+        from api.services.export_service import FORMATS
+
+        output = request.query_params.get('output', 'csv')
+        if output not in FORMATS:
+            return Response({
+                'error': f"output must be one of: {', '.join(FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            consumidor_id = request.query_params.get('consumidor_id')
+            consumidor_id = int(consumidor_id) if consumidor_id else None
+            bounds = {}
+            for name in ('start', 'end'):
+                value = request.query_params.get(name)
+                if not value:
+                    bounds[name] = None
+                    continue
+                moment = parse_datetime(value)
+                if moment is None:
+                    raise ValueError(f'{name} is not an ISO 8601 datetime')
+                bounds[name] = timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+        except (TypeError, ValueError) as e:
+            return Response({
+                'error': f'Invalid export filters: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        compress = request.query_params.get('gzip', '1' if accepts_gzip else '0') == '1'
+
+        chunks = LecturaExportService.stream(output, consumidor_id, bounds['start'], bounds['end'], compress)
+        if isinstance(request._request, ASGIRequest):
+            chunks = LecturaExportService.as_async(chunks)
+
+        response = StreamingHttpResponse(chunks, content_type=FORMATS[output])
+        filename = f"lecturas_{consumidor_id or 'all'}_{timezone.now():%Y%m%d%H%M%S}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Vary'] = 'Accept-Encoding'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+
+        self.logger.info(f"📦 Export of lecturas started ({output}, consumidor_id={consumidor_id})")
+        return response
+
 class SensorDataViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     """
     ViewSet for retrieving latest sensor readings for dashboard display.
     
     Provides a list endpoint that returns the most recent sensor readings (last 50)
     for visualization purposes. Requires consumidor_id as query parameter.
+    With LECTURA_BLOB_STORAGE, readings of packed windows are no longer rows;
+    use the rollup action or the export for older data.
     """
     queryset = Lectura.objects.all()
     serializer_class = LecturaSerializer
@@ -1266,7 +1554,7 @@ class SensorDataViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewse
         if consumidor_id:
             queryset = queryset.filter(
                 ventana__consumidor_id=consumidor_id
-            ).select_related('ventana').order_by('-created_at')[:50]
+            ).select_related('ventana').newest(50)
         
         return queryset
     
@@ -1310,3 +1598,56 @@ class SensorDataViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewse
                 {'error': f'Failed to fetch sensor data: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        """
+        Downsampled sensor series for charts, read from the coarsest rollup
+        tier that still satisfies the requested resolution.
+        
+        GET /api/dashboard/sensor-data/rollup/?consumidor_id=1&hours=24&resolution=300
+        Optional: start/end (ISO 8601) instead of hours. Without resolution,
+        about 300 points are returned.
+        """
+        from django.utils.dateparse import parse_datetime
+        
+        consumidor_id = request.query_params.get('consumidor_id')
+        if not consumidor_id:
+            return Response(
+                {'error': 'consumidor_id parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            end = parse_datetime(request.query_params['end']) if 'end' in request.query_params else timezone.now()
+            if 'start' in request.query_params:
+                start = parse_datetime(request.query_params['start'])
+            else:
+                start = end - timezone.timedelta(hours=float(request.query_params.get('hours', 24)))
+            if start is None or end is None or start >= end:
+                raise ValueError('start must be before end')
+            
+            resolution = request.query_params.get('resolution')
+            resolution = int(resolution) if resolution else max(int((end - start).total_seconds() / 300), 1)
+        except (TypeError, ValueError) as e:
+            return Response(
+                {'error': f'Invalid time range or resolution: {str(e)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            series = SensorRollupService.series(int(consumidor_id), start, end, resolution)
+            return Response({
+                'consumidor_id': int(consumidor_id),
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'resolution': resolution,
+                **series
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            self.logger.error(f"Error fetching sensor rollups: {str(e)}")
+            return Response(
+                {'error': f'Failed to fetch sensor rollups: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,66 @@
+"""
+Benchmark of the vectorized feature engine (api/ml/features.py) against
+the per-window pandas loop train_model.engineer_features used before,
+and per-window cost of every feature set (batch and single window).
+
+No database needed:  python testers/bench_features.py [windows] [readings_per_window]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.ml.features import (
+    FEATURE_SETS, SENSOR_FIELDS, compute_feature_set, compute_features, compute_statistics,
+    group_offsets, window_features
+)
+from test_feature_parity import legacy_training_features
+
+def timed(label, function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<42} {best * 1000:10.1f} ms")
+    return best, result
+
+def main():
+    windows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_window = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    rng = np.random.default_rng(0)
+    n = windows * per_window
+    ids = np.repeat(np.arange(windows), per_window)
+    samples = {field: rng.normal(0, 10, n) for field in SENSOR_FIELDS}
+    df = pd.DataFrame({'ventana_id': ids, **samples})
+    samples['created_at'] = np.tile(np.arange(per_window, dtype=np.float64), windows)
+    offsets = group_offsets(ids)[1]
+
+    print(f"\n⏱️  {windows} windows x {per_window} readings ({n:,} rows)\n")
+
+    legacy, _ = timed('legacy engineer_features (pandas loop)', lambda: legacy_training_features(df), repeat=1)
+    engine, _ = timed('compute_features (segment reductions)', lambda: compute_features(samples, group_offsets(ids)[1]))
+    timed('compute_statistics', lambda: compute_statistics(samples, group_offsets(ids)[1]))
+    timed('compute_features from DataFrame', lambda: compute_features(
+        {field: df[field].to_numpy() for field in SENSOR_FIELDS},
+        group_offsets(df['ventana_id'].to_numpy())[1]
+    ))
+
+    print(f"\n🚀 Speed-up vs legacy loop: {legacy / engine:.0f}x")
+
+    print("\n📏 Per-window cost by feature set\n")
+    single = {field: values[:per_window] for field, values in samples.items()}
+    for version, names in FEATURE_SETS.items():
+        batch, _ = timed(f'v{version} batch ({len(names)} features)',
+                         lambda: compute_feature_set(samples, offsets, version))
+        one, _ = timed(f'v{version} window_features (1 window)',
+                       lambda: window_features(single, version), repeat=20)
+        print(f"     → {batch / windows * 1e6:.1f} µs/window in batch, {one * 1e6:.0f} µs for a single window\n")
+
+if __name__ == '__main__':
+    main()
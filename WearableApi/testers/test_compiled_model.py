@@ -0,0 +1,82 @@
+"""
+Parity of the compiled NumPy model (api/ml/compiled.py) against sklearn's
+predict_proba for both estimators train_model.py can produce, plus the
+per-row latency of each.
+
+No database needed:  python testers/test_compiled_model.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.ml.compiled import CompiledModel, compile_model, save_compiled
+from api.ml.features import FEATURE_NAMES
+
+def training_data(rows=600, seed=3):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(0, 1, (rows, len(FEATURE_NAMES))) * rng.uniform(1, 50, len(FEATURE_NAMES)),
+                     columns=list(FEATURE_NAMES))
+    y = ((X['hr_mean'] / 50 + X['accel_energy'] / 30 + rng.normal(0, 0.5, rows)) > 0).astype(int)
+    return X, y
+
+def per_row_us(function, X, repeat=200):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(X)
+        best = min(best, time.perf_counter() - start)
+    return best / len(X) * 1e6
+
+def main():
+    X, y = training_data()
+    scaler = StandardScaler().fit(X)
+    estimators = {
+        # Same hyperparameters as train_model.py
+        'LogisticRegression': LogisticRegression(max_iter=1000, random_state=42, class_weight='balanced'),
+        'RandomForestClassifier': RandomForestClassifier(
+            n_estimators=100, max_depth=5, min_samples_split=10, min_samples_leaf=5,
+            random_state=42, class_weight='balanced', max_features='sqrt'
+        ),
+    }
+
+    ok = True
+    for name, model in estimators.items():
+        model.fit(scaler.transform(X), y)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.npz')
+            save_compiled(path, compile_model(model, scaler, list(X.columns), model_name=name))
+            size = os.path.getsize(path)
+            compiled = CompiledModel.load(path)
+
+        probe = X.sample(frac=1.0, random_state=0)
+        expected = model.predict_proba(scaler.transform(probe))[:, 1]
+        actual = compiled.positive_proba(probe.to_numpy())
+        error = float(np.max(np.abs(expected - actual)))
+        labels_match = (model.predict(scaler.transform(probe)) == compiled.predict(probe.to_numpy())).all()
+        passed = error < 1e-12 and labels_match
+        ok &= passed
+
+        one = probe.iloc[:1]
+        sklearn_us = per_row_us(lambda rows: model.predict_proba(scaler.transform(rows)), one, repeat=50)
+        compiled_us = per_row_us(lambda rows: compiled.positive_proba(rows), one.to_numpy())
+        batch_us = per_row_us(lambda rows: compiled.positive_proba(rows), probe.to_numpy(), repeat=20)
+
+        print(f"{'✅' if passed else '❌'} {name}: max |Δp| = {error:.1e}, labels match = {labels_match}, "
+              f"artifact {size / 1024:.0f} KiB")
+        print(f"   1 row: sklearn {sklearn_us:,.0f} µs, compiled {compiled_us:,.0f} µs; "
+              f"batch of {len(probe)}: {batch_us:.2f} µs/row")
+
+    print(f"\n{'✅ Parity OK' if ok else '❌ Parity FAILED'}")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Parity check of the vectorized feature engine (api/ml/features.py)
+against the implementations it replaced:
+
+- train_model.engineer_features (pandas loop, sample std)
+- tasks.calculate_features_from_readings (NumPy per window)
+- tasks._calculate_ventana_statistics_sync(..., rescan=True) (NaN-skipping
+  statistics)
+
+and of the aggregate formulas behind the SQL path (VentanaAggregationService):
+features/statistics from aggregates, and merging the aggregates of a
+window split in two (blob + lecturas rows).
+
+The signal features of feature set 2 are checked against a plain
+per-window implementation, and the batch path (training) against
+window_features (inference).
+
+No database needed:  python testers/test_feature_parity.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.ml.features import (
+    FEATURE_NAMES, FEATURE_SETS, GAIT_BAND, GESTURE_BAND, SENSOR_FIELDS, SIGNAL_FEATURE_NAMES,
+    compute_aggregates, compute_feature_set, compute_features, compute_signal_features,
+    compute_statistics, features_from_aggregates, group_offsets, merge_aggregates,
+    statistics_from_aggregates, window_features
+)
+
+RTOL = 1e-9
+
+def legacy_training_features(df):
+    rows = []
+    for ventana_id in df['ventana_id'].unique():
+        w = df[df['ventana_id'] == ventana_id]
+        accel_sq = w['accel_x']**2 + w['accel_y']**2 + w['accel_z']**2
+        gyro_sq = w['gyro_x']**2 + w['gyro_y']**2 + w['gyro_z']**2
+        rows.append({
+            'ventana_id': ventana_id,
+            'hr_mean': w['heart_rate'].mean(),
+            'hr_std': w['heart_rate'].std(),
+            'hr_min': w['heart_rate'].min(),
+            'hr_max': w['heart_rate'].max(),
+            'hr_range': w['heart_rate'].max() - w['heart_rate'].min(),
+            'accel_magnitude_mean': np.sqrt(accel_sq).mean(),
+            'accel_magnitude_std': np.sqrt(accel_sq).std(),
+            'gyro_magnitude_mean': np.sqrt(gyro_sq).mean(),
+            'gyro_magnitude_std': np.sqrt(gyro_sq).std(),
+            'accel_energy': accel_sq.sum(),
+            'gyro_energy': gyro_sq.sum(),
+        })
+    return pd.DataFrame(rows).fillna(0)
+
+def legacy_inference_features(samples):
+    hr, ax, ay, az, gx, gy, gz = (np.nan_to_num(samples[f], nan=0.0) for f in SENSOR_FIELDS)
+    accel = np.sqrt(ax**2 + ay**2 + az**2)
+    gyro = np.sqrt(gx**2 + gy**2 + gz**2)
+    return {
+        'hr_mean': np.mean(hr), 'hr_std': np.std(hr),
+        'hr_min': np.min(hr), 'hr_max': np.max(hr), 'hr_range': np.max(hr) - np.min(hr),
+        'accel_magnitude_mean': np.mean(accel), 'accel_magnitude_std': np.std(accel),
+        'gyro_magnitude_mean': np.mean(gyro), 'gyro_magnitude_std': np.std(gyro),
+        'accel_energy': np.sum(ax**2 + ay**2 + az**2), 'gyro_energy': np.sum(gx**2 + gy**2 + gz**2),
+    }
+
+def legacy_statistics(samples):
+    statistics = {'hr_mean': np.nan, 'hr_std': np.nan, 'accel_energy': np.nan, 'gyro_energy': np.nan}
+    hr = samples['heart_rate'][~np.isnan(samples['heart_rate'])]
+    if hr.size:
+        statistics['hr_mean'], statistics['hr_std'] = np.mean(hr), np.std(hr)
+    for name, fields in (('accel_energy', SENSOR_FIELDS[1:4]), ('gyro_energy', SENSOR_FIELDS[4:])):
+        axes = np.column_stack([samples[f] for f in fields])
+        if (~np.isnan(axes)).any():
+            statistics[name] = np.nansum(np.square(axes))
+    return statistics
+
+def reference_signal_features(window):
+    seconds = window['created_at']
+    duration = seconds[-1] - seconds[0] if seconds.size else 0.0
+    ax, ay, az, gx, gy, gz = (np.nan_to_num(window[f]) for f in SENSOR_FIELDS[1:])
+    accel = np.sqrt(ax**2 + ay**2 + az**2)
+    gyro = np.sqrt(gx**2 + gy**2 + gz**2)
+
+    hr = window['heart_rate'][~np.isnan(window['heart_rate'])]
+    deltas = np.diff(60000.0 / hr)
+    features = {
+        'hr_rmssd': np.sqrt(np.mean(deltas**2)) if deltas.size else 0.0,
+        'hr_pnn50': np.mean(np.abs(deltas) > 50) if deltas.size else 0.0,
+        'accel_power_gesture': 0.0, 'accel_power_gait': 0.0, 'accel_dominant_freq': 0.0,
+        'step_cadence': 0.0, 'gyro_jerk': 0.0,
+    }
+    if duration > 0:
+        crossings = np.count_nonzero(np.diff(accel > accel.mean()))
+        features['step_cadence'] = crossings / 2 / duration * 60
+        features['gyro_jerk'] = np.abs(np.diff(gyro)).sum() / duration
+    if duration > 0 and seconds.size >= 4:
+        size = int(2 ** np.ceil(np.log2(np.clip(seconds.size, 8, 1024))))
+        grid = np.linspace(seconds[0], seconds[-1], size)
+        resampled = np.interp(grid, seconds, accel)
+        power = np.abs(np.fft.rfft(resampled - resampled.mean()))[1:] ** 2
+        freqs = np.fft.rfftfreq(size, d=duration / (size - 1))[1:]
+        if power.sum() > 0:
+            for name, (lo, hi) in (('accel_power_gesture', GESTURE_BAND), ('accel_power_gait', GAIT_BAND)):
+                features[name] = power[(freqs >= lo) & (freqs < hi)].sum() / power.sum()
+            features['accel_dominant_freq'] = freqs[power.argmax()]
+    return features
+
+def random_windows(windows=300, seed=7):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 120, size=windows)
+    sizes[::37] = 1  # single-reading windows
+    n = int(sizes.sum())
+    samples = {
+        'heart_rate': rng.normal(80, 12, n),
+        **{f: rng.normal(0, 1.5, n) for f in SENSOR_FIELDS[1:4]},
+        **{f: rng.normal(0, 40, n) for f in SENSOR_FIELDS[4:]},
+    }
+    for field in SENSOR_FIELDS:
+        samples[field][rng.random(n) < 0.08] = np.nan
+    # A window whose gyroscope never reported
+    samples['gyro_x'][:sizes[0]] = samples['gyro_y'][:sizes[0]] = samples['gyro_z'][:sizes[0]] = np.nan
+    ids = np.repeat(np.arange(1, windows + 1), sizes)
+    # ~1 Hz with jitter, restarting in every window
+    steps = rng.uniform(0.2, 2.0, n)
+    steps[np.r_[0, np.cumsum(sizes)[:-1]]] = 0.0
+    samples['created_at'] = np.cumsum(steps)
+    return ids, samples
+
+def check(label, expected, actual):
+    expected, actual = np.asarray(expected, dtype=float), np.asarray(actual, dtype=float)
+    ok = np.allclose(expected, actual, rtol=RTOL, atol=1e-9, equal_nan=True)
+    print(f"{'✅' if ok else '❌'} {label}")
+    if not ok:
+        worst = np.nanargmax(np.abs(expected - actual))
+        print(f"   window {worst}: expected {expected[worst]!r}, got {actual[worst]!r}")
+    return ok
+
+def main():
+    ids, samples = random_windows()
+    window_ids, offsets = group_offsets(ids)
+    features = compute_features(samples, offsets)
+    statistics = compute_statistics(samples, offsets)
+    counts = np.diff(offsets)
+    windows = [
+        {f: samples[f][offsets[i]:offsets[i + 1]] for f in ('created_at',) + SENSOR_FIELDS}
+        for i in range(len(window_ids))
+    ]
+
+    ok = True
+
+    print("\n== vs tasks.calculate_features_from_readings ==")
+    legacy = [legacy_inference_features(w) for w in windows]
+    for name in FEATURE_NAMES:
+        ok &= check(name, [row[name] for row in legacy], features[name])
+
+    print("\n== vs train_model.engineer_features (std rescaled from ddof=1) ==")
+    df = pd.DataFrame({'ventana_id': ids, **samples})
+    df[list(SENSOR_FIELDS)] = df[list(SENSOR_FIELDS)].fillna(0)
+    training = legacy_training_features(df).set_index('ventana_id').loc[window_ids]
+    ddof_scale = np.sqrt((counts - 1) / counts)
+    for name in FEATURE_NAMES:
+        expected = training[name].to_numpy()
+        if name.endswith('_std'):
+            expected = expected * ddof_scale
+        ok &= check(name, expected, features[name])
+
+    print("\n== vs tasks._calculate_ventana_statistics_sync(rescan=True) ==")
+    legacy = [legacy_statistics(w) for w in windows]
+    for name in statistics:
+        ok &= check(name, [row[name] for row in legacy], statistics[name])
+
+    print("\n== aggregates (SQL path) ==")
+    aggregates = compute_aggregates(samples, offsets)
+    rows = [{name: values[i] for name, values in aggregates.items()} for i in range(len(window_ids))]
+    from_aggregates = [features_from_aggregates(row) for row in rows]
+    for name in FEATURE_NAMES:
+        ok &= check(name, features[name], [row[name] for row in from_aggregates])
+    from_aggregates = [statistics_from_aggregates(row) for row in rows]
+    for name in statistics:
+        ok &= check(name, statistics[name], [np.nan if row[name] is None else row[name] for row in from_aggregates])
+
+    merged = []
+    for i in range(len(window_ids)):
+        middle = (offsets[i] + offsets[i + 1]) // 2
+        first, second = (
+            {name: values[0] for name, values in compute_aggregates(samples, bounds).items()}
+            for bounds in (np.array([offsets[i], middle]), np.array([middle, offsets[i + 1]]))
+        )
+        merged.append(features_from_aggregates(merge_aggregates(first, second)))
+    for name in FEATURE_NAMES:
+        ok &= check(f'{name} (merged halves)', features[name], [row[name] for row in merged])
+
+    print("\n== signal features (feature set 2) vs per-window reference ==")
+    signal = compute_signal_features(samples, offsets)
+    legacy = [reference_signal_features(w) for w in windows]
+    for name in SIGNAL_FEATURE_NAMES:
+        ok &= check(name, [row[name] for row in legacy], signal[name])
+
+    print("\n== batch (training) vs window_features (inference) ==")
+    for version, names in FEATURE_SETS.items():
+        batch = compute_feature_set(samples, offsets, version)
+        single = [window_features(w, version) for w in windows]
+        ok &= check(f'feature set {version} ({len(names)} features)',
+                    np.column_stack([batch[name] for name in names]),
+                    [[row[name] for name in names] for row in single])
+
+    print("\n== empty windows ==")
+    empty = compute_features(samples, np.array([0, 0, offsets[1], offsets[1]]))
+    ok &= check('empty windows are NaN', [np.nan, features['hr_mean'][0], np.nan], empty['hr_mean'])
+    empty = compute_signal_features(samples, np.array([0, 0, offsets[1], offsets[1]]))
+    ok &= check('empty windows are NaN (signal)', [np.nan, signal['gyro_jerk'][0], np.nan], empty['gyro_jerk'])
+
+    print(f"\n{'✅ Parity OK' if ok else '❌ Parity FAILED'} ({len(window_ids)} windows, {int(counts.sum())} readings)")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,84 +16,65 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, classification_report, confusion_matrix
 
-def extract_features_from_lecturas():
-    print("📊 Extrayendo datos de la base de datos...")
+def extract_features_from_lecturas(snapshot=False):
+    columns = ['ventana_id', 'created_at', 'heart_rate', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z']
     
-    lecturas = Lectura.objects.select_related('ventana').all()
+    if snapshot:
+        from api.services import LecturaDatasetSnapshot
+        
+        dataset = LecturaDatasetSnapshot()
+        print(f"📊 Leyendo snapshot local ({dataset.root}, hasta {dataset.watermark()})...")
+        df = dataset.load(columns=columns)
+    else:
+        df = _read_lecturas_from_db(columns)
     
-    if lecturas.count() == 0:
+    if df.empty:
         print("❌ No hay lecturas en la base de datos!")
         print("💡 Sugerencia: Inserta datos de prueba primero")
         return None
     
-    print(f"✅ Encontradas {lecturas.count()} lecturas")
-    
-    data = []
-    for lectura in lecturas:
-        data.append({
-            'ventana_id': lectura.ventana_id,
-            'heart_rate': lectura.heart_rate or 0,
-            'accel_x': lectura.accel_x or 0,
-            'accel_y': lectura.accel_y or 0,
-            'accel_z': lectura.accel_z or 0,
-            'gyro_x': lectura.gyro_x or 0,
-            'gyro_y': lectura.gyro_y or 0,
-            'gyro_z': lectura.gyro_z or 0,
-        })
+    print(f"✅ Encontradas {len(df)} lecturas")
     
-    df = pd.DataFrame(data)
+    # Missing values stay NaN: the feature engine zero-fills them for the
+    # base features and skips them for the HRV ones
+    df[columns[2:]] = df[columns[2:]].astype(float)
     return df
 
-def engineer_features(df):
+def _read_lecturas_from_db(columns):
+    print("📊 Extrayendo datos de la base de datos...")
+    
+    from api.services import VentanaSampleStore
+    
+    # Readings still stored as rows
+    frames = [pd.DataFrame.from_records(
+        Lectura.objects.values_list(*columns).iterator(chunk_size=5000),
+        columns=columns
+    )]
+    
+    # Readings of windows packed into columnar blobs
+    for ventana_id, samples in VentanaSampleStore.iter_packed():
+        frame = pd.DataFrame({field: samples[field] for field in columns[2:]})
+        frame.insert(0, 'created_at', pd.to_datetime(samples['created_at'], utc=True))
+        frame.insert(0, 'ventana_id', ventana_id)
+        frames.append(frame)
+    
+    return pd.concat(frames, ignore_index=True)
+
+def engineer_features(df, feature_set=None):
     print("🔧 Creando features adicionales...")
     
-    features_per_window = []
+    from api.ml import FEATURE_SET_VERSION, compute_feature_set, group_offsets
+    from api.ml.features import SENSOR_FIELDS
     
-    for ventana_id in df['ventana_id'].unique():
-        window_data = df[df['ventana_id'] == ventana_id]
-        
-        features = {
-            'ventana_id': ventana_id,
-            
-            'hr_mean': window_data['heart_rate'].mean(),
-            'hr_std': window_data['heart_rate'].std(),
-            'hr_min': window_data['heart_rate'].min(),
-            'hr_max': window_data['heart_rate'].max(),
-            'hr_range': window_data['heart_rate'].max() - window_data['heart_rate'].min(),
-            
-            'accel_magnitude_mean': np.sqrt(
-                window_data['accel_x']**2 + 
-                window_data['accel_y']**2 + 
-                window_data['accel_z']**2
-            ).mean(),
-            'accel_magnitude_std': np.sqrt(
-                window_data['accel_x']**2 + 
-                window_data['accel_y']**2 + 
-                window_data['accel_z']**2
-            ).std(),
-            
-            'gyro_magnitude_mean': np.sqrt(
-                window_data['gyro_x']**2 + 
-                window_data['gyro_y']**2 + 
-                window_data['gyro_z']**2
-            ).mean(),
-            'gyro_magnitude_std': np.sqrt(
-                window_data['gyro_x']**2 + 
-                window_data['gyro_y']**2 + 
-                window_data['gyro_z']**2
-            ).std(),
-            
-            'accel_energy': (window_data['accel_x']**2 + 
-                           window_data['accel_y']**2 + 
-                           window_data['accel_z']**2).sum(),
-            'gyro_energy': (window_data['gyro_x']**2 + 
-                          window_data['gyro_y']**2 + 
-                          window_data['gyro_z']**2).sum(),
-        }
-        
-        features_per_window.append(features)
+    # One vectorized pass over every window (api/ml/features.py); signal
+    # features need each window's readings in time order
+    df = df.sort_values(['ventana_id', 'created_at'], kind='stable')
+    ventana_ids, offsets = group_offsets(df['ventana_id'].to_numpy())
+    samples = {field: df[field].to_numpy(dtype=float) for field in SENSOR_FIELDS}
+    samples['created_at'] = df['created_at'].to_numpy(dtype='datetime64[us]')
+    features = compute_feature_set(samples, offsets, feature_set or FEATURE_SET_VERSION)
     
-    features_df = pd.DataFrame(features_per_window)
+    features_df = pd.DataFrame({'ventana_id': ventana_ids, **features})
     
     features_df = features_df.fillna(0)
     
@@ -101,6 +82,31 @@ def engineer_features(df):
     
     return features_df
 
+def load_features_from_store(feature_set):
+    print("📊 Leyendo features del feature store...")
+    
+    from api.ml import FEATURE_SETS
+    from api.services import VentanaFeatureStore
+    
+    # Only windows whose stored vector is missing or stale are computed
+    # (set 1 aggregated in PostgreSQL, later sets from the readings)
+    ventanas = Ventana.objects.filter(lectura_count__gt=0).order_by('id').only('id', 'created_at', 'lectura_count')
+    features = VentanaFeatureStore.get_many(ventanas, feature_set)
+    
+    if not features:
+        print("❌ No hay lecturas en la base de datos!")
+        print("💡 Sugerencia: Inserta datos de prueba primero")
+        return None
+    
+    features_df = pd.DataFrame(
+        [{'ventana_id': ventana_id, **window} for ventana_id, window in features.items()],
+        columns=['ventana_id', *FEATURE_SETS[feature_set]]
+    ).fillna(0)
+    
+    print(f"✅ Creadas {len(features_df.columns)-1} features para {len(features_df)} ventanas")
+    
+    return features_df
+
 def get_labels():
     print("🏷️  Obteniendo labels...")
     
@@ -147,16 +153,25 @@ def get_labels():
     
     return labels_df
 
-def train_model():
+def train_model(snapshot=False, feature_set=None, challenger=False):
     print("\n" + "="*60)
     print("🚀 ENTRENAMIENTO DEL MODELO DE PREDICCIÓN")
     print("="*60 + "\n")
     
-    lecturas_df = extract_features_from_lecturas()
-    if lecturas_df is None:
-        return False
+    from api.ml import FEATURE_SET_VERSION
+    
+    feature_set = feature_set or FEATURE_SET_VERSION
+    print(f"🧩 Feature set v{feature_set}")
     
-    features_df = engineer_features(lecturas_df)
+    if snapshot:
+        lecturas_df = extract_features_from_lecturas(snapshot=True)
+        if lecturas_df is None:
+            return False
+        features_df = engineer_features(lecturas_df, feature_set)
+    else:
+        features_df = load_features_from_store(feature_set)
+        if features_df is None:
+            return False
     
     labels_df = get_labels()
     if labels_df is None:
@@ -312,10 +327,12 @@ def train_model():
     if cm[1][0] > 0:
         print(f"⚠️  {cm[1][0]} Falsos Negativos (perdió {cm[1][0]} cravings reales)")
     
-    os.makedirs('models', exist_ok=True)
+    from django.conf import settings
+    
+    os.makedirs(settings.ML_MODELS_DIR, exist_ok=True)
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    model_path = f'models/smoking_craving_model_{timestamp}.pkl'
+    model_path = os.path.join(settings.ML_MODELS_DIR, f'smoking_craving_model_{timestamp}.pkl')
     
     print(f"\n💾 Guardando modelo en: {model_path}")
     
@@ -323,6 +340,9 @@ def train_model():
         'model': model,
         'scaler': scaler,
         'feature_names': X.columns.tolist(),
+        'feature_set': feature_set,
+        'model_name': type(model).__name__,
+        'version': timestamp,
         'training_date': datetime.now().isoformat(),
         'metrics': {
             'accuracy': accuracy,
@@ -332,16 +352,50 @@ def train_model():
         }
     }
     
+    # Uncompressed, so workers can memory-map the arrays (ML_MODEL_MMAP)
     joblib.dump(model_package, model_path)
     print("✅ Modelo guardado!")
     
-    latest_model_path = 'models/smoking_craving_model.pkl'
-    if os.path.exists(latest_model_path):
-        os.remove(latest_model_path)
-    
+    # Swap the served file atomically: workers mapping the previous model
+    # keep a valid file until they reload. A challenger is only registered
+    # for shadow scoring; the champion stays in place.
+    if challenger:
+        os.makedirs(settings.ML_CHALLENGERS_DIR, exist_ok=True)
+        latest_model_path = os.path.join(settings.ML_CHALLENGERS_DIR, os.path.basename(model_path))
+    else:
+        latest_model_path = settings.ML_MODEL_PATH
     import shutil
-    shutil.copy(model_path, latest_model_path)
-    print(f"✅ Symlink creado: {latest_model_path}")
+    staging_path = f'{latest_model_path}.tmp'
+    shutil.copy(model_path, staging_path)
+    os.replace(staging_path, latest_model_path)
+    print(f"✅ Modelo {'registrado como challenger' if challenger else 'publicado'}: {latest_model_path}")
+    
+    # NumPy-only compile of the same model, served in preference to the .pkl
+    from api.ml import compile_model, save_compiled
+    compiled_path = os.path.splitext(latest_model_path)[0] + '.npz'
+    try:
+        compiled = compile_model(
+            model, scaler, X.columns.tolist(),
+            model_name=model_package['model_name'], version=timestamp,
+            feature_set=feature_set, metrics=model_package['metrics'],
+        )
+        save_compiled(f'{compiled_path}.tmp', compiled)
+        os.replace(f'{compiled_path}.tmp', compiled_path)
+        print(f"✅ Modelo compilado: {compiled_path}")
+    except TypeError as e:
+        print(f"⚠️  {e}; se servirá el .pkl")
+        if os.path.exists(compiled_path):
+            os.remove(compiled_path)
+    
+    if challenger:
+        print("👥 Se evaluará en sombra junto al modelo actual (manage.py shadow_report)")
+    else:
+        try:
+            from api.ml import ModelRegistry
+            ModelRegistry.publish(timestamp)
+            print(f"🔄 Workers recargarán la versión {timestamp}")
+        except Exception as e:
+            print(f"⚠️  No se pudo publicar la versión en Redis ({e}); los workers recargarán al detectar el archivo nuevo")
     
     print("\n" + "="*60)
     print("🎉 ENTRENAMIENTO COMPLETADO EXITOSAMENTE")
@@ -501,8 +555,21 @@ if __name__ == "__main__":
     print("🤖 SISTEMA DE ENTRENAMIENTO DE MODELO ML")
     print("="*60)
     
+    # --snapshot: read readings from the local Parquet snapshot
+    # (manage.py snapshot_lecturas) instead of the database
+    use_snapshot = '--snapshot' in sys.argv
+    
+    # --feature-set N: train on api.ml.FEATURE_SETS[N] (default: latest)
+    feature_set = None
+    if '--feature-set' in sys.argv:
+        feature_set = int(sys.argv[sys.argv.index('--feature-set') + 1])
+    
+    # --challenger: register the model in ML_CHALLENGERS_DIR for shadow
+    # scoring instead of replacing the served one
+    challenger = '--challenger' in sys.argv
+    
     from api.models import Lectura
-    if Lectura.objects.count() == 0:
+    if not use_snapshot and Lectura.objects.count() == 0:
         print("\n⚠️  No hay datos en la tabla 'lecturas'")
         
         if '--auto' in sys.argv or '-y' in sys.argv:
@@ -511,7 +578,7 @@ if __name__ == "__main__":
         else:
             insert_sample_data()
     
-    success = train_model()
+    success = train_model(snapshot=use_snapshot, feature_set=feature_set, challenger=challenger)
     
     if not success:
         print("\n❌ El entrenamiento falló")
@@ -0,0 +1,27 @@
+import redis
+from django.conf import settings
+
+_client = None
+
+def get_redis():
+    """
+    Shared redis-py client for data structures the Django cache API
+    does not expose (streams, bitmaps, Lua scripts).
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+_async_client = None
+
+def get_async_redis():
+    """
+    redis.asyncio client for async views. Daphne runs one event loop per
+    process, so a single pool per process is enough.
+    """
+    global _async_client
+    if _async_client is None:
+        import redis.asyncio
+        _async_client = redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_client